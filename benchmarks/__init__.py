@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: __init__.py
+# @Time: 16/10/2026 09:12
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""novel_dl 的性能测试脚本, 在项目根目录下使用 python -m benchmarks.<模块名> 运行."""
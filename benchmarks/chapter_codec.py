@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: chapter_codec.py
+# @Time: 16/10/2026 22:10
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""比较不同章节内容压缩方式下的数据库大小和读写速度.
+
+每种方式在独立的子进程和临时目录中运行, 依次测试不压缩、zstd 压缩和使用字典的 zstd 压缩:
+
+    python -m benchmarks.chapter_codec --chapters 2000 --batch 200
+"""
+
+
+# 导入标准库
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+
+# 生成章节内容使用的词语, 以及网站在每个章节中插入的固定文本
+WORDS = [
+    "师父", "弟子", "江湖", "剑法", "内力", "掌门", "长老", "山门", "宗门", "修炼",
+    "突破", "境界", "灵气", "丹药", "法宝", "少年", "少女", "笑道", "说道", "只见",
+    "忽然", "心中", "一声", "这时", "便是", "不过", "原来", "已经", "自己", "我们",
+]
+BOILERPLATE = "本章未完, 请点击下一页继续阅读. 请记住本站域名, 手机版阅读网址同步更新."
+# 测试的压缩方式, 格式为 (名称, DB_CHAPTER_COMPRESSION, 是否训练字典)
+MODES = (("none", "none", False), ("zstd", "zstd", False), ("zstd+dict", "zstd", True))
+
+
+def make_content(rng: random.Random, index: int) -> str:
+    """生成一个约 3000 字的章节内容."""
+    paragraphs = [
+        "".join(rng.choices(WORDS, k=rng.randint(20, 60))) + "。"
+        for _ in range(40)
+    ]
+    return f"第{index}章\n" + "\n".join(paragraphs) + "\n" + BOILERPLATE
+
+
+def run_mode(
+    mode: str, chapters: int, batch: int, result: "multiprocessing.Queue",
+) -> None:
+    """在子进程中使用指定的压缩方式写入和读取章节, 并返回大小和速度."""
+    name, compression, use_dict = next(i for i in MODES if i[0] == mode)
+    # 切换到临时目录, 使数据库文件创建在其中
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        # 导入自定义库, 必须在切换目录后导入
+        from novel_dl.entity.base import Book, Chapter  # noqa: PLC0415
+        from novel_dl.utils import chapter_codec, db_manager  # noqa: PLC0415
+        from novel_dl.utils.identify import hash_  # noqa: PLC0415
+        # 使用指定的压缩方式
+        chapter_codec.DB_CHAPTER_COMPRESSION = compression
+        manager = db_manager.DBManager()
+        book = Book("测试书籍", "测试作者", "连载", "简介")
+        manager.add_book(book)
+        rng = random.Random(0)  # noqa: S311, 只用于生成可复现的测试数据
+        chapter_list = [
+            Chapter(
+                hash_(book), i, f"第{i}章", 0.0, make_content(rng, i),
+                sources=[f"https://www.example.com/{i}.html"],
+            )
+            for i in range(1, chapters + 1)
+        ]
+        # 使用字典时, 先用其他书籍的章节训练字典
+        if use_dict:
+            chapter_codec.train_dictionary(
+                chapter_codec.chapter_scope(hash_(book), []),
+                [make_content(rng, i) for i in range(200)],
+            )
+        raw = sum(len(i.content.encode("UTF-8")) for i in chapter_list)
+        # 写入章节并计时
+        start = time.perf_counter()
+        for i in range(0, chapters, batch):
+            manager.add_chapters(chapter_list[i:i + batch])
+        write_speed = chapters / (time.perf_counter() - start)
+        # 读取章节并计时
+        start = time.perf_counter()
+        for _ in manager.iter_chapter_contents(hash_(book)): pass
+        read_speed = chapters / (time.perf_counter() - start)
+        # 获取数据库文件的大小
+        with db_manager.create_sqlite_engine(
+            Path("data/db/novel_dl_00000.sqlite"),
+        ).connect() as connection:
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = Path("data/db/novel_dl_00000.sqlite").stat().st_size
+        result.put((name, raw, size, write_speed, read_speed))
+
+
+def main() -> None:
+    """依次测试所有压缩方式并输出结果表格."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chapters", type=int, default=2000, help="写入的章节数")
+    parser.add_argument("--batch", type=int, default=200, help="每批写入的章节数")
+    args = parser.parse_args()
+    # 每种方式在独立的子进程中运行, 避免单例和模块状态相互影响
+    context = multiprocessing.get_context("spawn")
+    result = context.Queue()
+    print(
+        f"{'方式':<12}{'原文(MiB)':>12}{'数据库(MiB)':>14}"
+        f"{'写入(章/秒)':>14}{'读取(章/秒)':>14}",
+    )
+    for mode, _, _ in MODES:
+        process = context.Process(
+            target=run_mode, args=(mode, args.chapters, args.batch, result),
+        )
+        process.start()
+        name, raw, size, write_speed, read_speed = result.get()
+        process.join()
+        print(
+            f"{name:<12}{raw / 1024 / 1024:>12.2f}{size / 1024 / 1024:>14.2f}"
+            f"{write_speed:>14.1f}{read_speed:>14.1f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
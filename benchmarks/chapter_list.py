@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: chapter_list.py
+# @Time: 16/10/2026 15:02
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""比较逐章构建书籍时, 旧的线性查找方式与 ChapterList 的耗时.
+
+测试包括按顺序追加、乱序追加和合并两本书籍, 以及追加后读取更新时间:
+
+    python -m benchmarks.chapter_list --sizes 5000 10000
+"""
+
+
+# 导入标准库
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+# 导入自定义库
+from novel_dl.entity.base import Book, Chapter
+from novel_dl.utils.identify import hash_
+
+
+def legacy_append(book: Book, chapters: list[Chapter], chapter: Chapter) -> None:
+    """旧版本 Book.append 的实现: 线性遍历章节并逐个计算 hash 值."""
+    if chapter.book_hash != hash_(book):
+        raise ValueError("章节的 book_hash 与书籍的 hash 不同.")
+    for index, one_chapter in enumerate(chapters):
+        if hash_(one_chapter) == hash_(chapter):
+            chapters[index] = one_chapter + chapter
+            return
+        if one_chapter.index == chapter.index:
+            if len(one_chapter.title) < len(chapter.title):
+                one_chapter.title = chapter.title
+            else:
+                chapter.title = one_chapter.title
+            chapters[index] = one_chapter + chapter
+            return
+    chapters.append(chapter)
+
+
+def make_chapters(book: Book, size: int, shuffle: bool) -> list[Chapter]:
+    """生成测试用的章节列表."""
+    chapters = [
+        Chapter(hash_(book), i, f"第{i}章", float(i), "测试正文。")
+        for i in range(1, size + 1)
+    ]
+    if shuffle: random.Random(size).shuffle(chapters)  # noqa: S311
+    return chapters
+
+
+def run_legacy(book: Book, chapters: list[Chapter]) -> None:
+    """使用旧的方式构建书籍并读取更新时间."""
+    chapter_list: list[Chapter] = []
+    for chapter in chapters: legacy_append(book, chapter_list, chapter)
+    chapter_list.sort(key=lambda x: x.index)
+    _ = chapter_list[-1].update_time
+
+
+def run_indexed(book: Book, chapters: list[Chapter]) -> None:
+    """使用 ChapterList 构建书籍并读取更新时间."""
+    book.chapters = []
+    for chapter in chapters: book.append(chapter)
+    _ = book.update_time
+
+
+def run_legacy_merge(
+    book: Book, left: list[Chapter], right: list[Chapter],
+) -> None:
+    """使用旧的方式将 right 中的章节合并到 left 中."""
+    merged = list(left)
+    for chapter in right: legacy_append(book, merged, chapter)
+
+
+def run_indexed_merge(
+    book: Book, left: list[Chapter], right: list[Chapter],
+) -> None:
+    """使用 ChapterList 将 right 中的章节合并到 left 中."""
+    book.chapters = left
+    for chapter in right: book.append(chapter)
+
+
+def timeit(func: Callable[..., None], *args: object) -> float:
+    """返回函数的执行时间(秒)."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """依次测试每种章节数量并输出结果表格."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[5000, 10000], help="书籍的章节数",
+    )
+    args = parser.parse_args()
+    book = Book("测试书籍", "测试作者", "连载", "简介")
+    print(f"{'章节数':<8}{'场景':<10}{'线性查找(秒)':>14}{'ChapterList(秒)':>18}{'加速比':>10}")
+    for size in args.sizes:
+        for name, shuffle in (("顺序追加", False), ("乱序追加", True)):
+            chapters = make_chapters(book, size, shuffle)
+            legacy = timeit(run_legacy, book, chapters)
+            indexed = timeit(run_indexed, book, chapters)
+            print(
+                f"{size:<8}{name:<10}{legacy:>14.3f}{indexed:>18.3f}"
+                f"{legacy / indexed:>10.1f}x",
+            )
+        # 合并两本各含一半重复章节的书籍
+        left = make_chapters(book, size, shuffle=False)
+        right = make_chapters(book, size, shuffle=True)[: size // 2]
+        legacy = timeit(run_legacy_merge, book, left, right)
+        indexed = timeit(run_indexed_merge, book, left, right)
+        print(
+            f"{size:<8}{'合并书籍':<10}{legacy:>14.3f}{indexed:>18.3f}"
+            f"{legacy / indexed:>10.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: corpus.py
+# @Time: 16/10/2026 23:40
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""生成性能测试使用的合成小说语料.
+
+书籍的书名、作者、简介和章节内容由常用汉字随机组合而成, 相同的参数和随机数种子
+总是生成相同的语料. 还可以将书籍写成 Tomato-Novel-Downloader 格式的 epub 文件,
+用于测试 novel_dl.utils.importer.tnd.
+"""
+
+
+# 导入标准库
+import random
+from io import BytesIO
+from pathlib import Path
+
+# 导入第三方库
+from ebooklib import epub  # type: ignore[reportMissingTypeStubs]
+from PIL import Image
+
+# 导入自定义库
+from novel_dl.entity.base import Book, Chapter, Cover
+from novel_dl.utils.identify import hash_
+
+
+# 生成书名、作者和正文使用的常用字和词语
+TITLE_CHARS = "之的一是不了人我在有他这中大来上个国到说们为子和你地出道也时年得就那要下以生会自着去"
+AUTHOR_CHARS = "张王李赵刘陈杨黄吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘"
+WORDS = [
+    "师父", "弟子", "江湖", "剑法", "内力", "掌门", "长老", "山门", "宗门", "修炼",
+    "突破", "境界", "灵气", "丹药", "法宝", "少年", "少女", "笑道", "说道", "只见",
+    "忽然", "心中", "一声", "这时", "便是", "不过", "原来", "已经", "自己", "我们",
+]
+
+
+def make_text(rng: random.Random, length: int) -> str:
+    """生成约 length 个字的正文, 每段约 100 字."""
+    paragraphs: list[str] = []
+    while sum(len(i) for i in paragraphs) < length:
+        paragraphs.append("".join(rng.choices(WORDS, k=50)) + "。")
+    return "\n".join(paragraphs)
+
+
+def make_cover(rng: random.Random) -> Cover:
+    """生成一张纯色的 PNG 封面."""
+    memory_file = BytesIO()
+    color = tuple(rng.randrange(256) for _ in range(3))
+    Image.new("RGB", (300, 400), color).save(memory_file, "PNG")
+    return Cover(f"https://www.example.com/cover/{rng.random()}.png", memory_file.getvalue())
+
+
+def make_book(
+    rng: random.Random, index: int, chapters: int, chapter_size: int,
+) -> Book:
+    """生成第 index 本书籍, 包含一张封面和 chapters 个约 chapter_size 字的章节."""
+    # 书名末尾加上序号, 保证书名和作者的组合互不相同
+    title = "".join(rng.choices(TITLE_CHARS, k=rng.randint(2, 8))) + str(index)
+    author = "".join(rng.choices(AUTHOR_CHARS, k=rng.randint(2, 4)))
+    book = Book(
+        title, author, rng.choice(["连载", "完结"]), make_text(rng, 200),
+        sources=[f"https://www.example.com/book/{index}.html"],
+    )
+    book.covers.append(make_cover(rng))
+    # 章节的 hash 值只由索引和标题决定, 因此章节标题中包含书籍的序号
+    for i in range(1, chapters + 1):
+        book.append(Chapter(
+            hash_(book), i, f"{index}-{''.join(rng.choices(WORDS, k=2))}{i}",
+            float(i), make_text(rng, chapter_size),
+            sources=[f"https://www.example.com/book/{index}/{i}.html"],
+        ))
+    return book
+
+
+def make_corpus(
+    books: int, chapters: int, chapter_size: int, seed: int = 0,
+) -> list[Book]:
+    """生成 books 本书籍的语料."""
+    rng = random.Random(seed)  # noqa: S311, 只用于生成可复现的测试数据
+    return [make_book(rng, i, chapters, chapter_size) for i in range(books)]
+
+
+def write_tnd_epub(book: Book, path: Path) -> None:
+    """将书籍写成 Tomato-Novel-Downloader 格式的 epub 文件."""
+    ebook = epub.EpubBook()
+    ebook.set_identifier(hash_(book))
+    ebook.set_title(book.title)
+    ebook.add_author(book.author)
+    ebook.set_language("zh-CN")
+    # 简介页面: 书名、作者、状态和简介
+    intro = epub.EpubHtml(uid="intro", title="简介", file_name="intro.xhtml")
+    desc = book.desc.replace("\n", "<br/>")
+    intro.content = (
+        f"<h2>{book.title}</h2>"
+        f'<p class="no-indent">作者：{book.author}</p>'  # noqa: RUF001
+        f'<p class="no-indent">状态：{book.state}；字数：0</p>'  # noqa: RUF001
+        f"<p>{desc}</p>"
+    )
+    ebook.add_item(intro)
+    # 封面图片
+    cover = book.main_cover
+    if cover is not None:
+        ebook.add_item(epub.EpubItem(
+            uid="cover", file_name="cover.jpg",
+            media_type="image/jpeg", content=cover.to_jpg().data,
+        ))
+    # 章节页面: 标题为 "第 N 章 标题", 正文每段一个 p 标签
+    items: list[epub.EpubHtml] = []
+    for chapter in book.chapters:
+        item = epub.EpubHtml(
+            uid=f"chapter_{chapter.index}", title=chapter.title,
+            file_name=f"chapter_{chapter.index}.xhtml",
+        )
+        paragraphs = "".join(f"<p>{i}</p>" for i in chapter.content.split("\n"))
+        item.content = f"<h1>第{chapter.index}章 {chapter.title}</h1>{paragraphs}"
+        ebook.add_item(item)
+        items.append(item)
+    ebook.spine = [intro, *items]
+    ebook.toc = items
+    ebook.add_item(epub.EpubNcx())
+    ebook.add_item(epub.EpubNav())
+    epub.write_epub(str(path), ebook, {})
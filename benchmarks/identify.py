@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: identify.py
+# @Time: 16/10/2026 16:10
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""比较旧版本 hash_ 与带缓存和类型分派的 hash_ 的耗时.
+
+先测试单个对象重复计算 hash 值的耗时, 再测试入库热路径:
+ChapterItem 转换为 Chapter、添加到 Book、转换为数据库记录.
+
+    python -m benchmarks.identify --count 100000 --chapters 5000
+"""
+
+
+# 导入标准库
+import argparse
+import base64
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any
+
+# 导入第三方库
+from PIL import Image
+
+# 导入自定义库
+from novel_dl.entity import base, convert
+from novel_dl.entity.base import Book, Chapter, Cover
+from novel_dl.entity.convert import chapter_to_record, item_to_chapter
+from novel_dl.entity.items import BookItem, ChapterItem
+from novel_dl.utils import identify
+from novel_dl.utils.identify import book_hash, chapter_hash, hash_
+
+
+def legacy_hash(obj: Any) -> str:  # noqa: PLR0911
+    """旧版本的 hash_: 每次调用都导入类型、依次判断类型并重新计算."""
+    from novel_dl.entity.base import Book, Chapter, Cover    # noqa: PLC0415, I001
+    from novel_dl.entity.items import BookItem, ChapterItem  # noqa: PLC0415
+    if isinstance(obj, BookItem):
+        return book_hash(
+            obj.get("title", "Default Book"), obj.get("author", "Default Author"),
+        )
+    if isinstance(obj, ChapterItem):
+        return chapter_hash(
+            obj.get("index", -1), obj.get("title", "Default Chapter"),
+        )
+    if isinstance(obj, Book):
+        return book_hash(obj.title, obj.author)
+    if isinstance(obj, Chapter):
+        return chapter_hash(obj.index, obj.title)
+    if isinstance(obj, Cover):
+        return identify._hash(base64.b64encode(obj.data).decode("UTF-8"))
+    if isinstance(obj, str):
+        return identify._hash(obj)
+    return "0" * 64
+
+
+@contextmanager
+def use_hash(func: Callable[[Any], str]):  # noqa: ANN201
+    """临时替换实体模块中使用的 hash_ 函数."""
+    modules = (base, convert)
+    saved = [module.hash_ for module in modules]
+    for module in modules: module.hash_ = func
+    try: yield
+    finally:
+        for module, old in zip(modules, saved, strict=True): module.hash_ = old
+
+
+def make_cover() -> Cover:
+    """生成测试用的封面."""
+    memory_file = BytesIO()
+    Image.new("RGB", (300, 400), "red").save(memory_file, "PNG")
+    return Cover("https://www.example.com/cover.png", memory_file.getvalue())
+
+
+def bench_single(func: Callable[[Any], str], obj: Any, count: int) -> float:
+    """返回对同一个对象重复计算 count 次 hash 值的耗时(微秒/次)."""
+    start = time.perf_counter()
+    for _ in range(count): func(obj)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def bench_ingest(func: Callable[[Any], str], chapters: int) -> float:
+    """返回入库热路径的耗时(秒)."""
+    book = Book("测试书籍", "测试作者", "连载", "简介")
+    items = [
+        ChapterItem(
+            book_hash=hash_(book), index=i, title=f"第{i}章", update_time=0.0,
+            content="测试正文。", source=f"https://www.example.com/{i}.html",
+            other_info={},
+        )
+        for i in range(1, chapters + 1)
+    ]
+    with use_hash(func):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+            chapter = item_to_chapter(item)
+            book.append(chapter)
+            func(chapter)
+            chapter_to_record(chapter)
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    """运行所有测试并输出结果表格."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000, help="单个对象的计算次数")
+    parser.add_argument("--chapters", type=int, default=5000, help="热路径的章节数")
+    args = parser.parse_args()
+    book = Book("测试书籍", "测试作者", "连载", "简介")
+    objects = {
+        "Book":        book,
+        "Chapter":     Chapter(hash_(book), 1, "第一章", 0.0, ""),
+        "Cover":       make_cover(),
+        "BookItem":    BookItem(title="测试书籍", author="测试作者"),
+        "ChapterItem": ChapterItem(index=1, title="第一章"),
+        "str":         "https://www.example.com/1.html",
+    }
+    print(f"{'对象':<14}{'旧版本(微秒/次)':>18}{'新版本(微秒/次)':>18}{'加速比':>10}")
+    for name, obj in objects.items():
+        legacy = bench_single(legacy_hash, obj, args.count)
+        current = bench_single(hash_, obj, args.count)
+        print(f"{name:<14}{legacy:>18.3f}{current:>18.3f}{legacy / current:>10.1f}x")
+    legacy = bench_ingest(legacy_hash, args.chapters)
+    current = bench_ingest(hash_, args.chapters)
+    print(
+        f"{'入库热路径':<14}{legacy:>17.3f}s{current:>17.3f}s"
+        f"{legacy / current:>10.1f}x",
+    )
+
+
+if __name__ == "__main__":
+    main()
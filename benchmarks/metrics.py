@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: metrics.py
+# @Time: 17/10/2026 05:20
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""检查 MetricsServer 输出的 Prometheus 文本格式, 并测试生成指标的耗时.
+
+在随机端口上启动 MetricsServer, 模拟 books 本书籍的爬取进度, 通过 HTTP 获取 /metrics,
+检查每个样本都属于声明了 HELP 和 TYPE 的指标、summary 只使用 _sum 和 _count 后缀,
+以及按书籍输出的标签值不超过 METRICS_BOOK_LIMIT. 检查失败时以非零状态退出.
+
+    python -m benchmarks.metrics --books 10000 --repeat 20
+"""
+
+
+# 导入标准库
+import argparse
+import re
+import sys
+import time
+import urllib.request
+from typing import Any
+
+# 导入第三方库
+from scrapy import Spider, signals
+from scrapy.utils.test import get_crawler
+from twisted.internet import reactor, threads
+
+# 导入自定义库
+from novel_dl.entity.items import BookItem, ChapterItem
+from novel_dl.extensions import MetricsServer
+
+
+# 样本行的格式: 名称{标签} 值
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+# 各类指标允许的样本名称后缀
+SUFFIXES = {"counter": ("",), "gauge": ("",), "summary": ("", "_sum", "_count")}
+
+
+class MetricsSpider(Spider):
+    """模拟爬取进度的爬虫, 只提供 MetricsServer 读取的属性."""
+
+    name = "metrics"
+
+    def __init__(self, books: int, chapters: int) -> None:
+        """初始化爬虫, 每本书籍的章节列表都已获取完成."""
+        super().__init__()
+        self.chapters_crawled = {f"{i:064x}": chapters for i in range(books)}
+        self.chapter_list_flag = dict.fromkeys(self.chapters_crawled, True)
+        self.pages_unchanged: dict[str, list[Any]] = {}
+
+
+def check(body: str, book_limit: int) -> list[str]:
+    """检查指标的文本格式, 返回发现的问题."""
+    problems: list[str] = []
+    kinds: dict[str, str] = {}
+    helps: set[str] = set()
+    books: set[str] = set()
+    for line in body.splitlines():
+        if line.startswith("# HELP "):
+            helps.add(line.split()[2])
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            if name in kinds: problems.append(f"重复声明的指标: {name}")
+            if kind not in SUFFIXES: problems.append(f"未知的指标类型: {line}")
+            kinds[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        if match is None:
+            problems.append(f"无法解析的样本: {line}")
+            continue
+        name, labels, value = match.groups()
+        family = next((
+            i for i, kind in kinds.items()
+            for suffix in SUFFIXES.get(kind, ("",)) if name == i + suffix
+        ), None)
+        if family is None or family not in helps:
+            problems.append(f"没有声明 HELP 和 TYPE 的样本: {line}")
+        elif kinds[family] in {"counter", "gauge"} and name.endswith(("_sum", "_count")):
+            problems.append(f"{kinds[family]} 使用了保留的后缀: {name}")
+        try: float(value)
+        except ValueError: problems.append(f"样本值不是数字: {line}")
+        book = re.search(r'book="([^"]*)"', labels or "")
+        if book: books.add(book.group(1))
+    if len(books) > book_limit:
+        problems.append(f"按书籍输出了 {len(books)} 本书籍, 超过上限 {book_limit}")
+    return problems
+
+
+def main() -> None:
+    """启动 MetricsServer, 检查输出格式并输出生成指标的耗时."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=10000, help="正在爬取的书籍数")
+    parser.add_argument("--chapters", type=int, default=100, help="每本书籍的章节数")
+    parser.add_argument("--book-limit", type=int, default=20, help="按书籍输出的书籍数量上限")
+    parser.add_argument("--repeat", type=int, default=20, help="生成指标的重复次数")
+    args = parser.parse_args()
+    crawler = get_crawler(settings_dict={
+        "METRICS_ENABLED": True, "METRICS_PORT": 0, "METRICS_BOOK_LIMIT": args.book_limit,
+    })
+    server = MetricsServer.from_crawler(crawler)
+    spider = MetricsSpider(args.books, args.chapters)
+    problems: list[str] = []
+
+    def fetch() -> str:
+        # 在线程中通过 HTTP 获取指标
+        assert server.listener is not None
+        port = server.listener.getHost().port
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers.get_content_type() == "text/plain"
+            return response.read().decode("UTF-8")
+
+    def run() -> None:
+        # 模拟爬取进度: 每本书籍有一半的章节通过管道, 部分 Item 被丢弃
+        server.spider_opened(spider)
+        for index, book_hash in enumerate(spider.chapters_crawled):
+            crawler.signals.send_catch_log(signals.item_scraped, item=BookItem(), spider=spider)
+            for i in range(args.chapters // 2):
+                crawler.signals.send_catch_log(
+                    signals.item_scraped,
+                    item=ChapterItem(book_hash=book_hash, index=i + 1), spider=spider,
+                )
+            if index % 10 == 0:
+                crawler.signals.send_catch_log(
+                    signals.item_dropped, item=ChapterItem(), spider=spider,
+                    response=None, exception=None,
+                )
+        crawler.stats.set_value("db_writer/write_count", 5)
+        crawler.stats.set_value("db_writer/write_latency_avg", 0.01)
+        crawler.stats.set_value("db_writer/write_latency_max", 0.05)
+        threads.deferToThread(fetch).addCallback(done).addErrback(failed)
+
+    def done(body: str) -> None:
+        problems.extend(check(body, args.book_limit))
+        start = time.perf_counter()
+        for _ in range(args.repeat): server.render()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(
+            f"{args.books} 本书籍, 指标 {len(body.splitlines())} 行, "
+            f"生成一次耗时 {elapsed * 1000:.2f} 毫秒.",
+        )
+        stop()
+
+    def failed(failure: Any) -> None:
+        problems.append(f"获取指标失败: {failure.getErrorMessage()}")
+        stop()
+
+    def stop() -> None:
+        deferred = server.spider_closed(spider)
+        if deferred is None: reactor.stop()  # type: ignore[attr-defined]
+        else: deferred.addBoth(lambda _: reactor.stop())  # type: ignore[attr-defined]
+
+    reactor.callWhenRunning(run)  # type: ignore[attr-defined]
+    reactor.run()  # type: ignore[attr-defined]
+    for problem in problems: print(problem)
+    print("检查通过." if not problems else f"发现 {len(problems)} 个问题.")
+    if problems: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
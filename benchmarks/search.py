@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: search.py
+# @Time: 16/10/2026 20:05
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""测试按书名和作者搜索书籍的延迟(毫秒/次).
+
+在临时目录中生成指定数量的随机书籍, 然后对不同长度的查询分别计时:
+
+    python -m benchmarks.search --books 100000 --repeat 50
+"""
+
+
+# 导入标准库
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+# 生成书名和作者使用的常用字, 其中包含 "之"、"的" 等出现频率很高的字
+TITLE_CHARS = "之的一是不了人我在有他这中大来上个国到说们为子和你地出道也时年得就那要下以生会自着去"
+AUTHOR_CHARS = "张王李赵刘陈杨黄吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘"
+
+
+def make_books(count: int, seed: int) -> list[tuple[str, str]]:
+    """生成 count 本书籍的 (书名, 作者), 书名和作者的组合互不相同."""
+    rng = random.Random(seed)  # noqa: S311, 只用于生成可复现的测试数据
+    books: set[tuple[str, str]] = set()
+    while len(books) < count:
+        title = "".join(rng.choices(TITLE_CHARS, k=rng.randint(2, 10)))
+        author = "".join(rng.choices(AUTHOR_CHARS, k=rng.randint(2, 4)))
+        books.add((title, author))
+    return sorted(books)
+
+
+def main() -> None:
+    """生成测试数据并输出不同查询的延迟表格."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=100000, help="生成的书籍数量")
+    parser.add_argument("--repeat", type=int, default=50, help="每个查询重复的次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+    # 切换到临时目录, 使数据库文件创建在其中
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        # 导入自定义库, 必须在切换目录后导入
+        from novel_dl.entity.base import Book  # noqa: PLC0415
+        from novel_dl.utils import db_manager  # noqa: PLC0415
+        # 写入测试数据时不等待磁盘同步
+        db_manager.DB_SQLITE_PROFILE = "bulk-ingest"
+        manager = db_manager.DBManager()
+        books = make_books(args.books, args.seed)
+        start = time.perf_counter()
+        for title, author in books:
+            manager.add_book(Book(title, author, "连载", "简介"))
+        print(f"写入 {len(books)} 本书籍, 用时 {time.perf_counter() - start:.1f} 秒.")
+        # 从测试数据中选取不同长度的查询
+        rng = random.Random(args.seed)  # noqa: S311, 只用于生成可复现的测试数据
+        long_title = next(i for i, _ in books if len(i) >= 6)
+        queries = {
+            "单字(高频)": "之",
+            "两字": rng.choice(books)[0][:2],
+            "四字": long_title[:4],
+            "完整书名": long_title,
+            "作者": rng.choice(books)[1],
+        }
+        # 依次测试每个查询
+        print(f"{'查询':<10}{'内容':<12}{'结果数':>8}{'中位数(毫秒)':>14}{'P95(毫秒)':>12}")
+        for name, query in queries.items():
+            timings: list[float] = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = manager.search_book_by_name(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(
+                f"{name:<10}{query:<12}{len(result):>8}"
+                f"{statistics.median(timings):>14.2f}{p95:>12.2f}",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: sqlite_profile.py
+# @Time: 16/10/2026 09:12
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""比较不同 SQLite 性能配置下写入章节的速度(章/秒).
+
+每种配置在独立的子进程和临时目录中运行, 分别测试逐章写入和批量写入:
+
+    python -m benchmarks.sqlite_profile --chapters 2000 --batch 200
+"""
+
+
+# 导入标准库
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def run_profile(
+    profile: str, chapters: int, batch: int, result: "multiprocessing.Queue",
+) -> None:
+    """在子进程中使用指定的性能配置写入章节, 并返回两种写入方式的速度."""
+    # 切换到临时目录, 使数据库文件创建在其中
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        # 导入自定义库, 必须在切换目录后导入
+        from novel_dl.entity.base import Book, Chapter  # noqa: PLC0415
+        from novel_dl.utils import db_manager  # noqa: PLC0415
+        from novel_dl.utils.identify import hash_  # noqa: PLC0415
+        # 使用指定的性能配置
+        db_manager.DB_SQLITE_PROFILE = profile
+        manager = db_manager.DBManager()
+        # 准备测试用的书籍和章节
+        speed: dict[str, float] = {}
+        for mode in ("single", "batch"):
+            book = Book(f"测试书籍-{mode}", "测试作者", "连载", "简介")
+            manager.add_book(book)
+            chapter_list = [
+                Chapter(
+                    hash_(book), i, f"第{i}章", 0.0, "测试正文。" * 600,
+                    sources=[f"https://www.example.com/{mode}/{i}.html"],
+                )
+                for i in range(1, chapters + 1)
+            ]
+            # 写入章节并计时
+            start = time.perf_counter()
+            if mode == "single":
+                for chapter in chapter_list: manager.add_chapter(chapter)
+            else:
+                for i in range(0, chapters, batch):
+                    manager.add_chapters(chapter_list[i:i + batch])
+            speed[mode] = chapters / (time.perf_counter() - start)
+        result.put((profile, speed))
+
+
+def main() -> None:
+    """依次测试所有性能配置并输出结果表格."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chapters", type=int, default=2000, help="每种方式写入的章节数")
+    parser.add_argument("--batch", type=int, default=200, help="批量写入时每批的章节数")
+    args = parser.parse_args()
+    # 导入数据库管理器会创建数据目录, 因此在临时目录中导入性能配置的预设
+    work_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        from novel_dl.utils.db_manager import SQLITE_PROFILES  # noqa: PLC0415
+        os.chdir(work_dir)
+    # 每种配置在独立的子进程中运行, 避免单例和模块状态相互影响
+    context = multiprocessing.get_context("spawn")
+    result = context.Queue()
+    print(f"{'配置':<12}{'逐章写入(章/秒)':>18}{'批量写入(章/秒)':>18}")
+    for profile in SQLITE_PROFILES:
+        process = context.Process(
+            target=run_profile,
+            args=(profile, args.chapters, args.batch, result),
+        )
+        process.start()
+        name, speed = result.get()
+        process.join()
+        print(f"{name:<12}{speed['single']:>18.1f}{speed['batch']:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
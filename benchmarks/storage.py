@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: storage.py
+# @Time: 16/10/2026 23:55
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""存储层和导出的性能测试套件.
+
+在临时目录中生成合成语料(见 benchmarks.corpus), 写入指定数量的分片, 然后依次测试
+add_book、add_chapter、search_book_by_name、search_book_by_hash、record_to_book、
+get_epub、TXT 导出和 importer.tnd 的耗时. 结果以 JSON 格式写入 --output 指定的文件,
+指定 --baseline 时与之前的结果比较, 中位数变慢超过 --threshold 的项目标记为回归,
+存在回归时以状态码 1 退出:
+
+    python -m benchmarks.storage --books 200 --chapters 30 --shards 4 --output base.json
+    python -m benchmarks.storage --books 200 --chapters 30 --shards 4 --baseline base.json
+"""
+
+
+# 导入标准库
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterable
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+
+# 参与基线比较的参数, 参数不同的结果之间不能比较
+PARAMS = ("books", "chapters", "chapter_size", "shards", "repeat", "seed")
+
+
+def measure(func: Callable[[Any], object], args: Iterable[Any]) -> dict[str, float]:
+    """依次以 args 中的每个参数调用 func, 返回耗时(秒/次)的统计结果."""
+    timings: list[float] = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    return {
+        "median": statistics.median(timings), "p95": p95,
+        "mean": statistics.fmean(timings), "count": len(timings),
+    }
+
+
+def run_suite(params: dict[str, int], result: "multiprocessing.Queue") -> None:
+    """在子进程中生成语料并运行所有测试项目, 返回每个项目的统计结果."""
+    # 切换到临时目录, 使数据库文件创建在其中
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        # 导入自定义库, 必须在切换目录后导入
+        from ebooklib import epub  # noqa: PLC0415  # type: ignore[reportMissingTypeStubs]
+        from sqlalchemy import select  # noqa: PLC0415
+        from sqlalchemy.orm import sessionmaker  # noqa: PLC0415
+
+        from benchmarks.corpus import make_corpus, write_tnd_epub  # noqa: PLC0415
+        from novel_dl.entity.base import Book  # noqa: PLC0415
+        from novel_dl.entity.convert import record_to_book  # noqa: PLC0415
+        from novel_dl.entity.models import BookTable  # noqa: PLC0415
+        from novel_dl.utils import db_manager  # noqa: PLC0415
+        from novel_dl.utils.epub import get_epub  # noqa: PLC0415
+        from novel_dl.utils.identify import hash_  # noqa: PLC0415
+        from novel_dl.utils.importer import tnd  # noqa: PLC0415
+        # 按照分片数量设置每个分片的书籍上限
+        db_manager.DB_SHARD_MAX_BOOKS = math.ceil(params["books"] / params["shards"])
+        manager = db_manager.DBManager()
+        corpus = make_corpus(
+            params["books"], params["chapters"], params["chapter_size"], params["seed"],
+        )
+        rng = random.Random(params["seed"])  # noqa: S311, 只用于生成可复现的测试数据
+        samples = [rng.choice(corpus) for _ in range(params["repeat"])]
+        stats: dict[str, dict[str, float]] = {}
+
+        # 写入书籍信息和封面, 章节在下一项中逐个写入
+        def book_info(book: Book) -> Book:
+            info = Book(
+                book.title, book.author, book.state, book.desc,
+                tags=book.tags, sources=book.sources, other_info=book.other_info,
+            )
+            info.covers = book.covers
+            return info
+        stats["add_book"] = measure(manager.add_book, [book_info(i) for i in corpus])
+        stats["add_chapter"] = measure(
+            manager.add_chapter, [j for i in corpus for j in i.chapters],
+        )
+        # 查询书籍
+        stats["search_book_by_name"] = measure(
+            manager.search_book_by_name, [i.title for i in samples],
+        )
+        stats["search_book_by_hash"] = measure(
+            manager.search_book_by_hash, [hash_(i) for i in samples],
+        )
+        # 将数据库记录转换为书籍对象, 包括读取并解压所有章节
+        session_factory = sessionmaker(bind=db_manager.create_sqlite_engine(
+            Path("data/db/novel_dl_00000.sqlite"), read_only=True,
+        ))
+        with session_factory() as session:
+            records = list(session.scalars(select(BookTable).limit(params["repeat"])))
+            books = [record_to_book(i) for i in records]
+            session.expire_all()
+            stats["record_to_book"] = measure(record_to_book, records)
+        # 导出为 epub 和 TXT, 与 novel_dl.exporters 中的导出器相同
+        stats["get_epub"] = measure(
+            lambda book: epub.write_epub(BytesIO(), get_epub(book), {}), books,
+        )
+        stats["export_txt"] = measure(lambda book: str(book).encode("UTF-8"), books)
+        # 从 Tomato-Novel-Downloader 格式的 epub 文件导入
+        paths: list[Path] = []
+        for index, book in enumerate(books):
+            paths.append(Path(f"tnd_{index}.epub"))
+            write_tnd_epub(book, paths[-1])
+        stats["importer.tnd"] = measure(tnd, paths)
+        result.put(stats)
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float,
+) -> list[str]:
+    """输出与基线比较的结果表格, 返回出现回归的项目名称."""
+    print(f"{'项目':<22}{'中位数(毫秒)':>14}{'P95(毫秒)':>12}{'基线(毫秒)':>12}{'变化':>10}")
+    regressions: list[str] = []
+    for name, stats in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            change = mark = ""
+            old_text = "-"
+        else:
+            ratio = stats["median"] / old["median"] - 1
+            change = f"{ratio:+.1%}"
+            old_text = f"{old['median'] * 1000:.3f}"
+            mark = " 回归" if ratio > threshold else ""
+            if mark: regressions.append(name)
+        print(
+            f"{name:<22}{stats['median'] * 1000:>14.3f}{stats['p95'] * 1000:>12.3f}"
+            f"{old_text:>12}{change:>10}{mark}",
+        )
+    return regressions
+
+
+def main() -> None:
+    """运行测试套件, 保存结果并与基线比较."""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--books", type=int, default=200, help="生成的书籍数量")
+    parser.add_argument("--chapters", type=int, default=30, help="每本书籍的章节数")
+    parser.add_argument("--chapter-size", type=int, default=3000, help="每个章节的字数")
+    parser.add_argument("--shards", type=int, default=4, help="书籍分布的分片数量")
+    parser.add_argument("--repeat", type=int, default=20, help="查询和导出项目的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument(
+        "--output", type=Path, default=Path("storage_benchmark.json"), help="结果文件",
+    )
+    parser.add_argument("--baseline", type=Path, default=None, help="用于比较的基线结果文件")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="中位数变慢超过该比例时视为回归",
+    )
+    args = parser.parse_args()
+    params = {i: getattr(args, i) for i in PARAMS}
+    # 在独立的子进程中运行, 避免单例和模块状态影响当前进程
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_suite, args=(params, queue))
+    process.start()
+    results = queue.get()
+    process.join()
+    current = {
+        "params": params,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    args.output.write_text(
+        json.dumps(current, ensure_ascii=False, indent=2), encoding="UTF-8",
+    )
+    # 读取基线, 参数不同时只输出当前结果
+    baseline: dict[str, Any] = {}
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="UTF-8"))
+        if baseline.get("params") != params:
+            print(f"基线的参数 {baseline.get('params')} 与本次不同, 不进行比较.")
+            baseline = {}
+    regressions = compare(current, baseline, args.threshold)
+    print(f"结果已保存到 {args.output}.")
+    if regressions:
+        print(f"以下项目出现回归: {', '.join(regressions)}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
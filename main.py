@@ -5,15 +5,30 @@
 # @Author: Amundsen Severus Rubeus Bjaaland
 """项目的主入口, 用于启动爬虫和管理爬虫任务."""
 
+import os
+import time
+from collections import defaultdict
 from pathlib import Path
 
 import fire
-from ebooklib import epub
+from scrapy.crawler import CrawlerProcess
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.project import get_project_settings
 
+from novel_dl.entity.base import Book
 from novel_dl.settings import DATA_DIR
+from novel_dl.utils.batch_export import export_book, export_books
 from novel_dl.utils.db_manager import DBManager
-from novel_dl.utils.epub import get_epub
+from novel_dl.utils.fulltext import SHORT_QUERY_SCAN_LIMIT, is_short_query
+from novel_dl.utils.identify import hash_
 from novel_dl.utils.importer import tnd
+from novel_dl.utils.update_plan import plan_updates
+
+
+def split_option(value: str | tuple | list) -> list[str]:
+    """将逗号分隔的命令行参数拆分为列表, fire 可能已经将其解析为元组."""
+    if isinstance(value, str): value = value.split(",")
+    return [str(i).strip() for i in value if str(i).strip()]
 
 
 class Main:
@@ -29,20 +44,152 @@ class Main:
         db_manager.add_book(book)
         print(f"成功导入书籍: {book.title}.")
 
-    def export(self, name: str) -> None:
-        """导出数据的命令行接口."""
+    def rebuild_catalog(self) -> None:
+        """依据所有分片数据库重建路由目录的命令行接口."""
+        db_manager = DBManager()
+        total = db_manager.rebuild_catalog()
+        print(f"成功重建路由目录, 共登记 {total} 本书籍.")
+
+    def compress(self, train: bool = True) -> None:
+        """按照当前的压缩设置重新压缩所有章节内容的命令行接口, 用于迁移旧版本的分片."""
+        db_manager = DBManager()
+        result = db_manager.compress_chapters(train=train)
+        mib = 1024 * 1024
+        print(
+            f"共处理 {result.chapters} 个章节, 重新写入 {result.rewritten} 个章节, "
+            f"训练 {result.dictionaries} 个压缩字典, 用时 {result.elapsed:.2f} 秒 "
+            f"({result.chapters / max(result.elapsed, 1e-9):.0f} 章/秒).",
+        )
+        print(
+            f"章节内容: {result.content_before / mib:.2f} MiB -> "
+            f"{result.content_after / mib:.2f} MiB, "
+            f"数据库文件: {result.file_before / mib:.2f} MiB -> "
+            f"{result.file_after / mib:.2f} MiB.",
+        )
+
+    def search(self, query: str, limit: int = 20) -> None:
+        """全文搜索书籍信息和章节内容的命令行接口.
+
+        查询词以空白分隔, 至少三个字符的查询词使用全文索引. 所有查询词都短于三个字符时,
+        书籍信息和章节标题全部查找, 章节内容只在每个分片最近写入的 5000 个章节中查找,
+        加上一个较长的查询词可以搜索全部章节内容.
+        """
+        db_manager = DBManager()
+        hits = db_manager.search_fulltext(query, limit)
+        if is_short_query(query):
+            print(
+                f"查询词都短于三个字符, 章节内容只在每个分片最近写入的 "
+                f"{SHORT_QUERY_SCAN_LIMIT} 个章节中查找.",
+            )
+        if len(hits) == 0:
+            print(f"未找到包含 {query} 的书籍或章节.")
+            return
+        titles: dict[str, str] = {}
+        for hit in hits:
+            if hit.book_hash not in titles:
+                book = db_manager.search_book_by_hash(hit.book_hash)
+                titles[hit.book_hash] = f"{book.author}-{book.title}" if book else hit.book_hash[:8]
+            location = f"第 {hit.chapter_index} 章" if hit.chapter_index else "书籍信息"
+            print(f"{titles[hit.book_hash]} ({location}): {hit.snippet}")
+
+    def rebalance(self) -> None:
+        """重新平衡分片数据库的命令行接口, 执行时不能有其他进程写入数据库."""
+        db_manager = DBManager()
+        result = db_manager.rebalance()
+        print(
+            f"移动 {result.moved} 本书籍, 新建 {result.created} 个分片, "
+            f"删除 {result.removed} 个分片, 用时 {result.elapsed:.2f} 秒.",
+        )
+
+    def export(self, name: str, workers: int = 0) -> None:
+        """导出数据的命令行接口.
+
+        workers 为并行导出的进程数, 为 0 时使用 CPU 核心数, 为 1 时在当前进程中逐本导出.
+        """
         output_dir = DATA_DIR / "export"
         if not output_dir.exists():
             output_dir.mkdir(parents=True, exist_ok=True)
         db_manager = DBManager()
-        book_list = db_manager.search_book_by_name(name)
-        if len(book_list) == 0:
+        hash_list = [hash_(i) for i in db_manager.search_book_by_name(name)]
+        if len(hash_list) == 0:
             print(f"未找到书籍: {name}.")
             return
-        for book_obj in book_list:
-            book = get_epub(book_obj)
-            epub.write_epub(str(output_dir / f"{book_obj.author}-{book_obj.title}.epub"), book, {})
-            print(f"成功导出: {book_obj.title}.")
+        workers = min(workers or os.cpu_count() or 1, len(hash_list))
+        start = time.perf_counter()
+        if workers <= 1:
+            results = (export_book(i, output_dir, db_manager) for i in hash_list)
+        else:
+            results = export_books(hash_list, output_dir, workers)
+        books = chapters = size = 0
+        for result in results:
+            if result is None: continue
+            books += 1
+            chapters += result.chapters
+            size += result.size
+            print(
+                f"成功导出: {result.title}, {result.chapters} 章, "
+                f"{result.size / 1024 / 1024:.2f} MiB, 用时 {result.elapsed:.2f} 秒.",
+            )
+        elapsed = time.perf_counter() - start
+        print(
+            f"共导出 {books} 本书籍, 用时 {elapsed:.2f} 秒 ({workers} 个进程), "
+            f"{books / elapsed:.2f} 本/秒, {chapters / elapsed:.0f} 章/秒, "
+            f"{size / 1024 / 1024 / elapsed:.2f} MiB/秒.",
+        )
+
+    def update(
+        self, state: str = "连载,断更", domain: str = "", min_age: float = 1.0,
+        limit: int = 0, dry_run: bool = False,
+    ) -> None:
+        """批量检查书籍更新的命令行接口.
+
+        state 和 domain 为逗号分隔的书籍状态和来源域名, domain 为空时检查所有有对应爬虫的网站;
+        min_age 为距离最近一次章节更新的最少天数, limit 为最多检查的书籍数, 为 0 时不限制.
+        书籍按照预计错过的章节数排列, 同一网站的书籍由同一个爬虫依次检查, 遵守该网站的并发设置.
+        dry_run 为 True 时只输出检查计划.
+        """
+        os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "novel_dl.settings")
+        settings = get_project_settings()
+        # 检查更新时跳过已经完整保存的章节, 并对书籍页面和章节列表页面发送条件请求
+        settings.set("INCREMENTAL_ENABLED", value=True)
+        settings.set("CONDITIONAL_REQUESTS_ENABLED", value=True)
+        # 找到每个网站对应的爬虫
+        spider_loader = SpiderLoader.from_settings(settings)
+        spiders = {spider_loader.load(i).domain: i for i in spider_loader.list()}
+        # 选出需要检查更新的书籍
+        unknown = [i for i in split_option(state) if i not in Book.state_shift_1]
+        if unknown:
+            print(f"未知的书籍状态: {', '.join(unknown)}.")
+            return
+        states = [Book.state_shift_1[i] for i in split_option(state)]
+        db_manager = DBManager()
+        candidates = db_manager.update_candidates(
+            states, settings.getint("UPDATE_RECENT_CHAPTERS", 20),
+        )
+        plan = plan_updates(
+            candidates, spiders, domains=split_option(domain), min_age=min_age * 86400,
+            limit=limit, default_interval=settings.getfloat("UPDATE_DEFAULT_INTERVAL"),
+        )
+        print(f"共 {len(candidates)} 本候选书籍, 计划检查 {len(plan)} 本.")
+        if len(plan) == 0: return
+        # 输出检查计划
+        day = 86400
+        groups: defaultdict[str, list[str]] = defaultdict(list)
+        for i in plan:
+            groups[i.spider].append(i.url)
+            if dry_run or len(plan) <= 20:
+                print(
+                    f"{i.author}-{i.title} ({i.spider}): 已 {i.age / day:.1f} 天未更新, "
+                    f"更新间隔 {i.interval / day:.1f} 天, 更新概率 {i.probability:.0%}, "
+                    f"预计新增 {i.score:.1f} 章.",
+                )
+        if dry_run: return
+        # 每个网站的书籍交给同一个爬虫, 所有爬虫在同一个进程中运行
+        process = CrawlerProcess(settings)
+        for spider, urls in groups.items():
+            print(f"{spider}: 检查 {len(urls)} 本书籍.")
+            process.crawl(spider, novel_urls=urls)
+        process.start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: dupefilters.py
+# @Time: 17/10/2026 01:40
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""持久化且内存有界的请求去重过滤器.
+
+请求指纹由 Scrapy 的请求指纹生成器(REQUEST_FINGERPRINTER_IMPLEMENTATION)计算,
+完整的指纹集合保存在 SQLite 数据库中, 内存中只保留一个可扩展的布隆过滤器:
+布隆过滤器判断为未见过的请求一定是新的请求, 判断为见过的请求再到数据库中确认.
+数据库按照爬虫名称和指纹实现分别保存, 爬虫重启后会从数据库中重建布隆过滤器.
+"""
+
+
+# 导入标准库
+import time
+from typing import TYPE_CHECKING
+
+# 导入第三方库
+from scrapy.dupefilters import RFPDupeFilter
+from sqlalchemy import Connection, text
+
+# 导入自定义库
+from novel_dl.settings import DUPEFILTER_DIR
+from novel_dl.templates import GeneralSpider
+from novel_dl.utils.bloom import ScalableBloomFilter
+from novel_dl.utils.db_manager import create_sqlite_engine
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from scrapy.crawler import Crawler
+    from scrapy.http import Request
+    from scrapy.statscollectors import StatsCollector
+    from scrapy.utils.request import RequestFingerprinterProtocol
+
+
+class PersistentDupeFilter(RFPDupeFilter):
+    """持久化且内存有界的请求去重过滤器.
+
+    只有以列表模式运行的 GeneralSpider 会将指纹保存到数据库中(可以通过 DUPEFILTER_PERSIST 关闭),
+    书籍模式需要在每次运行时重新获取书籍页面和章节列表, 因此只在本次运行中去重.
+    布隆过滤器占用的内存不超过 DUPEFILTER_MEMORY 字节, 实际误判率和估计误判率记录在统计信息中.
+    """
+
+    def __init__(
+        self, path: "Path | None" = None, debug: bool = False, *,
+        fingerprinter: "RequestFingerprinterProtocol | None" = None,
+        stats: "StatsCollector | None" = None, capacity: int = 1_000_000,
+        error_rate: float = 0.001, max_memory: int = 64 * 1024 ** 2,
+        flush_size: int = 1000,
+    ) -> None:
+        """初始化去重过滤器, path 为空时不保存指纹."""
+        super().__init__(None, debug, fingerprinter=fingerprinter)
+        self.path = path
+        self.stats = stats
+        self.bloom = ScalableBloomFilter(capacity, error_rate, max_memory)
+        # 尚未写入数据库的指纹, 不保存指纹时即为完整的指纹集合
+        self.pending: set[bytes] = set()
+        self.flush_size = flush_size
+        self.connection: Connection | None = None
+        # 本次运行中的新请求数, 以及其中被布隆过滤器误判为见过的请求数
+        self.new_requests = 0
+        self.false_positives = 0
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "PersistentDupeFilter":
+        """从爬虫设置中读取参数并创建去重过滤器."""
+        assert crawler.request_fingerprinter
+        settings = crawler.settings
+        # 数据库文件以爬虫名称和指纹实现命名, 更换指纹实现后不会使用旧的指纹
+        path = None
+        spider = crawler.spider
+        if settings.getbool("DUPEFILTER_PERSIST", default=True) and \
+            isinstance(spider, GeneralSpider) and spider.mode is GeneralSpider.Mode.LIST:
+            implementation = settings.get("REQUEST_FINGERPRINTER_IMPLEMENTATION", "")
+            path = DUPEFILTER_DIR / f"{spider.name}-{implementation}.sqlite"
+        return cls(
+            path, settings.getbool("DUPEFILTER_DEBUG"),
+            fingerprinter=crawler.request_fingerprinter, stats=crawler.stats,
+            capacity=settings.getint("DUPEFILTER_CAPACITY", 1_000_000),
+            error_rate=settings.getfloat("DUPEFILTER_ERROR_RATE", 0.001),
+            max_memory=settings.getint("DUPEFILTER_MEMORY", 64 * 1024 ** 2),
+            flush_size=settings.getint("DUPEFILTER_FLUSH_SIZE", 1000),
+        )
+
+    def open(self) -> None:
+        """打开指纹数据库, 并用已保存的指纹重建布隆过滤器."""
+        if self.path is None: return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        self.connection = create_sqlite_engine(self.path, "bulk-ingest").connect()
+        self.connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS fingerprints "
+            "(fingerprint BLOB PRIMARY KEY) WITHOUT ROWID",
+        ))
+        self.connection.commit()
+        for (fingerprint,) in self.connection.execute(
+            text("SELECT fingerprint FROM fingerprints"),
+        ):
+            self.bloom.add(fingerprint)
+        self.logger.info(
+            f"从 {self.path} 中读取 {len(self.bloom)} 个请求指纹, "
+            f"用时 {time.perf_counter() - start:.2f} 秒.",
+        )
+        self.__record_stats()
+
+    def request_seen(self, request: "Request") -> bool:
+        """判断请求是否已经见过, 没有见过的请求会被记录."""
+        fingerprint = self.fingerprinter.fingerprint(request)
+        # 布隆过滤器判断为见过时, 到指纹集合中确认
+        if fingerprint in self.bloom:
+            if self.__stored(fingerprint): return True
+            self.false_positives += 1
+        # 记录新的指纹
+        self.new_requests += 1
+        self.bloom.add(fingerprint)
+        self.pending.add(fingerprint)
+        if self.connection is not None and len(self.pending) >= self.flush_size:
+            self.flush()
+        return False
+
+    def flush(self) -> None:
+        """将尚未保存的指纹写入数据库."""
+        if self.connection is None or not self.pending: return
+        self.connection.execute(
+            text("INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (:fingerprint)"),
+            [{"fingerprint": i} for i in self.pending],
+        )
+        self.connection.commit()
+        self.pending.clear()
+        self.__record_stats()
+
+    def close(self, reason: str) -> None:  # noqa: ARG002
+        """保存剩余的指纹并关闭数据库, 记录去重的统计信息."""
+        self.flush()
+        self.__record_stats()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.logger.info(
+            f"请求去重: 共 {len(self.bloom)} 个指纹, "
+            f"布隆过滤器 {len(self.bloom.filters)} 个, "
+            f"占用 {self.bloom.memory / 1024 / 1024:.2f} MiB, "
+            f"估计误判率 {self.bloom.estimated_error_rate:.4%}, "
+            f"实际误判 {self.false_positives}/{self.new_requests} 次.",
+        )
+        if self.bloom.saturated:
+            self.logger.warning("布隆过滤器已达到内存上限 DUPEFILTER_MEMORY, 误判率会逐渐升高.")
+
+    def __stored(self, fingerprint: bytes) -> bool:
+        # 检查指纹是否在尚未保存的指纹或数据库中
+        if fingerprint in self.pending: return True
+        if self.connection is None: return False
+        return self.connection.execute(
+            text("SELECT 1 FROM fingerprints WHERE fingerprint = :fingerprint"),
+            {"fingerprint": fingerprint},
+        ).first() is not None
+
+    def __record_stats(self) -> None:
+        # 将布隆过滤器的状态记录到统计信息中
+        if self.stats is None: return
+        self.stats.set_value("dupefilter/fingerprints", len(self.bloom))
+        self.stats.set_value("dupefilter/bloom_filters", len(self.bloom.filters))
+        self.stats.set_value("dupefilter/bloom_memory", self.bloom.memory)
+        self.stats.set_value(
+            "dupefilter/bloom_error_rate_estimated", self.bloom.estimated_error_rate,
+        )
+        self.stats.set_value("dupefilter/bloom_false_positives", self.false_positives)
+        self.stats.set_value(
+            "dupefilter/bloom_error_rate_observed",
+            self.false_positives / self.new_requests if self.new_requests else 0.0,
+        )
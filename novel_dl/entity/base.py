@@ -9,14 +9,20 @@
 # 导入标准库
 import copy
 import time
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Sequence
 from io import BytesIO
+from operator import attrgetter
+from typing import overload
 
 # 导入第三方库
 from PIL import Image
 
 # 导入自定义库: 获取自定义设置
 from novel_dl import settings
-from novel_dl.utils.identify import hash_
+from novel_dl.utils.cover_store import load_jpg, save_jpg
+from novel_dl.utils.identify import HASH_CACHE, hash_
+from novel_dl.utils.image_probe import probe_image
 
 
 # 获取图片存储路径, 如果没有设置则使用默认路径
@@ -25,36 +31,87 @@ IMAGES_STORE = settings.IMAGES_STORE \
 
 
 class Cover:
-    """封面类, 用于存储书籍封面信息."""
+    """封面类, 用于存储书籍封面信息.
 
-    def __init__(self, source: str, data: bytes) -> None:
-        """初始化封面对象."""
+    图片的宽度、高度和格式在创建时只通过文件头获取, 像素数据在首次访问 image 时才解码.
+    """
+
+    def __init__(
+        self, source: str, data: bytes, width: int | None = None,
+        height: int | None = None, image_format: str | None = None,
+    ) -> None:
+        """初始化封面对象, 如果没有传入图片的尺寸和格式, 则从文件头中读取."""
         # 初始化封面对象
         self.source = source
         self.data = data
-        self.image = Image.open(BytesIO(data))
+        # 获取图片的尺寸和格式
+        if width is None or height is None or image_format is None:
+            width, height, image_format = probe_image(data)
+        self.width = width
+        self.height = height
+        self.format = image_format
 
     def __repr__(self) -> str:
         return f"<Cover length={len(self.data)} source={self.source}>"
 
+    def __setattr__(self, name: str, value: object) -> None:
+        # 图片数据改变时, 缓存的 hash 值和解码的图片失效
+        if name == "data":
+            self.__dict__.pop(HASH_CACHE, None)
+            self.__dict__.pop("_image", None)
+        super().__setattr__(name, value)
+
+    @property
+    def image(self) -> Image.Image:
+        """解码后的图片, 首次访问时才解码."""
+        if "_image" not in self.__dict__:
+            self.__dict__["_image"] = Image.open(BytesIO(self.data))
+        return self.__dict__["_image"]
+
+    @image.setter
+    def image(self, value: Image.Image) -> None:
+        self.__dict__["_image"] = value
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """图片的宽度和高度, 不需要解码图片."""
+        return self.width, self.height
+
     def to_jpg(self) -> "Cover":
-        """将图片转换为 JPG 格式, 并将结果存储回 data 属性中."""
-        # 确认图片是否存在透明通道
-        if self.image.mode in ("RGBA", "P"):
-            # 创建一个白色背景
-            background = Image.new("RGB", self.image.size, (255, 255, 255))
-            # 将原图粘贴上去, 其中遮罩设置为透明通道
-            background.paste(self.image, mask=self.image.split()[-1])
-            # 获取新的图片
-            self.image = background
-        # 创建内存中文件
-        memory_file = BytesIO()
-        # 将图片保存
-        self.image.save(memory_file, format="JPEG", quality=95)
-        # 将图片原值改变为内存文件的内容
-        self.data = memory_file.getvalue()
+        """将图片转换为 JPG 格式, 并将结果存储回 data 属性中.
+
+        转换结果以原图的 hash 值为键缓存在封面存储中, 相同的图片只会转换一次.
+        转换后的数据同时记录在对象中, 再次调用时直接返回, 不会以转换后的数据为键重新转换.
+        """
+        # 已经转换过且数据没有改变时, 直接使用转换后的数据
+        if self.__dict__.get("_jpg_data") is self.data:
+            return Cover(self.source, self.data, self.width, self.height, "JPEG")
+        # 优先使用缓存的转换结果, 缓存以原图数据的 hash 值为键
+        cover_hash = hash_(self)
+        data = load_jpg(cover_hash)
+        if data is None:
+            image = self.image
+            # 确认图片是否存在透明通道
+            if image.mode in ("RGBA", "P"):
+                # 创建一个白色背景
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                # 将原图粘贴上去, 其中遮罩设置为透明通道
+                background.paste(image, mask=image.split()[-1])
+                # 获取新的图片
+                image = background
+            # 创建内存中文件
+            memory_file = BytesIO()
+            # 将图片保存
+            image.save(memory_file, format="JPEG", quality=95)
+            data = memory_file.getvalue()
+            # 缓存转换结果
+            save_jpg(cover_hash, data)
+        # 将图片原值改变为转换后的内容, 并记录转换后的数据
+        self.data = data
+        self.format = "JPEG"
+        self.__dict__["_jpg_data"] = data
         # 返回新的封面对象
-        return Cover(self.source, self.data)
+        return Cover(self.source, data, self.width, self.height, "JPEG")
 
 
 class Chapter:
@@ -62,21 +119,26 @@ class Chapter:
 
     def __init__(
         self, book_hash: str, index: int,
-        title: str, update_time: float, content: str,
-        sources: list[str], other_info: dict[str, str],
+        title: str, update_time: float, content: str, *,
+        sources: list[str] | None = None, other_info: dict[str, str] | None = None,
     ) -> None:
-        """初始化章节对象."""
+        """初始化章节对象, 来源列表和其他信息默认为空."""
         self.book_hash = book_hash
         self.index = index
         self.title = title
         self.update_time = update_time
         self.content = content
-        self.sources = sources
-        self.other_info = other_info
+        self.sources = [] if sources is None else sources
+        self.other_info = {} if other_info is None else other_info
 
     def __repr__(self) -> str:
         return f"<Chapter index={self.index} title={self.title}>"
 
+    def __setattr__(self, name: str, value: object) -> None:
+        # 章节索引或标题改变时, 缓存的 hash 值失效
+        if name in {"index", "title"}: self.__dict__.pop(HASH_CACHE, None)
+        super().__setattr__(name, value)
+
     def __str__(self) -> str:
         if self.update_time:
             return (
@@ -90,25 +152,41 @@ class Chapter:
         )
 
     def __add__(self, other: "Chapter") -> "Chapter":
+        # 在浅复制的章节对象上合并, 原有的两个章节对象都不会被修改
+        return self.copy().merge(other)
+
+    def copy(self) -> "Chapter":
+        """浅复制章节对象.
+
+        新章节与原章节共享章节内容等不可变的值, 来源列表和其他信息字典则会被复制,
+        修改新章节不会影响原章节.
+        """
+        new_chapter = copy.copy(self)
+        new_chapter.sources = list(self.sources)
+        new_chapter.other_info = dict(self.other_info)
+        return new_chapter
+
+    def merge(self, other: "Chapter") -> "Chapter":
+        """将另一个章节对象的信息合并到该章节对象中, 并返回该章节对象.
+
+        合并规则与 + 运算符相同, 但不会创建新的章节对象.
+        """
         # 确认两个章节对象是否可以合并, 即判断两个章节对象指代的数据是否相同
         if hash_(self) != hash_(other):
             raise ValueError("将章节对象合并时, 要求两者的 hash 相同.")
-        # 创建一个新的章节对象, 以便合并两个章节对象
-        new_chapter = copy.deepcopy(self)
         # 如果两个章节的更新时间不同, 取较新的更新时间
-        if self.update_time < other.update_time:
-            new_chapter.update_time = other.update_time
+        self.update_time = max(self.update_time, other.update_time)
         # 如果两个章节的内容长度不同, 取较长的内容
         if len(self.content) < len(other.content):
-            new_chapter.content = other.content
+            self.content = other.content
         # 合并章节的来源, 使用 set 去重
-        new_chapter.sources = list(set(self.sources + other.sources))
-        # 合并章节的其他信息, 将不存在的键添加到新章节中
+        self.sources = list(set(self.sources + other.sources))
+        # 合并章节的其他信息, 将不存在的键添加到该章节中
         for key, item in other.other_info.items():
-            if key not in new_chapter.other_info:
-                new_chapter.other_info[key] = item
-        # 返回合并后的新章节对象
-        return new_chapter
+            if key not in self.other_info:
+                self.other_info[key] = item
+        # 返回合并后的章节对象
+        return self
 
     @property
     def update_time_str(self) -> str:
@@ -123,6 +201,92 @@ class Chapter:
         )
 
 
+class ChapterList(Sequence[Chapter]):
+    """章节列表, 始终按照章节索引升序排列.
+
+    除列表的读取操作外, 还可以通过章节索引以 O(log n) 的复杂度查找章节,
+    按索引顺序追加章节的复杂度为 O(1). 由于章节的 hash 值由章节索引和标题生成,
+    hash 值相同的章节索引一定相同, 因此按索引查找同样可以找到 hash 值相同的章节.
+    """
+
+    def __init__(self, chapters: Iterable[Chapter] = ()) -> None:
+        """初始化章节列表, 传入的章节会按照索引进行稳定排序."""
+        self._chapters: list[Chapter] = sorted(chapters, key=attrgetter("index"))
+        # 与章节一一对应的索引列表, 用于二分查找
+        self._indexes: list[int] = [i.index for i in self._chapters]
+
+    def __repr__(self) -> str:
+        return f"ChapterList({self._chapters!r})"
+
+    def __len__(self) -> int:
+        return len(self._chapters)
+
+    def __iter__(self) -> Iterator[Chapter]:
+        return iter(self._chapters)
+
+    @overload
+    def __getitem__(self, position: int) -> Chapter: ...
+    @overload
+    def __getitem__(self, position: slice) -> list[Chapter]: ...
+    def __getitem__(self, position: int | slice) -> Chapter | list[Chapter]:
+        return self._chapters[position]
+
+    def __setitem__(self, position: int, chapter: Chapter) -> None:
+        # 替换章节时不能改变章节索引, 否则会破坏列表的顺序
+        if chapter.index != self._indexes[position]:
+            raise ValueError("替换章节时, 要求新章节的索引与原章节相同.")
+        self._chapters[position] = chapter
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChapterList):
+            return self._chapters == other._chapters
+        if isinstance(other, list):
+            return self._chapters == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def find(self, index: int) -> int:
+        """查找第一个索引为 index 的章节的位置, 如果不存在则返回 -1."""
+        position = bisect_left(self._indexes, index)
+        if position < len(self._indexes) and self._indexes[position] == index:
+            return position
+        return -1
+
+    def get(self, index: int) -> Chapter | None:
+        """获取第一个索引为 index 的章节, 如果不存在则返回 None."""
+        position = self.find(index)
+        return self._chapters[position] if position >= 0 else None
+
+    def append(self, chapter: Chapter) -> None:
+        """按照章节索引将章节插入到合适的位置, 不会合并索引相同的章节."""
+        # 按顺序追加时直接添加到末尾
+        if not self._indexes or chapter.index >= self._indexes[-1]:
+            self._chapters.append(chapter)
+            self._indexes.append(chapter.index)
+            return
+        # 否则插入到索引相同的章节之后, 保持插入顺序
+        position = bisect_right(self._indexes, chapter.index)
+        self._chapters.insert(position, chapter)
+        self._indexes.insert(position, chapter.index)
+
+    def extend(self, chapters: Iterable[Chapter]) -> None:
+        """依次插入多个章节."""
+        for chapter in chapters: self.append(chapter)
+
+    def copy(self) -> "ChapterList":
+        """浅复制章节列表, 新列表与原列表共享章节对象."""
+        new_list = ChapterList()
+        new_list._chapters = list(self._chapters)
+        new_list._indexes = list(self._indexes)
+        return new_list
+
+    def sort(self) -> None:
+        """重新按照章节索引排序, 用于章节的索引在插入后被修改的情况."""
+        self._chapters.sort(key=attrgetter("index"))
+        self._indexes = [i.index for i in self._chapters]
+
+
 class Book:
     """书籍类, 用于存储书籍的基本信息和相关内容."""
 
@@ -130,23 +294,29 @@ class Book:
     state_shift_2 = {0: "未知", 1: "断更", 2: "连载", 3: "完结"}
 
     def __init__(
-        self, title: str, author: str, state: str, desc: str,
-        tags: list[str], sources: list[str], other_info: dict[str, str],
+        self, title: str, author: str, state: str, desc: str, *,
+        tags: list[str] | None = None, sources: list[str] | None = None,
+        other_info: dict[str, str] | None = None,
     ) -> None:
-        """初始化书籍对象."""
+        """初始化书籍对象, 标签、来源列表和其他信息默认为空."""
         self.title = title
         self.author = author
         self.state = state
         self.desc = desc
-        self.tags = tags
-        self.sources = sources
-        self.other_info = other_info
+        self.tags = [] if tags is None else tags
+        self.sources = [] if sources is None else sources
+        self.other_info = {} if other_info is None else other_info
         self.covers: list[Cover] = []
-        self.chapters: list[Chapter] = []
+        self._chapters = ChapterList()
 
     def __repr__(self) -> str:
         return f"<Book title={self.title} author={self.author}>"
 
+    def __setattr__(self, name: str, value: object) -> None:
+        # 书名或作者改变时, 缓存的 hash 值失效
+        if name in {"title", "author"}: self.__dict__.pop(HASH_CACHE, None)
+        super().__setattr__(name, value)
+
     def __str__(self) -> str:
         tag_text = ""
         if self.tags:
@@ -161,47 +331,75 @@ class Book:
         )
 
     def __add__(self, other: "Book") -> "Book":
+        # 在浅复制的书籍对象上合并, 原有的两个书籍对象都不会被修改
+        return self.copy().merge(other)
+
+    def copy(self) -> "Book":
+        """浅复制书籍对象.
+
+        新书籍与原书籍共享封面和章节对象, 各个列表和字典则会被复制,
+        向新书籍中添加或合并章节不会影响原书籍.
+        """
+        new_book = copy.copy(self)
+        new_book.tags = list(self.tags)
+        new_book.sources = list(self.sources)
+        new_book.other_info = dict(self.other_info)
+        new_book.covers = list(self.covers)
+        new_book.chapters = self.chapters.copy()
+        return new_book
+
+    def merge(self, other: "Book") -> "Book":
+        """将另一个书籍对象的信息合并到该书籍对象中, 并返回该书籍对象.
+
+        合并规则与 + 运算符相同, 但不会复制书籍对象. 已有的章节对象不会被修改,
+        需要合并的章节会被替换为合并后的新章节对象.
+        """
         # 确认两个书籍对象是否可以合并, 即判断两个书籍对象指代的数据是否相同
         if hash_(self) != hash_(other):
             raise ValueError("将书籍对象合并时, 要求两者的 hash 相同.")
-        # 创建一个新的书籍对象, 以便合并两个书籍对象
-        new_book = copy.deepcopy(self)
         # 如果两本书籍的状态不同, 取较高优先级的状态
         if self.state_shift_1[self.state] < self.state_shift_1[other.state]:
-            new_book.state = other.state
+            self.state = other.state
         # 如果两本书籍的简介长度不同, 取较长的简介
         if len(self.desc) < len(other.desc):
-            new_book.desc = other.desc
+            self.desc = other.desc
         # 合并书籍的标签和来源, 使用 set 去重
-        new_book.tags = list(set(self.tags + other.tags))
-        new_book.sources = list(set(self.sources + other.sources))
-        # 合并书籍的其他信息, 将不存在的键添加到新书籍中
+        self.tags = list(set(self.tags + other.tags))
+        self.sources = list(set(self.sources + other.sources))
+        # 合并书籍的其他信息, 将不存在的键添加到该书籍中
         for key, item in other.other_info.items():
-            if key not in new_book.other_info:
-                new_book.other_info[key] = item
+            if key not in self.other_info:
+                self.other_info[key] = item
         # 合并书籍的封面, 使用对象的 hash 值确保不重复
-        cover_hashes = [hash_(i) for i in self.covers]
+        cover_hashes = {hash_(i) for i in self.covers}
         for one_cover in other.covers:
             if hash_(one_cover) not in cover_hashes:
-                new_book.covers.append(one_cover)
-        # 合并书籍的章节
+                self.covers.append(one_cover)
+                cover_hashes.add(hash_(one_cover))
+        # 合并书籍的章节, 章节列表始终按照索引升序排列
         for one_chapter in other.chapters:
-            new_book.append(one_chapter)
-        # 对合并后的章节进行排序, 按照章节索引升序排列
-        new_book.chapters.sort(key=lambda x: x.index)
-        # 返回合并后的新书籍对象
-        return new_book
+            self.append(one_chapter)
+        # 返回合并后的书籍对象
+        return self
+
+    @property
+    def chapters(self) -> ChapterList:
+        """书籍的章节列表, 始终按照章节索引升序排列. 赋值时会转换为 ChapterList."""
+        return self._chapters
+
+    @chapters.setter
+    def chapters(self, value: Iterable[Chapter]) -> None:
+        self._chapters = value if isinstance(value, ChapterList) \
+            else ChapterList(value)
 
     @property
     def update_time(self) -> float:
         """获取书籍的最新更新时间(float), 即最后更新的章节的更新时间.
 
-        如果书籍没有章节, 则返回 0.0. 该方法会对章节排序.
+        如果书籍没有章节, 则返回 0.0.
         """
         # 检查书籍是否有章节, 如果没有则返回 0.0
         if not self.chapters: return 0.0
-        # 对章节进行排序
-        self.sort_chapters()
         # 返回最后一个章节的更新时间
         return self.chapters[-1].update_time
 
@@ -209,26 +407,22 @@ class Book:
     def update_time_str(self) -> str:
         """获取书籍的更新时间(str), 即最后更新的章节的更新时间.
 
-        如果书籍没有章节或章节没有更新时间数据, 则返回 Unknown. 该方法会对章节排序.
+        如果书籍没有章节或章节没有更新时间数据, 则返回 Unknown.
         """
         # 检查书籍是否有章节, 如果没有则返回 Unknown.
         if not self.chapters: return "Unknown"
-        # 对章节进行排序
-        self.sort_chapters()
         # 返回最后一个章节的更新时间
         return self.chapters[-1].update_time_str
 
     @property
-    def main_cover(self) -> None | Cover:
+    def main_cover(self) -> Cover | None:
         """获取书籍的主封面, 逻辑为选取面积最大的一张."""
         # 中间变量, 用于存储主封面和最大面积以进行比较
         cover = None
         size = 0
         for i in self.covers:
-            # 获取图片的尺寸
-            width, height = i.image.size
-            # 计算面积
-            image_size = width * height
+            # 计算面积, 图片的尺寸来自文件头, 不需要解码图片
+            image_size = i.width * i.height
             # 如果面积更大, 则更新主封面
             if image_size > size:
                 cover = i
@@ -242,23 +436,27 @@ class Book:
             raise ValueError(
                 "向书籍对象中添加章节时, 要求章节的 book_hash 与书籍的 hash 相同.",
             )
-        # 遍历现有章节
-        for index, one_chapter in enumerate(self.chapters):
-            # 如果章节已经存在, 则合并章节信息
-            if hash_(one_chapter) == hash_(chapter):
-                self.chapters[index] = one_chapter + chapter
-                return
-            # 如果 hash 值不同但索引相同, 则认为是同一章节, 进行合并(消除章节名差异)
-            if one_chapter.index == chapter.index:
-                if len(one_chapter.title) < len(chapter.title):
-                    one_chapter.title = chapter.title
-                else:
-                    chapter.title = one_chapter.title
-                self.chapters[index] = one_chapter + chapter
-                return
-        # 如果章节不存在, 则直接添加章节
-        self.chapters.append(chapter)
+        # 通过章节索引查找已有的章节, 如果章节不存在, 则直接添加章节
+        position = self.chapters.find(chapter.index)
+        if position < 0:
+            self.chapters.append(chapter)
+            return
+        one_chapter = self.chapters[position]
+        # 如果索引相同但标题不同(即 hash 值不同), 也认为是同一章节, 先消除章节名差异
+        # 章节对象可能被其他书籍共享, 因此在副本上修改标题
+        if one_chapter.title != chapter.title:
+            if len(one_chapter.title) < len(chapter.title):
+                one_chapter = one_chapter.copy()
+                one_chapter.title = chapter.title
+            else:
+                chapter = chapter.copy()
+                chapter.title = one_chapter.title
+        # 合并章节信息, 合并结果是新的章节对象
+        self.chapters[position] = one_chapter + chapter
 
     def sort_chapters(self) -> None:
-        """对书籍的章节进行排序, 按照章节索引升序排列."""
-        self.chapters.sort(key=lambda x: x.index)
+        """对书籍的章节进行排序, 按照章节索引升序排列.
+
+        章节列表始终保持有序, 只有在章节的索引被直接修改后才需要调用该方法.
+        """
+        self.chapters.sort()
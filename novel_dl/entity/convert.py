@@ -16,7 +16,10 @@ from novel_dl.entity.models import (
     BookTable, ChapterTable, CoverTable, BookSourceTable, ChapterSourceTable,
 )
 from novel_dl.settings import IMAGES_STORE
+from novel_dl.utils.chapter_codec import chapter_scope, decode_content, encode_content
+from novel_dl.utils.cover_store import load_cover, save_cover
 from novel_dl.utils.identify import hash_
+from novel_dl.utils.str_deal import index_words
 
 
 if TYPE_CHECKING:
@@ -39,16 +42,24 @@ def item_to_cover(item: BookItem) -> Iterable[Cover]:
 
 
 def record_to_cover(record: CoverTable) -> Cover:
-    """将数据库记录转换为 Cover 对象."""
-    return Cover(source=record.source, data=record.image)
+    """将数据库记录转换为 Cover 对象, 图片数据从封面存储中读取."""
+    return Cover(
+        source       = record.source,
+        data         = load_cover(record.cover_hash),
+        width        = record.width,
+        height       = record.height,
+        image_format = record.format or None,
+    )
 
 
 def cover_to_record(cover: Cover) -> CoverTable:
-    """将 Cover 对象转换为数据库记录."""
+    """将 Cover 对象转换为数据库记录, 图片数据会保存到封面存储中."""
     return CoverTable(
-        cover_hash = hash_(cover),
+        cover_hash = save_cover(cover.data, hash_(cover)),
         source     = cover.source,
-        image      = cover.data,
+        width      = cover.width,
+        height     = cover.height,
+        format     = cover.format,
     )
 
 
@@ -72,21 +83,24 @@ def record_to_chapter(record: ChapterTable) -> Chapter:
         index       = record.index,
         title       = record.title,
         update_time = record.update_time,
-        content     = record.content,
+        content     = decode_content(record.content),
         sources     = [i.url for i in record.sources],
         other_info  = record.other_info,
     )
 
 
 def chapter_to_record(chapter: Chapter) -> ChapterTable:
-    """将 Chapter 对象转换为数据库记录."""
+    """将 Chapter 对象转换为数据库记录, 章节内容会被压缩."""
     return ChapterTable(
         chapter_hash = hash_(chapter),
         index        = chapter.index,
         title        = chapter.title,
         update_time  = chapter.update_time,
-        content      = chapter.content,
+        content      = encode_content(
+            chapter.content, chapter_scope(chapter.book_hash, chapter.sources),
+        ),
         other_info   = chapter.other_info,
+        content_length = len(chapter.content),
         book_hash    = chapter.book_hash,
         sources      = [
             ChapterSourceTable(url_hash = hash_(i), url = i)
@@ -143,3 +157,14 @@ def book_to_record(book: Book) -> BookTable:
         covers     = [cover_to_record(i) for i in book.covers],
         chapters   = [chapter_to_record(i) for i in book.chapters],
     )
+
+
+def book_to_index_rows(
+    book_hash: str, title: str, author: str,
+) -> list[dict[str, str]]:
+    """生成书籍在索引表中的记录, 以字典的形式返回, 用于批量插入."""
+    return [
+        {"word": word, "field": field, "book_hash": book_hash}
+        for field, text in (("title", title), ("author", author))
+        for word in index_words(text)
+    ]
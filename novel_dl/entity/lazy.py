@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: lazy.py
+# @Time: 16/10/2026 10:05
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""延迟加载的书籍和章节对象.
+
+从数据库中读取书籍时, 章节只包含元数据, 章节内容在首次访问时才按批次读取,
+封面在首次访问时才读取并解析. 这样只需要书籍基本信息的调用方不必读取整本小说.
+"""
+
+
+# 导入标准库
+from collections import defaultdict
+from collections.abc import Callable
+from typing import Any
+
+# 导入第三方库
+from sqlalchemy import select
+from sqlalchemy.orm import Session, object_session, scoped_session
+
+# 导入自定义库
+from novel_dl.entity.base import Book, Chapter, Cover
+from novel_dl.entity.convert import record_to_cover
+from novel_dl.entity.models import (
+    BookTable,
+    ChapterSourceTable,
+    ChapterTable,
+    CoverTable,
+)
+from novel_dl.utils.chapter_codec import decode_content
+from novel_dl.utils.cover_store import has_cover
+
+
+# 每次读取章节内容的数量
+BATCH_SIZE = 200
+
+
+class ContentLoader:
+    """章节内容加载器, 按批次从数据库中读取同一本书籍的章节内容."""
+
+    def __init__(
+        self, session_factory: scoped_session[Session], book_hash: str,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        """初始化章节内容加载器."""
+        self.session_factory = session_factory
+        self.book_hash = book_hash
+        self.batch_size = batch_size
+        # 由该加载器负责加载内容的章节, 键为章节的 hash 值(章节列表中可能有索引相同的章节)
+        self.chapters: dict[str, LazyChapter] = {}
+
+    def __deepcopy__(self, _: dict[int, Any]) -> "ContentLoader":
+        # 加载器持有数据库连接, 复制章节对象时共享同一个加载器
+        return self
+
+    def load(self, index: int) -> dict[str, str]:
+        """读取从指定索引开始的一批章节内容, 返回章节 hash 值到内容的字典."""
+        return self.__load(index, self.batch_size)
+
+    def load_all(self) -> dict[str, str]:
+        """通过一次查询读取该书籍所有章节的内容, 返回章节 hash 值到内容的字典."""
+        return self.__load(0, None)
+
+    def __load(self, index: int, limit: int | None) -> dict[str, str]:
+        # 查询从该索引开始的章节内容, 使用 yield_per 分批获取结果
+        statement = select(ChapterTable.chapter_hash, ChapterTable.content).where(
+            ChapterTable.book_hash == self.book_hash,
+            ChapterTable.index >= index,
+        ).order_by(ChapterTable.index).limit(limit).execution_options(
+            yield_per=self.batch_size,
+        )
+        with self.session_factory() as session:
+            contents: dict[str, str] = {
+                chapter_hash: decode_content(content)
+                for chapter_hash, content in session.execute(statement)
+            }
+        # 填充已登记但尚未加载内容的章节
+        for chapter_hash, content in contents.items():
+            chapter = self.chapters.get(chapter_hash)
+            if chapter is not None and not chapter.loaded:
+                chapter.content = content
+        return contents
+
+
+class LazyChapter(Chapter):
+    """延迟加载内容的章节对象, 内容在首次访问时通过加载器读取."""
+
+    def __init__(
+        self, loader: ContentLoader, book_hash: str, index: int,
+        title: str, update_time: float, *, chapter_hash: str,
+        sources: list[str], other_info: dict[str, str],
+    ) -> None:
+        """初始化延迟加载的章节对象, chapter_hash 为数据库中记录的章节 hash 值."""
+        self._content: str | None = None
+        super().__init__(
+            book_hash, index, title, update_time, None,  # type: ignore[arg-type]
+            sources=sources, other_info=other_info,
+        )
+        # 在加载器中登记该章节
+        self._loader = loader
+        self._chapter_hash = chapter_hash
+        loader.chapters[chapter_hash] = self
+
+    @property
+    def loaded(self) -> bool:
+        """章节内容是否已经加载."""
+        return self._content is not None
+
+    @property
+    def content(self) -> str:  # type: ignore[override]
+        """章节内容, 首次访问时从数据库中读取."""
+        if self._content is None:
+            # 如果数据库中已经没有该章节, 则视为空内容
+            self._content = self._loader.load(self.index).get(self._chapter_hash, "")
+        return self._content
+
+    @content.setter
+    def content(self, value: str | None) -> None:
+        self._content = value
+
+
+class LazyBook(Book):
+    """延迟加载封面的书籍对象, 其章节为 LazyChapter 对象."""
+
+    def __init__(
+        self, title: str, author: str, state: str, desc: str, *,
+        tags: list[str], sources: list[str], other_info: dict[str, str],
+        cover_loader: Callable[[], list[Cover]],
+    ) -> None:
+        """初始化延迟加载的书籍对象."""
+        super().__init__(
+            title, author, state, desc, tags=tags, sources=sources, other_info=other_info,
+        )
+        # 封面在首次访问时通过 cover_loader 读取
+        self._cover_loader = cover_loader
+        self._covers: list[Cover] | None = None
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Book:
+        # 复制前通过一次查询读取所有尚未加载的章节内容, copy 会读取封面,
+        # 再复制每个章节, 得到的书籍对象不再需要访问数据库
+        loaders = {
+            id(i._loader): i._loader for i in self.chapters
+            if isinstance(i, LazyChapter) and not i.loaded
+        }
+        for loader in loaders.values(): loader.load_all()
+        new_book = self.copy()
+        new_book.chapters = [i.copy() for i in self.chapters]
+        memo[id(self)] = new_book
+        return new_book
+
+    @property
+    def covers(self) -> list[Cover]:  # type: ignore[override]
+        """书籍的封面列表, 首次访问时从数据库中读取."""
+        if self._covers is None:
+            self._covers = self._cover_loader()
+        return self._covers
+
+    @covers.setter
+    def covers(self, value: list[Cover]) -> None:
+        self._covers = value
+
+
+def record_to_lazy_book(
+    record: BookTable, session_factory: scoped_session[Session],
+) -> LazyBook:
+    """将数据库记录转换为延迟加载的 Book 对象.
+
+    只读取书籍信息、书籍来源和章节的元数据, 不读取章节内容和封面图片.
+    传入的记录必须属于一个打开的会话, session_factory 用于之后读取章节内容和封面.
+    """
+    # 获取记录所在的会话, 用于查询章节的元数据
+    session = object_session(record)
+    if session is None:
+        raise ValueError("转换为延迟加载的书籍对象时, 要求记录属于一个打开的会话.")
+    book_hash = record.book_hash
+
+    # 封面的加载函数, 在首次访问封面时调用, 跳过封面存储中缺失的图片
+    def load_covers() -> list[Cover]:
+        with session_factory() as session:
+            return [
+                record_to_cover(i) for i in session.query(CoverTable).filter(
+                    CoverTable.book_hash == book_hash,
+                ) if has_cover(i.cover_hash)
+            ]
+
+    # 创建书籍对象
+    book_obj = LazyBook(
+        title        = record.title,
+        author       = record.author,
+        state        = Book.state_shift_2[record.state],
+        desc         = record.desc,
+        tags         = record.tags,
+        sources      = [i.url for i in record.sources],
+        other_info   = record.other_info,
+        cover_loader = load_covers,
+    )
+    # 查询章节的元数据和来源, 不读取章节内容
+    loader = ContentLoader(session_factory, book_hash)
+    chapter_sources: defaultdict[str, list[str]] = defaultdict(list)
+    for chapter_hash, url in session.execute(
+        select(ChapterSourceTable.chapter_hash, ChapterSourceTable.url)
+        .join(ChapterTable)
+        .where(ChapterTable.book_hash == book_hash),
+    ):
+        chapter_sources[chapter_hash].append(url)
+    book_obj.chapters = [
+        LazyChapter(
+            loader, book_hash, index, title, update_time,
+            chapter_hash=chapter_hash, sources=chapter_sources[chapter_hash],
+            other_info=other_info,
+        )
+        for chapter_hash, index, title, update_time, other_info
+        in session.execute(
+            select(
+                ChapterTable.chapter_hash, ChapterTable.index,
+                ChapterTable.title, ChapterTable.update_time,
+                ChapterTable.other_info,
+            )
+            .where(ChapterTable.book_hash == book_hash)
+            .order_by(ChapterTable.index),
+        )
+    ]
+    # 返回书籍对象
+    return book_obj
@@ -9,7 +9,7 @@
 # 导入第三方库
 from sqlalchemy import (  # noqa: I001
     JSON, CheckConstraint, Float, ForeignKey, Integer,
-    LargeBinary, String, Text, UniqueConstraint,
+    LargeBinary, String, UniqueConstraint,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -79,19 +79,25 @@ class BookSourceTable(Base):
 
 
 class CoverTable(Base):
-    """封面表, 用于存储书籍的封面图片."""
+    """封面表, 用于记录书籍的封面.
+
+    图片数据保存在按内容寻址的封面存储中(见 novel_dl.utils.cover_store),
+    该表只记录图片的哈希值、尺寸、格式和来源. 同一张图片可以属于多本书籍.
+    """
 
     # 设置在数据库中的表名
     __tablename__ = "covers"
     # 定义表中的各个字段
     cover_hash: Mapped[str]   = mapped_column(String(64),     primary_key=True)
     source:     Mapped[str]   = mapped_column(String(2048),   nullable=False  )
-    image:      Mapped[bytes] = mapped_column(LargeBinary(),  nullable=False  )
+    width:      Mapped[int]   = mapped_column(Integer(),      nullable=False  )
+    height:     Mapped[int]   = mapped_column(Integer(),      nullable=False  )
+    format:     Mapped[str]   = mapped_column(String(16),     nullable=False, default="")
     # 定义与书籍表的外键关系
     book_hash: Mapped[str] = mapped_column(
         String(64), ForeignKey(
             BOOK_COLUMN_STRING, ondelete="CASCADE",
-        ), nullable=False,
+        ), primary_key=True,
     )
     book: Mapped[BookTable] = relationship(back_populates="covers")
 
@@ -101,7 +107,11 @@ class CoverTable(Base):
 
 
 class ChapterTable(Base):
-    """章节表, 用于存储章节的基本信息."""
+    """章节表, 用于存储章节的基本信息.
+
+    章节内容以压缩后的数据保存(见 novel_dl.utils.chapter_codec), 旧版本的记录为文本,
+    内容的字符数单独记录在 content_length 中.
+    """
 
     # 设置在数据库中的表名
     __tablename__ = "chapters"
@@ -110,8 +120,10 @@ class ChapterTable(Base):
     index:        Mapped[int]             = mapped_column(Integer(),    nullable=False  )
     title:        Mapped[str]             = mapped_column(String(64),   nullable=False  )
     update_time:  Mapped[float]           = mapped_column(Float(),      nullable=False  )
-    content:      Mapped[str]             = mapped_column(Text(),       nullable=False  )
+    content:      Mapped[bytes]           = mapped_column(LargeBinary(), nullable=False )
     other_info:   Mapped[dict[str, str]]  = mapped_column(JSON(),       nullable=False  )
+    # 解压后的章节内容的字符数, 用于在不读取内容的情况下判断章节是否完整
+    content_length: Mapped[int]           = mapped_column(Integer(),    nullable=False, default=0)
     # 定义与书籍表的外键关系
     book_hash: Mapped[str] = mapped_column(
         String(64), ForeignKey(
@@ -157,14 +169,81 @@ class ChapterSourceTable(Base):
 
 
 class IndexTable(Base):
-    """索引表, 用于存储搜索索引."""
+    """索引表, 用于按书名和作者搜索书籍.
+
+    每条记录为书名或作者中的一个二元组(相邻的两个字符), 最后一个字符额外记录为单字,
+    因此每个字符都是某条记录的开头, 单字查询可以通过前缀范围查询完成.
+    """
+
+    # 设置在数据库中的表名
+    __tablename__ = "book_index"
+    # 定义表中的各个字段, 主键以 word 开头, 查询时可以直接使用主键索引
+    word:      Mapped[str] = mapped_column(String(8),  primary_key=True)
+    field:     Mapped[str] = mapped_column(String(8),  primary_key=True)
+    book_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<IndexRecord(in IndexTable) word={self.word} field={self.field}>"
+
+
+class CatalogBase(DeclarativeBase):
+    """路由目录数据库的声明式基类, 与分片数据库的表相互独立."""
+
+
+class CatalogTable(CatalogBase):
+    """路由目录表, 用于记录每本书籍所在的分片数据库."""
+
+    # 设置在数据库中的表名
+    __tablename__ = "catalog"
+    # 定义表中的各个字段
+    book_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    shard:     Mapped[int] = mapped_column(Integer(),  nullable=False, index=True)
+    # 最近一次写入的书籍元数据的指纹, 用于跳过未发生变化的书籍信息
+    fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+    def __repr__(self) -> str:
+        return ("<CatalogRecord(in CatalogTable) "
+            f"hash={self.book_hash[:8]} shard={self.shard}>")
+
+
+class ShardTable(CatalogBase):
+    """分片表, 即分片数据库的清单, 记录每个分片的书籍数量、大小和结构版本, 在写入时维护."""
+
+    # 设置在数据库中的表名
+    __tablename__ = "shards"
+    # 定义表中的各个字段
+    shard: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    books: Mapped[int] = mapped_column(Integer(), nullable=False  )
+    # 分片数据库文件的估计大小(单位: 字节), 迁移分片结构时以实际的文件大小为准
+    size:  Mapped[int] = mapped_column(Integer(), nullable=False  )
+    # 分片数据库已完成的结构版本, 低于当前版本的分片在打开时执行迁移
+    schema_version: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return ("<ShardRecord(in ShardTable) "
+            f"shard={self.shard} books={self.books} size={self.size}>")
+
+
+class PageStateTable(CatalogBase):
+    """页面状态表, 记录书籍页面和章节列表页面的缓存验证信息, 用于更新检查时发送条件请求."""
 
     # 设置在数据库中的表名
-    __tablename__ = "index"
+    __tablename__ = "page_states"
     # 定义表中的各个字段
-    hash_:     Mapped[str] = mapped_column(String(64), primary_key=True)
-    word:      Mapped[str] = mapped_column(String(32), nullable=False  )
-    book_hash: Mapped[str] = mapped_column(String(64), nullable=False  )
+    url_hash:      Mapped[str]        = mapped_column(String(64),   primary_key=True)
+    url:           Mapped[str]        = mapped_column(String(2048), nullable=False  )
+    book_hash:     Mapped[str | None] = mapped_column(String(64),   nullable=True, index=True)
+    # 响应头中的 ETag 和 Last-Modified, 以及响应内容的摘要和大小(单位: 字节)
+    etag:          Mapped[str]        = mapped_column(String(256),  nullable=False  )
+    last_modified: Mapped[str]        = mapped_column(String(64),   nullable=False  )
+    digest:        Mapped[str]        = mapped_column(String(64),   nullable=False  )
+    size:          Mapped[int]        = mapped_column(Integer(),    nullable=False  )
+    # 页面中第一个章节的索引, 以及下一个章节列表页面的链接和其中第一个章节的索引,
+    # 页面未发生变化时据此继续获取之后的章节列表页面
+    index:         Mapped[int]        = mapped_column(Integer(),    nullable=False  )
+    next_url:      Mapped[str]        = mapped_column(String(2048), nullable=False  )
+    next_index:    Mapped[int]        = mapped_column(Integer(),    nullable=False  )
 
     def __repr__(self) -> str:
-        return f"<IndexRecord(in IndexTable) keyword={self.keyword}>"
+        return ("<PageStateRecord(in PageStateTable) "
+            f"url={self.url} digest={self.digest[:8]}>")
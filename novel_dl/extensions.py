@@ -0,0 +1,536 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: extensions.py
+# @Time: 17/10/2026 00:30
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""novel_dl 的 Scrapy 扩展.
+
+StageTimer 记录爬取过程中每个阶段的耗时: 下载、解析回调(parse_book、transform、
+get_chapter_info 等)、每个管道的 process_item 以及 Item 从离开爬虫到通过或被丢弃的总耗时.
+耗时按照阶段记录为直方图, 写入 Scrapy 的统计信息中, 在爬虫关闭时输出汇总表格.
+StageTimer 需要注册在 SPIDER_MIDDLEWARES 中, 每个管道的耗时由 ITEM_PROCESSOR 设置的
+TimedItemPipelineManager 测量, 通过 pipeline_timed 信号交给 StageTimer.
+
+MetricsServer 在本地 HTTP 端口上以 Prometheus 文本格式输出爬取速率、丢弃的 Item、
+数据库写入延迟、调度器中的请求数和每本书籍的完成度等指标, 用于观察长时间运行的爬虫.
+"""
+
+
+# 导入标准库
+import bisect
+import heapq
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, Any
+
+# 导入第三方库
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.pipelines import ItemPipelineManager
+from twisted.internet.defer import Deferred
+from twisted.internet.task import LoopingCall
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+# 导入自定义库
+from novel_dl.entity.items import BookItem, ChapterItem
+from novel_dl.utils.identify import hash_
+
+
+if TYPE_CHECKING:
+    from scrapy import Spider
+    from scrapy.crawler import Crawler
+    from scrapy.http import Request, Response
+    from scrapy.statscollectors import StatsCollector
+    from twisted.internet.interfaces import IListeningPort
+    from twisted.web.server import Request as TwistedRequest
+
+
+# 管道的 process_item 执行完毕时发送的信号, 参数为 pipeline(管道类名)、item 和 seconds
+pipeline_timed = object()
+
+# 直方图的桶上限(单位: 毫秒), 超过最后一个上限的耗时记录在最后一个桶中
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图."""
+
+    def __init__(self) -> None:
+        """初始化直方图."""
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> int:
+        """记录一次耗时, 返回所在桶的序号."""
+        bucket = bisect.bisect_left(BUCKETS, seconds * 1000)
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        return bucket
+
+    def quantile(self, q: float) -> float:
+        """以所在桶的上限估计分位数(单位: 秒), 落在最后一个桶时使用最大值."""
+        if self.count == 0: return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if bucket == len(BUCKETS): return self.max
+                return min(BUCKETS[bucket] / 1000, self.max)
+        return self.max
+
+
+def bucket_name(bucket: int) -> str:
+    """获取桶在统计信息中的名称, 如 range/5ms-10ms, 最后一个桶为 range/10000ms-inf.
+
+    每个桶只统计落在该区间内的次数, 不是 Prometheus 中累计的 le 桶.
+    """
+    lower = f"{BUCKETS[bucket - 1]}ms" if bucket > 0 else "0ms"
+    upper = f"{BUCKETS[bucket]}ms" if bucket < len(BUCKETS) else "inf"
+    return f"range/{lower}-{upper}"
+
+
+def item_book_hash(item: Any) -> str | None:
+    """获取 Item 所属书籍的哈希值, 无法确定时返回 None."""
+    if isinstance(item, BookItem): return hash_(item)
+    if isinstance(item, ChapterItem): return item.get("book_hash")
+    return None
+
+
+class TimedItemPipelineManager(ItemPipelineManager):
+    """测量每个管道 process_item 耗时的管道管理器, 需要设置为 ITEM_PROCESSOR.
+
+    启用 STAGE_TIMER_ENABLED 时, 每个管道的 process_item 执行完毕(返回 Deferred 时为其触发)后
+    发送 pipeline_timed 信号, 耗时不包括 Item 在管道之间等待的时间.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "TimedItemPipelineManager":
+        """创建管道管理器, 并为每个管道的 process_item 计时."""
+        manager = super().from_crawler(crawler)
+        if crawler.settings.getbool("STAGE_TIMER_ENABLED"):
+            # methods 中的 process_item 与定义了该方法的管道一一对应
+            pipelines = [i for i in manager.middlewares if hasattr(i, "process_item")]
+            manager.methods["process_item"] = deque(
+                cls.__timed(crawler, type(pipeline).__name__, method)
+                for pipeline, method in zip(
+                    pipelines, manager.methods["process_item"], strict=True,
+                )
+            )
+        return manager
+
+    @staticmethod
+    def __timed(
+        crawler: "Crawler", name: str, method: Callable[..., Any],
+    ) -> Callable[..., Any]:
+        # 包装管道的 process_item, 在其执行完毕后发送 pipeline_timed 信号
+        def report(result: Any, item: Any, start: float) -> Any:
+            crawler.signals.send_catch_log(
+                signal=pipeline_timed, pipeline=name, item=item,
+                seconds=time.perf_counter() - start,
+            )
+            return result
+
+        def process_item(item: Any, spider: "Spider") -> Any:
+            start = time.perf_counter()
+            result = method(item, spider)
+            if isinstance(result, Deferred): return result.addBoth(report, item, start)
+            return report(result, item, start)
+        return process_item
+
+
+class StageTimer:
+    """记录爬取各阶段耗时的爬虫中间件, 由设置中的 STAGE_TIMER_ENABLED 启用.
+
+    需要注册在 SPIDER_MIDDLEWARES 中最靠近爬虫的位置, 这样包装的输出就是解析回调本身的输出.
+    统计信息的键为 timing/<爬虫名>/<阶段>/<指标>, 指标包括 count、total、max
+    以及每个区间的计数(非累计). 每个管道的阶段名称为 pipeline/<管道类名>,
+    pipelines 阶段为 Item 从离开爬虫到通过或被丢弃的总耗时, 包括在管道之间等待的时间.
+    启用 STAGE_TIMER_PER_BOOK 时, 前 STAGE_TIMER_BOOK_LIMIT 本书籍各阶段的总耗时
+    记录在 timing/<爬虫名>/book/<书籍哈希值前 8 位>/<阶段> 中, 之后的书籍只计入
+    timing/<爬虫名>/book_untracked.
+    """
+
+    def __init__(self, crawler: "Crawler") -> None:
+        """初始化中间件."""
+        assert crawler.stats is not None
+        self.stats: StatsCollector = crawler.stats
+        # 是否按书籍汇总耗时, 以及汇总的书籍数量上限
+        self.per_book = crawler.settings.getbool("STAGE_TIMER_PER_BOOK")
+        self.book_limit = crawler.settings.getint("STAGE_TIMER_BOOK_LIMIT", 20)
+        self.prefix = "timing"
+        # 每个阶段的直方图
+        self.histograms: dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        # 已经按书籍汇总耗时的书籍, 以及超出上限的书籍
+        self.books: set[str] = set()
+        self.untracked: set[str] = set()
+        # 已经离开爬虫、尚未通过管道的 Item, 记录离开的时间和所属书籍
+        self.pending: dict[int, tuple[float, str | None]] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "StageTimer":
+        """从爬虫设置中读取参数并连接信号."""
+        if not crawler.settings.getbool("STAGE_TIMER_ENABLED"):
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            middleware.response_received, signal=signals.response_received,
+        )
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(middleware.item_finished, signal=signal)
+        crawler.signals.connect(middleware.pipeline_timed, signal=pipeline_timed)
+        return middleware
+
+    def spider_opened(self, spider: "Spider") -> None:
+        """在爬虫开启时设置统计信息的前缀."""
+        self.prefix = f"timing/{spider.name}"
+
+    def response_received(
+        self, response: "Response", request: "Request", spider: "Spider",  # noqa: ARG002
+    ) -> None:
+        """记录下载耗时, 由下载器记录在请求的 meta 中."""
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.observe("download", latency, request.meta.get("book_hash"))
+
+    def item_finished(self, item: Any, **_: Any) -> None:
+        """记录 Item 通过、被丢弃或出错时经过管道的耗时."""
+        started = self.pending.pop(id(item), None)
+        if started is not None:
+            self.observe("pipelines", time.perf_counter() - started[0], started[1])
+
+    def pipeline_timed(self, pipeline: str, item: Any, seconds: float) -> None:
+        """记录单个管道的 process_item 耗时."""
+        self.observe(f"pipeline/{pipeline}", seconds, item_book_hash(item))
+
+    def process_spider_output(
+        self, response: "Response", result: Iterable[Any], spider: "Spider",  # noqa: ARG002
+    ) -> Iterator[Any]:
+        """为解析回调计时, 按照每次从回调的输出中取值的耗时累计."""
+        stage, book_hash, elapsed = self.__callback(response), response.meta.get("book_hash"), 0.0
+        iterator = iter(result)
+        try:
+            while True:
+                start = time.perf_counter()
+                try: value = next(iterator)
+                except StopIteration: return
+                finally: elapsed += time.perf_counter() - start
+                book_hash = book_hash or item_book_hash(value)
+                self.__leave(value)
+                yield value
+        finally:
+            self.observe(stage, elapsed, book_hash)
+
+    async def process_spider_output_async(
+        self, response: "Response", result: AsyncIterable[Any], spider: "Spider",  # noqa: ARG002
+    ) -> AsyncIterator[Any]:
+        """与 process_spider_output 相同, 用于异步的解析回调."""
+        stage, book_hash, elapsed = self.__callback(response), response.meta.get("book_hash"), 0.0
+        iterator = aiter(result)
+        try:
+            while True:
+                start = time.perf_counter()
+                try: value = await anext(iterator)
+                except StopAsyncIteration: return
+                finally: elapsed += time.perf_counter() - start
+                book_hash = book_hash or item_book_hash(value)
+                self.__leave(value)
+                yield value
+        finally:
+            self.observe(stage, elapsed, book_hash)
+
+    def observe(self, stage: str, seconds: float, book_hash: str | None = None) -> None:
+        """记录一次阶段耗时."""
+        bucket = self.histograms[stage].observe(seconds)
+        key = f"{self.prefix}/{stage}"
+        self.stats.inc_value(f"{key}/count")
+        self.stats.inc_value(f"{key}/total", seconds, start=0.0)
+        self.stats.max_value(f"{key}/max", seconds)
+        self.stats.inc_value(f"{key}/{bucket_name(bucket)}")
+        if self.per_book and book_hash: self.__observe_book(stage, seconds, book_hash)
+
+    def summary(self) -> str:
+        """生成各阶段耗时的汇总表格."""
+        lines = [(
+            f"{'阶段':<26}{'次数':>8}{'总计(秒)':>10}{'平均(毫秒)':>12}"
+            f"{'P50(毫秒)':>11}{'P95(毫秒)':>11}{'最大(毫秒)':>12}"
+        )]
+        for stage, histogram in sorted(
+            self.histograms.items(), key=lambda i: -i[1].total,
+        ):
+            lines.append(
+                f"{stage:<28}{histogram.count:>8}{histogram.total:>10.2f}"
+                f"{histogram.total / histogram.count * 1000:>12.2f}"
+                f"{histogram.quantile(0.5) * 1000:>11.1f}"
+                f"{histogram.quantile(0.95) * 1000:>11.1f}"
+                f"{histogram.max * 1000:>12.1f}",
+            )
+        return "\n".join(lines)
+
+    def spider_closed(self, spider: "Spider") -> None:
+        """在爬虫关闭时输出汇总表格."""
+        if self.histograms:
+            spider.logger.info(f"各阶段耗时:\n{self.summary()}")
+        self.pending.clear()
+
+    @staticmethod
+    def __callback(response: "Response") -> str:
+        # 获取响应的解析回调名称, 作为阶段名称
+        callback = response.request.callback if response.request else None
+        return getattr(callback, "__name__", "parse")
+
+    def __observe_book(self, stage: str, seconds: float, book_hash: str) -> None:
+        # 累计书籍的阶段耗时, 超出上限的书籍只记录数量
+        if book_hash not in self.books:
+            if len(self.books) >= self.book_limit:
+                if book_hash not in self.untracked:
+                    self.untracked.add(book_hash)
+                    self.stats.inc_value(f"{self.prefix}/book_untracked")
+                return
+            self.books.add(book_hash)
+        self.stats.inc_value(
+            f"{self.prefix}/book/{book_hash[:8]}/{stage}", seconds, start=0.0,
+        )
+
+    def __leave(self, value: Any) -> None:
+        # 记录离开爬虫的 Item, 在其通过管道后计算管道的耗时
+        if isinstance(value, (BookItem, ChapterItem)):
+            self.pending[id(value)] = (time.perf_counter(), item_book_hash(value))
+
+
+class MetricsResource(Resource):
+    """以 Prometheus 文本格式输出指标的 HTTP 资源."""
+
+    isLeaf = True  # noqa: N815, Twisted 要求使用这个名称
+
+    def __init__(self, server: "MetricsServer") -> None:
+        """初始化 HTTP 资源."""
+        super().__init__()
+        self.server = server
+
+    def render_GET(self, request: "TwistedRequest") -> bytes:  # noqa: N802
+        """输出所有指标."""
+        request.setHeader(b"Content-Type", b"text/plain; version=0.0.4; charset=utf-8")
+        return self.server.render().encode("UTF-8")
+
+
+class MetricsServer:
+    """在本地 HTTP 端口上以 Prometheus 文本格式输出爬取指标的扩展.
+
+    由设置中的 METRICS_ENABLED 启用, 监听 METRICS_HOST:METRICS_PORT, 任意路径都返回指标.
+    HTTP 服务运行在 Reactor 线程中, 不需要额外的线程和外部服务. 速率类指标每隔
+    METRICS_RATE_INTERVAL 秒更新一次. 书籍的完成度默认只输出所有未完成书籍的汇总,
+    此外按书籍输出最近有章节通过管道的 METRICS_BOOK_LIMIT 本未完成书籍的完成度,
+    批量更新时书籍数量很多, 限制书籍数量可以避免标签值无限增长.
+    """
+
+    def __init__(self, crawler: "Crawler") -> None:
+        """初始化扩展."""
+        assert crawler.stats is not None
+        self.crawler = crawler
+        self.stats: StatsCollector = crawler.stats
+        self.host = crawler.settings.get("METRICS_HOST", "127.0.0.1")
+        self.port = crawler.settings.getint("METRICS_PORT", 9410)
+        self.interval = crawler.settings.getfloat("METRICS_RATE_INTERVAL", 10.0)
+        self.book_limit = crawler.settings.getint("METRICS_BOOK_LIMIT", 20)
+        self.spider: Spider | None = None
+        self.listener: IListeningPort | None = None
+        self.rate_task: LoopingCall | None = None
+        # 计数器, 以及上次更新速率时的计数和时间
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.dropped: defaultdict[str, int] = defaultdict(int)
+        self.rates: dict[str, float] = {"pages": 0.0, "chapters": 0.0}
+        self.last_counts = dict.fromkeys(self.rates, 0)
+        self.last_time = time.monotonic()
+        # 每本书籍已经通过所有管道的章节数, 以及最近一个章节通过的时间
+        self.book_chapters: defaultdict[str, int] = defaultdict(int)
+        self.book_active: dict[str, float] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "MetricsServer":
+        """从爬虫设置中读取参数并连接信号."""
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+        extension = cls(crawler)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            extension.response_received, signal=signals.response_received,
+        )
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.item_dropped, signal=signals.item_dropped)
+        return extension
+
+    def spider_opened(self, spider: "Spider") -> None:
+        """在爬虫开启时启动 HTTP 服务和速率更新任务."""
+        from twisted.internet import reactor  # noqa: PLC0415
+        self.spider = spider
+        self.listener = reactor.listenTCP(  # type: ignore[attr-defined]
+            self.port, Site(MetricsResource(self)), interface=self.host,
+        )
+        address = self.listener.getHost()
+        spider.logger.info(f"爬取指标: http://{address.host}:{address.port}/metrics")
+        self.rate_task = LoopingCall(self.update_rates)
+        self.rate_task.start(self.interval, now=False)
+
+    def spider_closed(self, spider: "Spider") -> Deferred | None:  # noqa: ARG002
+        """在爬虫关闭时停止速率更新任务和 HTTP 服务."""
+        if self.rate_task is not None and self.rate_task.running:
+            self.rate_task.stop()
+        if self.listener is None: return None
+        return self.listener.stopListening()
+
+    def response_received(self, *_: Any, **__: Any) -> None:
+        """统计下载的页面数."""
+        self.counters["pages"] += 1
+
+    def item_scraped(self, item: Any, **_: Any) -> None:
+        """统计通过所有管道的书籍和章节数."""
+        if isinstance(item, BookItem): self.counters["books"] += 1
+        if isinstance(item, ChapterItem):
+            self.counters["chapters"] += 1
+            self.book_chapters[item.get("book_hash", "")] += 1
+            self.book_active[item.get("book_hash", "")] = time.monotonic()
+
+    def item_dropped(self, item: Any, **_: Any) -> None:
+        """统计被管道丢弃的 Item 数, 目前只有 CheckPipeline 会丢弃 Item."""
+        kind = (
+            "book" if isinstance(item, BookItem)
+            else "chapter" if isinstance(item, ChapterItem) else "other"
+        )
+        self.dropped[kind] += 1
+
+    def update_rates(self) -> None:
+        """根据计数器的变化更新速率."""
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-9)
+        for name in self.rates:
+            self.rates[name] = (self.counters[name] - self.last_counts[name]) / elapsed
+            self.last_counts[name] = self.counters[name]
+        self.last_time = now
+
+    def db_pipeline(self) -> Any:
+        """获取已启用的数据库管道, 没有启用时返回 None."""
+        if self.crawler.engine is None: return None
+        middlewares = self.crawler.engine.scraper.itemproc.middlewares
+        return next((i for i in middlewares if hasattr(i, "chapter_cache")), None)
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式的指标."""
+        spider = {"spider": self.spider.name if self.spider else ""}
+        stats = self.stats.get_stats()
+        metrics: list[tuple[str, str, str, list[tuple[dict[str, str], float]]]] = [
+            ("pages_total", "counter", "下载的页面数", [(spider, self.counters["pages"])]),
+            ("pages_per_second", "gauge", "最近一段时间每秒下载的页面数",
+             [(spider, self.rates["pages"])]),
+            ("books_total", "counter", "通过所有管道的书籍数", [(spider, self.counters["books"])]),
+            ("chapters_total", "counter", "通过所有管道的章节数",
+             [(spider, self.counters["chapters"])]),
+            ("chapters_per_second", "gauge", "最近一段时间每秒通过所有管道的章节数",
+             [(spider, self.rates["chapters"])]),
+            ("items_dropped_total", "counter", "被 CheckPipeline 丢弃的 Item 数",
+             [({**spider, "type": k}, v) for k, v in sorted(self.dropped.items())]),
+            ("scheduler_pending_requests", "gauge", "调度器中等待下载的请求数", [(spider,
+              stats.get("scheduler/enqueued", 0) - stats.get("scheduler/dequeued", 0))]),
+            ("downloader_active_requests", "gauge", "正在下载的请求数", [(spider, len(
+              self.crawler.engine.downloader.active) if self.crawler.engine else 0)]),
+        ]
+        # 数据库写入线程的延迟和队列深度, 由 DBWriter 记录在统计信息中
+        writes = stats.get("db_writer/write_count", 0)
+        metrics += [
+            ("db_write_latency_seconds", "summary", "数据库写入的耗时", [
+                ({**spider, "__name__": "_sum"},
+                 stats.get("db_writer/write_latency_avg", 0.0) * writes),
+                ({**spider, "__name__": "_count"}, writes),
+            ]),
+            ("db_write_latency_max_seconds", "gauge", "数据库写入的最大耗时",
+             [(spider, stats.get("db_writer/write_latency_max", 0.0))]),
+            ("db_writer_queue_depth", "gauge", "数据库写入线程等待执行的任务数",
+             [(spider, stats.get("db_writer/queue_depth", 0))]),
+        ]
+        # 条件请求节省的流量和请求, 跳过的页面由爬虫记录
+        unchanged = [
+            i for states in list(getattr(self.spider, "pages_unchanged", {}).values())
+            for i in states
+        ]
+        metrics += [
+            ("conditional_requests_total", "counter", "发送的条件请求数",
+             [(spider, stats.get("conditional/requests", 0))]),
+            ("conditional_not_modified_total", "counter", "返回 304 的条件请求数",
+             [(spider, stats.get("conditional/not_modified", 0))]),
+            ("conditional_unchanged_total", "counter", "内容摘要未变化的页面数",
+             [(spider, stats.get("conditional/unchanged", 0))]),
+            ("conditional_bytes_saved_total", "counter", "条件请求节省的下载字节数",
+             [(spider, stats.get("conditional/bytes_saved", 0))]),
+            ("conditional_pages_skipped_total", "counter", "未发生变化而跳过解析的页面数",
+             [(spider, len(unchanged))]),
+            ("conditional_requests_saved_total", "counter", "跳过的页面中不需要再次检查或请求的章节数",
+             [(spider, sum(i.next_index - i.index for i in unchanged))]),
+        ]
+        pipeline = self.db_pipeline()
+        if pipeline is not None:
+            metrics += [
+                ("db_chapter_cache_size", "gauge", "等待所属书籍写入的章节数",
+                 [(spider, sum(map(len, list(pipeline.chapter_cache.values()))))]),
+                ("db_chapter_buffer_size", "gauge", "等待批量写入的章节数",
+                 [(spider, pipeline.buffered)]),
+            ]
+        # 按书籍的完成度, 章节总数来自爬虫获取的章节列表
+        crawled: dict[str, int] = getattr(self.spider, "chapters_crawled", {})
+        finished: dict[str, bool] = getattr(self.spider, "chapter_list_flag", {})
+        books = [
+            (book_hash, total) for book_hash, total in list(crawled.items())
+            if total and (self.book_chapters[book_hash] < total or not finished.get(book_hash))
+        ]
+        metrics += [
+            ("books_in_progress", "gauge", "尚未完成的书籍数", [(spider, len(books))]),
+            ("chapters_remaining", "gauge", "尚未完成的书籍中还没有通过所有管道的章节数",
+             [(spider, sum(max(total - self.book_chapters[i], 0) for i, total in books))]),
+        ]
+        # 按书籍的完成度, 每本书籍一个标签值, 只输出最近活跃的 METRICS_BOOK_LIMIT 本书籍
+        books = heapq.nlargest(
+            max(self.book_limit, 0), books, key=lambda i: self.book_active.get(i[0], 0.0),
+        )
+        if books:
+            metrics += [
+                ("book_chapters_expected", "gauge", "书籍章节列表中的章节数",
+                 [({**spider, "book": i[:8]}, total) for i, total in books]),
+                ("book_chapters_scraped", "gauge", "书籍已经通过所有管道的章节数",
+                 [({**spider, "book": i[:8]}, self.book_chapters[i]) for i, _ in books]),
+                ("book_completion_ratio", "gauge", "书籍已经通过所有管道的章节比例", [
+                    ({**spider, "book": i[:8]}, self.book_chapters[i] / total)
+                    for i, total in books
+                ]),
+            ]
+        return "".join(format_metric(*i) for i in metrics)
+
+
+def escape_label(value: str) -> str:
+    """转义 Prometheus 标签值中的反斜杠、双引号和换行符."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_metric(
+    name: str, kind: str, description: str, samples: list[tuple[dict[str, str], float]],
+) -> str:
+    """将一个指标格式化为 Prometheus 文本格式.
+
+    标签中的 __name__ 不会输出, 而是作为样本名称的后缀, 用于 summary 的 _sum 和 _count.
+    """
+    name = f"novel_dl_{name}"
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        suffix = labels.get("__name__", "")
+        label_text = ",".join(
+            f'{k}="{escape_label(v)}"' for k, v in labels.items() if k != "__name__"
+        )
+        lines.append(f"{name}{suffix}{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
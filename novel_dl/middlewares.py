@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: middlewares.py
+# @Time: 17/10/2026 03:10
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""下载中间件.
+
+ConditionalRequestMiddleware 为书籍页面和章节列表页面发送条件请求:
+上一次完整获取该书籍时保存的 ETag 和 Last-Modified 会作为 If-None-Match 和 If-Modified-Since
+发送, 网站返回 304 或内容摘要相同时, 爬虫跳过对该页面的解析, 直接获取下一个章节列表页面.
+"""
+
+
+# 导入标准库
+import hashlib
+import logging
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+# 导入第三方库
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+# 导入自定义库
+from novel_dl.entity.items import ChapterItem
+from novel_dl.templates import GeneralSpider
+from novel_dl.utils.db_manager import DBManager
+
+
+if TYPE_CHECKING:
+    from scrapy import Spider
+    from scrapy.crawler import Crawler
+    from scrapy.http import Request, Response
+
+
+class ConditionalRequestMiddleware:
+    """为书籍页面和章节列表页面发送条件请求, 由设置中的 CONDITIONAL_REQUESTS_ENABLED 启用.
+
+    配置了 Feed 导出时不启用, 否则未发生变化的书籍不会输出 BookItem 和章节, 导出的书籍为空.
+
+    只处理 meta 中 conditional 为 True 的请求, 响应的内容摘要记录在 meta 的 page_digest 中,
+    页面未发生变化时 meta 的 page_unchanged 为 True. 爬虫记录的页面状态只在书籍的所有章节
+    都通过管道后才保存, 避免下一次更新时跳过获取失败的章节.
+    """
+
+    def __init__(self, crawler: "Crawler") -> None:
+        """初始化中间件, 并连接爬虫的信号."""
+        settings = crawler.settings
+        if not settings.getbool("CONDITIONAL_REQUESTS_ENABLED") or settings.getdict("FEEDS"):
+            raise NotConfigured
+        self.stats = crawler.stats
+        self.logger = logging.getLogger(__name__)
+        # 每本书籍已经通过所有管道的章节数
+        self.scraped: defaultdict[str, int] = defaultdict(int)
+        crawler.signals.connect(self.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "ConditionalRequestMiddleware":
+        """从爬虫创建中间件."""
+        return cls(crawler)
+
+    def process_request(self, request: "Request", spider: "Spider") -> None:
+        """为已保存页面状态的请求添加条件请求头."""
+        # 重新获取完整页面的请求不发送条件请求头, 但仍然记录内容摘要
+        if not request.meta.get("conditional") or request.meta.get("page_refresh"): return
+        state = DBManager().get_page_state(request.url)
+        if state is None: return
+        request.meta["page_state"] = state
+        if state.etag: request.headers.setdefault("If-None-Match", state.etag)
+        if state.last_modified:
+            request.headers.setdefault("If-Modified-Since", state.last_modified)
+        # 304 响应需要交给爬虫处理, 否则会被 HttpErrorMiddleware 过滤
+        request.meta["handle_httpstatus_list"] = [
+            *request.meta.get("handle_httpstatus_list", ()), 304,
+        ]
+        self.stats.inc_value("conditional/requests", spider=spider)
+
+    def process_response(
+        self, request: "Request", response: "Response", spider: "Spider",
+    ) -> "Response":
+        """判断页面是否发生变化, 并记录节省的流量."""
+        if not request.meta.get("conditional"): return response
+        state = request.meta.get("page_state")
+        # 网站确认页面未修改, 节省的流量按上一次的页面大小估计
+        if response.status == 304 and state is not None:
+            request.meta["page_unchanged"] = True
+            self.stats.inc_value("conditional/not_modified", spider=spider)
+            self.stats.inc_value("conditional/bytes_saved", state.size, spider=spider)
+            return response
+        if response.status != 200: return response
+        # 网站不支持条件请求时, 通过内容摘要判断页面是否发生变化
+        digest = hashlib.sha256(response.body).hexdigest()
+        request.meta["page_digest"] = digest
+        if state is not None and state.digest == digest:
+            request.meta["page_unchanged"] = True
+            self.stats.inc_value("conditional/unchanged", spider=spider)
+        return response
+
+    def item_scraped(self, item: object, spider: "Spider") -> None:  # noqa: ARG002
+        """记录每本书籍已经通过所有管道的章节数."""
+        if isinstance(item, ChapterItem): self.scraped[item["book_hash"]] += 1
+
+    def spider_closed(self, spider: "Spider") -> None:
+        """保存完整获取的书籍的页面状态, 并记录本次更新节省的请求和流量."""
+        if not isinstance(spider, GeneralSpider): return
+        states = [
+            state for book_hash, book_states in spider.page_states.items()
+            if spider.chapter_list_flag.get(book_hash)
+            and self.scraped[book_hash] >= spider.chapters_crawled.get(book_hash, 0)
+            for state in book_states
+        ]
+        if states: DBManager().save_page_states(states)
+        self.stats.set_value("conditional/saved_states", len(states), spider=spider)
+        # 未发生变化的页面不需要解析, 其中的章节也不需要再次检查或请求
+        unchanged = [i for book_states in spider.pages_unchanged.values() for i in book_states]
+        skipped = sum(i.next_index - i.index for i in unchanged)
+        self.stats.set_value("conditional/transform_skipped", len(unchanged), spider=spider)
+        self.stats.set_value("conditional/requests_saved", skipped, spider=spider)
+        saved = self.stats.get_value("conditional/bytes_saved", 0, spider=spider)
+        self.logger.info(
+            f"条件请求: 共 {self.stats.get_value('conditional/requests', 0, spider=spider)} 次, "
+            f"未修改 {self.stats.get_value('conditional/not_modified', 0, spider=spider)} 次, "
+            f"内容未变化 {self.stats.get_value('conditional/unchanged', 0, spider=spider)} 次, "
+            f"跳过解析 {len(unchanged)} 个页面和 {skipped} 个章节, 节省 {saved / 1024:.1f} KiB, "
+            f"保存 {len(states)} 个页面状态.",
+        )
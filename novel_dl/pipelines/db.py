@@ -7,7 +7,17 @@
 
 
 # 导入标准库
-from collections import defaultdict
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+# 导入第三方库
+from twisted.internet.defer import Deferred, succeed
+from twisted.internet.task import LoopingCall
+from twisted.python.failure import Failure
 
 # 导入自定义库
 from novel_dl.entity.items import BookItem, ChapterItem
@@ -16,37 +26,265 @@ from novel_dl.utils.db_manager import DBManager
 from novel_dl.utils.identify import hash_
 
 
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.statscollectors import StatsCollector
+
+
+# 写入任务的类型: 待执行的函数、参数以及执行完成后触发的 Deferred
+Job = tuple[Callable[..., Any], tuple[Any, ...], Deferred]
+
+
+def _noop() -> None:
+    """空任务, 用于等待队列中所有的任务执行完毕."""
+
+
+class DBWriter(threading.Thread):
+    """数据库写入线程.
+
+    写入任务通过有界队列交给该线程依次执行, 使 SQLite 的提交不会阻塞 Reactor 线程.
+    队列已满时, 新任务暂存在 Reactor 线程的积压队列中. 积压的任务数超过 backlog_limit 时
+    调用 pause(True) 暂停 Scrapy 引擎, 积压的任务全部移入队列后调用 pause(False) 恢复,
+    这样数据库写入跟不上时爬虫会停止下载新的页面, 积压队列不会无限增长.
+    除 run 方法外, 该类的方法都只应在 Reactor 线程中调用.
+    """
+
+    def __init__(
+        self, maxsize: int = 64, stats: "StatsCollector | None" = None, *,
+        backlog_limit: int = 64, pause: Callable[[bool], None] | None = None,
+    ) -> None:
+        """初始化数据库写入线程."""
+        super().__init__(name="DBWriter", daemon=True)
+        # 交给写入线程的有界任务队列
+        self.queue: queue.Queue[Job | None] = queue.Queue(maxsize)
+        # 队列已满时暂存的任务
+        self.backlog: deque[Job] = deque()
+        # 积压任务数的上限, 以及暂停和恢复 Scrapy 引擎的函数
+        self.backlog_limit = backlog_limit
+        self.pause = pause
+        self.paused = False
+        # Scrapy 的统计收集器
+        self.stats = stats
+        # 写入次数和总耗时, 用于计算平均写入延迟
+        self.writes = 0
+        self.total_latency = 0.0
+
+    @property
+    def depth(self) -> int:
+        """等待执行的任务数量, 包括积压队列中的任务."""
+        return self.queue.qsize() + len(self.backlog)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Deferred:
+        """提交写入任务, 返回在任务执行完毕后触发的 Deferred."""
+        job: Job = (func, args, Deferred())
+        # 如果已有积压的任务, 则排在其后以保证执行顺序
+        if self.backlog:
+            self.backlog.append(job)
+        else:
+            try: self.queue.put_nowait(job)
+            except queue.Full:
+                self.backlog.append(job)
+                if self.stats is not None:
+                    self.stats.inc_value("db_writer/backpressure")
+        # 积压的任务过多时暂停引擎, 不再下载新的页面
+        if len(self.backlog) > self.backlog_limit and not self.paused:
+            self._set_paused(paused=True)
+        self._record_depth()
+        return job[2]
+
+    def close(self) -> Deferred:
+        """等待所有任务执行完毕后结束写入线程."""
+        return self.submit(_noop).addCallback(self._shutdown)
+
+    def run(self) -> None:
+        """写入线程的主循环, 依次执行队列中的任务."""
+        from twisted.internet import reactor  # noqa: PLC0415
+        while True:
+            # 取出任务, 遇到 None 时结束线程
+            job = self.queue.get()
+            if job is None: break
+            func, args, deferred = job
+            # 执行任务并计时
+            start = time.perf_counter()
+            try: result = func(*args)
+            except Exception:  # noqa: BLE001
+                reactor.callFromThread(deferred.errback, Failure())
+            else:
+                reactor.callFromThread(deferred.callback, result)
+            reactor.callFromThread(self._job_done, time.perf_counter() - start)
+
+    def _job_done(self, latency: float) -> None:
+        # 将积压的任务移入队列
+        while self.backlog and not self.queue.full():
+            self.queue.put_nowait(self.backlog.popleft())
+        if not self.backlog and self.paused: self._set_paused(paused=False)
+        # 记录写入延迟
+        self.writes += 1
+        self.total_latency += latency
+        if self.stats is not None:
+            self.stats.set_value("db_writer/write_count", self.writes)
+            self.stats.set_value("db_writer/write_latency_last", latency)
+            self.stats.max_value("db_writer/write_latency_max", latency)
+            self.stats.set_value(
+                "db_writer/write_latency_avg", self.total_latency / self.writes,
+            )
+        self._record_depth()
+
+    def _set_paused(self, *, paused: bool) -> None:
+        # 暂停或恢复 Scrapy 引擎, 并记录暂停的次数
+        self.paused = paused
+        if self.pause is not None: self.pause(paused)
+        if paused and self.stats is not None:
+            self.stats.inc_value("db_writer/engine_paused")
+
+    def _record_depth(self) -> None:
+        # 记录当前和最大的队列深度
+        if self.stats is None: return
+        self.stats.set_value("db_writer/queue_depth", self.depth)
+        self.stats.max_value("db_writer/queue_depth_max", self.depth)
+
+    def _shutdown(self, _: None) -> None:
+        # 此时队列已经为空, 放入结束标记并等待线程退出
+        self.queue.put(None)
+        self.join()
+
+
 class DBPipeline:
-    """将经过检查的 BookItem 和 ChapterItem 保存到数据库中."""
+    """将经过检查的 BookItem 和 ChapterItem 保存到数据库中.
 
-    def __init__(self) -> None:
+    ChapterItem 会先按书籍缓冲, 缓冲的章节数达到 DB_CHAPTER_BUFFER_SIZE,
+    或距离上次写入超过 DB_CHAPTER_BUFFER_TIMEOUT 秒时, 每本书籍在一个事务中批量写入.
+    所有的数据库操作都在 DBWriter 线程中执行, 写入积压的任务超过 DB_WRITER_BACKLOG_LIMIT 时
+    暂停 Scrapy 引擎, 直到积压的任务都交给写入线程.
+    """
+
+    def __init__(
+        self, buffer_size: int = 200, buffer_timeout: float = 5.0,
+        queue_size: int = 64, stats: "StatsCollector | None" = None, *,
+        backlog_limit: int = 64, crawler: "Crawler | None" = None,
+    ) -> None:
         """初始化数据库管道."""
-        # 该缓存字典用于存储先于 BookItem 到达的 ChapterItem
+        # 该缓存字典用于存储先于 BookItem 到达的 ChapterItem, 只在写入线程中访问
         self.chapter_cache: dict[str, list[ChapterItem]] = defaultdict(list)
+        # 该缓冲字典用于存储等待批量写入的 ChapterItem
+        self.chapter_buffer: dict[str, list[ChapterItem]] = defaultdict(list)
+        # 缓冲的最大章节数和最长时间
+        self.buffer_size = buffer_size
+        self.buffer_timeout = buffer_timeout
+        # 当前缓冲的章节数
+        self.buffered = 0
+        # 定时写入缓冲区的任务
+        self.flush_task: LoopingCall | None = None
+        # 写入线程的队列长度和统计收集器
+        self.queue_size = queue_size
+        self.stats = stats
+        # 积压任务数的上限, 以及用于暂停引擎的爬虫对象
+        self.backlog_limit = backlog_limit
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "DBPipeline":
+        """从爬虫设置中读取缓冲参数并创建管道."""
+        return cls(
+            buffer_size=crawler.settings.getint("DB_CHAPTER_BUFFER_SIZE", 200),
+            buffer_timeout=crawler.settings.getfloat(
+                "DB_CHAPTER_BUFFER_TIMEOUT", 5.0,
+            ),
+            queue_size=crawler.settings.getint("DB_WRITER_QUEUE_SIZE", 64),
+            stats=crawler.stats,
+            backlog_limit=crawler.settings.getint("DB_WRITER_BACKLOG_LIMIT", 64),
+            crawler=crawler,
+        )
 
-    def open_spider(self, _: GeneralSpider) -> None:
-        """在爬虫开启时调用, 初始化数据库连接."""
+    def open_spider(self, spider: GeneralSpider) -> None:
+        """在爬虫开启时调用, 初始化数据库连接并启动写入线程."""
+        self.logger = spider.logger
         self.db_manager = DBManager()
+        self.writer = DBWriter(
+            self.queue_size, self.stats,
+            backlog_limit=self.backlog_limit, pause=self.pause_engine,
+        )
+        self.writer.start()
+        # 如果启用了缓冲, 则定时将缓冲区写入数据库
+        if self.buffer_size > 1:
+            self.flush_task = LoopingCall(self.flush)
+            self.flush_task.start(self.buffer_timeout, now=False)
 
-    def close_spider(self, _: GeneralSpider) -> None:
-        """在爬虫关闭时调用, 关闭数据库连接."""
-        del self.db_manager
+    def close_spider(self, spider: GeneralSpider) -> Deferred:
+        """在爬虫关闭时调用, 写入缓冲区中剩余的章节并关闭数据库连接."""
+        # 停止定时任务并写入缓冲区
+        if self.flush_task is not None and self.flush_task.running:
+            self.flush_task.stop()
+        self.flush()
+        # 等待写入线程执行完所有任务
+        return self.writer.close().addCallback(self._finish, spider)
 
     def process_item(
         self, item: BookItem | ChapterItem, _: GeneralSpider,
-    ) -> BookItem | ChapterItem:
-        """对传入的 item 进行类型检查和保存."""
+    ) -> BookItem | ChapterItem | Deferred:
+        """对传入的 item 进行类型检查和保存.
+
+        需要写入数据库时返回 Deferred, 在写入完成后得到 item.
+        """
         # 判断 Item 的类型, 并依据类型进行处理
         if isinstance(item, BookItem):
-            # 将 BookItem 添加到数据库
-            self.db_manager.add_book(item)
-            # 如果该书籍有缓存的章节, 则一并添加到数据库
-            if bool(self.chapter_cache[hash_(item)]):
-                for chapter_item in self.chapter_cache[hash_(item)]:
-                    self.db_manager.add_chapter(chapter_item)
-                del self.chapter_cache[hash_(item)]
-        if isinstance(item, ChapterItem) and \
-            (not self.db_manager.add_chapter(item)):
-            self.chapter_cache[item["book_hash"]].append(item)
+            # 将 BookItem 交给写入线程添加到数据库
+            return self.writer.submit(self._write_book, item).addCallback(
+                lambda _: item,
+            )
+        if isinstance(item, ChapterItem):
+            # 将章节加入缓冲区, 缓冲区已满时批量写入
+            self.chapter_buffer[item["book_hash"]].append(item)
+            self.buffered += 1
+            if self.buffered >= self.buffer_size:
+                return self.flush().addCallback(lambda _: item)
         # 返回处理后的 item, 以便后续管道使用
         return item
+
+    def flush(self) -> Deferred:
+        """将缓冲区中的章节交给写入线程, 按书籍批量写入数据库."""
+        # 如果缓冲区为空, 则无需写入
+        if not self.buffered: return succeed(None)
+        # 取出缓冲区并重置
+        buffer, self.chapter_buffer = self.chapter_buffer, defaultdict(list)
+        self.buffered = 0
+        # 写入失败时记录错误日志, 避免中断定时任务
+        return self.writer.submit(self._write_chapters, buffer).addErrback(
+            lambda failure: self.logger.error(
+                f"批量写入章节时发生错误: {failure.getErrorMessage()}",
+            ),
+        )
+
+    def pause_engine(self, paused: bool) -> None:
+        """暂停或恢复 Scrapy 引擎, 由写入线程在积压的任务过多或清空时调用."""
+        engine = self.crawler.engine if self.crawler is not None else None
+        if engine is None: return
+        if paused:
+            engine.pause()
+            self.logger.debug("数据库写入积压过多, 暂停下载新的页面.")
+        else:
+            engine.unpause()
+
+    def _write_book(self, item: BookItem) -> None:
+        # 在写入线程中执行: 添加书籍
+        self.db_manager.add_book(item)
+        # 如果该书籍有缓存的章节, 则一并添加到数据库
+        cached = self.chapter_cache.pop(hash_(item), [])
+        if cached: self.db_manager.add_chapters(cached)
+
+    def _write_chapters(self, buffer: dict[str, list[ChapterItem]]) -> None:
+        # 在写入线程中执行: 每本书籍的章节在一个事务中写入
+        for book_hash, chapter_list in buffer.items():
+            # 如果书籍尚不存在, 则缓存章节, 等待 BookItem 到达
+            if not self.db_manager.add_chapters(chapter_list):
+                self.chapter_cache[book_hash].extend(chapter_list)
+
+    def _finish(self, _: None, spider: GeneralSpider) -> None:
+        # 如果仍有章节没有找到所属的书籍, 则记录警告日志
+        for book_hash, chapter_list in self.chapter_cache.items():
+            if not chapter_list: continue
+            spider.logger.warning(
+                f"书籍 {book_hash[:8]} 不存在, "
+                f"有 {len(chapter_list)} 个章节未能写入数据库!",
+            )
+        del self.db_manager
@@ -13,19 +13,21 @@
 
 ## 设置分类
 1. 基础设置: 包括爬虫名称、日志级别、Telnet控制台.
-2. 爬虫模块设置: 包括 Spider 模块的位置.
+2. 爬虫模块设置: 包括 Spider 模块的位置、增量爬取.
 3. 反爬相关设置: 包括 User-Agent、robots.txt、Cookie、下载超时、请求头.
 4. 重新下载设置: 包括重新下载功能开关、重试次数、HTTP 错误码、重新下载的优先级.
 5. 图片下载设置: 包括图片 URL 字段名、图片下载结果字段名、图片存储路径、过期时间.
-6. Item 与 Pipeline 设置: 包括默认 Item 类、并发 Item 数量、启用的 Item 管道.
+6. Item 与 Pipeline 设置: 包括默认 Item 类、并发 Item 数量、启用的 Item 管道、
+   数据库管道的章节写入缓冲和写入线程.
 7. 自动节流扩展: 包括启用状态、初始下载延迟、最大下载延迟、目标并发请求数、调试模式.
 8. 请求并发设置: 包括最大并发请求数、每个域名的最大并发请求数、
    每个 IP 地址的最大并发请求数、下载延迟.
-9. 下载流程控制设置: 包括启用的爬虫中间件、下载中间件、扩展.
+9. 下载流程控制设置: 包括启用的爬虫中间件、下载中间件、扩展, 以及阶段耗时统计和爬取指标服务.
 10. HTTP 缓存设置: 包括启用状态、缓存过期时间、
    缓存目录、忽略的 HTTP 错误码、缓存存储方式.
-11. 请求去重相关设置: 包括 URL 去重方法、Reactor 设置.
+11. 请求去重相关设置: 包括 URL 去重方法、持久化的去重过滤器、Reactor 设置.
 12. 导出相关设置: 包括导出格式与对应的导出器、文件系统存储选项.
+13. 数据库相关设置: 包括 SQLite 性能配置及其覆盖项、封面存储目录.
 """
 
 
@@ -43,6 +45,17 @@ DATA_DIR = Path(Path.cwd()) / "data"   # 数据存储目录, 用于存储图片
 # 爬虫模块设置
 SPIDER_MODULES = ["novel_dl.spiders"]  # 保存 Spider 的位置列表
 NEWSPIDER_MODULE = "novel_dl.spiders"  # 设置在哪里创建新的 Spider
+# 增量爬取: 跳过已经完整保存在数据库中的章节, 内容少于 INCREMENTAL_MIN_LENGTH 个字符的章节会重新获取.
+# 默认禁用, 由 main.py update 启用; 配置了 Feed 导出(如 -o output.epub)时总是禁用, 以导出完整的书籍
+INCREMENTAL_ENABLED = False
+INCREMENTAL_MIN_LENGTH = 800
+# 条件请求: 记录书籍页面和章节列表页面的 ETag、Last-Modified 和内容摘要, 更新书籍时未发生变化的页面不再解析.
+# 默认禁用, 由 main.py update 启用; 配置了 Feed 导出时总是禁用, 以导出完整的书籍
+CONDITIONAL_REQUESTS_ENABLED = False
+# 批量检查更新: 根据最后 UPDATE_RECENT_CHAPTERS 个章节的更新时间估计书籍的更新间隔,
+# 章节更新时间不足时使用 UPDATE_DEFAULT_INTERVAL(单位: 秒)
+UPDATE_RECENT_CHAPTERS = 20
+UPDATE_DEFAULT_INTERVAL = 3 * 24 * 3600
 
 
 # 反爬相关设置
@@ -86,6 +99,11 @@ ITEM_PIPELINES = {             # 设置 Item 的管道
    "novel_dl.pipelines.db.DBPipeline": 100,
    "novel_dl.pipelines.verify.VerifyPipeline": 150,
 }  # 文档: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+# 数据库管道缓冲的最大章节数, 达到后在一个事务中批量写入(设为 1 时逐章写入)
+DB_CHAPTER_BUFFER_SIZE = 200
+DB_CHAPTER_BUFFER_TIMEOUT = 5.0  # 数据库管道缓冲章节的最长时间(单位: 秒)
+DB_WRITER_QUEUE_SIZE = 64        # 数据库写入线程的队列长度, 队列已满时任务进入积压队列
+DB_WRITER_BACKLOG_LIMIT = 64     # 积压的写入任务超过该数量时暂停引擎, 不再下载新的页面
 
 
 # 自动节流扩展(默认禁用), 文档:
@@ -113,12 +131,27 @@ CONCURRENT_REQUESTS = 32
 
 
 # 下载流程控制设置
-SPIDER_MIDDLEWARES: dict[str, str] = {      # 启用的爬虫中间件
+SPIDER_MIDDLEWARES: dict[str, int] = {      # 启用的爬虫中间件
+   "novel_dl.extensions.StageTimer": 990,
 }  # 文档: https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-DOWNLOADER_MIDDLEWARES: dict[str, str] = {  # 启用的下载中间件
+DOWNLOADER_MIDDLEWARES: dict[str, int] = {  # 启用的下载中间件
+   "novel_dl.middlewares.ConditionalRequestMiddleware": 560,
 }  # 文档: https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-EXTENSIONS: dict[str, str] = {              # 启用的扩展
+EXTENSIONS: dict[str, int] = {              # 启用的扩展
+   "novel_dl.extensions.MetricsServer": 510,
 }  # 文档: https://docs.scrapy.org/en/latest/topics/extensions.html
+# 是否记录下载、解析回调和管道的耗时, 爬虫关闭时输出汇总表格
+STAGE_TIMER_ENABLED = True
+STAGE_TIMER_PER_BOOK = True    # 是否在统计信息中按书籍汇总各阶段的耗时
+STAGE_TIMER_BOOK_LIMIT = 20    # 按书籍汇总耗时的书籍数量上限
+# 测量每个管道 process_item 耗时的管道管理器
+ITEM_PROCESSOR = "novel_dl.extensions.TimedItemPipelineManager"
+# 是否在本地 HTTP 端口上以 Prometheus 文本格式输出爬取指标, 用于长时间运行的爬虫
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"    # 指标服务监听的地址
+METRICS_PORT = 9410           # 指标服务监听的端口, 为 0 时随机选择
+METRICS_RATE_INTERVAL = 10.0  # 速率类指标的更新间隔(单位: 秒)
+METRICS_BOOK_LIMIT = 20       # 按书籍输出完成度的书籍数量上限(最近活跃的书籍), 为 0 时只输出汇总
 
 
 # 启用并设置 HTTP 缓存(默认禁用), 文档:
@@ -133,6 +166,16 @@ EXTENSIONS: dict[str, str] = {              # 启用的扩展
 
 # 请求去重相关设置
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"  # 设置使用的 URL 去重方法
+# 持久化且内存有界的去重过滤器, 列表模式下的请求指纹保存在 DUPEFILTER_DIR 中,
+# 删除对应的数据库文件即可重新爬取所有页面. 指纹在请求进入调度器时记录, 因此长时间运行时
+# 应同时设置 JOBDIR, 使调度器中尚未下载的请求在重启后继续执行.
+DUPEFILTER_CLASS = "novel_dl.dupefilters.PersistentDupeFilter"
+DUPEFILTER_PERSIST = True            # 列表模式下是否保存请求指纹
+DUPEFILTER_DIR = DATA_DIR / "dupefilter"  # 请求指纹的存储目录
+DUPEFILTER_MEMORY = 64 * 1024 ** 2   # 布隆过滤器占用的内存上限(单位: 字节)
+DUPEFILTER_CAPACITY = 1_000_000      # 第一个布隆过滤器的容量, 装满后追加容量翻倍的过滤器
+DUPEFILTER_ERROR_RATE = 0.001        # 布隆过滤器的目标误判率, 误判的请求会再到数据库中确认
+DUPEFILTER_FLUSH_SIZE = 1000         # 每积累多少个新指纹写入一次数据库
 TWISTED_REACTOR = (        # 设置使用的 Reactor, 该设置基于 Twisted 框架
    "twisted.internet.asyncioreactor."
    "AsyncioSelectorReactor"
@@ -143,3 +186,26 @@ FEED_EXPORTERS = {                            # 设置导出格式与对应的
    "txt": "novel_dl.exporters.TxtExporter",
    "epub": "novel_dl.exporters.EpubExporter",
 }
+
+
+# 数据库相关设置
+# 分片数据库使用的 SQLite 性能配置, 可选 "safe" 和 "bulk-ingest",
+# 预设的具体内容见 novel_dl.utils.db_manager.SQLITE_PROFILES.
+DB_SQLITE_PROFILE = "safe"
+DB_SQLITE_PRAGMAS: dict[str, str | int] = {  # 覆盖性能配置中的 PRAGMA
+}  # 例如: {"synchronous": "NORMAL"}, 文档: https://www.sqlite.org/pragma.html
+# 分片数据库的容量上限, 书籍数量或文件大小达到上限后新的书籍写入下一个分片
+DB_SHARD_MAX_BOOKS = 5000
+DB_SHARD_MAX_SIZE = 2 * 1024 ** 3     # 单位: 字节
+# 书籍数量和文件大小都低于上限的该比例的分片, 会在重新平衡时合并到其他分片
+DB_SHARD_MERGE_RATIO = 0.25
+# 同时打开的分片数据库数量上限, 超过上限时关闭最久未使用的分片
+DB_MAX_OPEN_SHARDS = 64
+COVER_STORE = DATA_DIR / "covers"  # 封面图片存储目录, 图片以原始数据的哈希值命名
+# 章节内容的压缩方式, 可选 "zstd" 和 "none", 两种方式保存的章节内容都可以直接读取
+DB_CHAPTER_COMPRESSION = "zstd"
+DB_CHAPTER_ZSTD_LEVEL = 3             # zstd 压缩等级
+DB_CHAPTER_DICT_SCOPE = "book"        # 压缩字典的训练范围, 可选 "book"(每本书籍) 和 "site"(每个网站)
+DB_CHAPTER_DICT_SIZE = 64 * 1024      # 压缩字典的大小(单位: 字节)
+DB_CHAPTER_DICT_SAMPLES = 32          # 训练压缩字典至少需要的章节数量
+DICT_STORE = DATA_DIR / "dictionaries"  # 压缩字典存储目录
@@ -52,9 +52,11 @@ class FanqieSpider(GeneralSpider):
         "AUTOTHROTTLE_TARGET_CONCURRENCY": "0.5",
     }
 
-    def __init__(self, novel_url: str | None = None) -> None:
+    def __init__(
+        self, novel_url: str | None = None, novel_urls: Iterable[str] = (),
+    ) -> None:
         """初始化爬虫实例."""
-        super().__init__(novel_url)
+        super().__init__(novel_url, novel_urls)
         self.logger.warning(
             "由于技术原因, 该 Spider 仅提供信息的抓取, 不下载章节内容.",
         )
@@ -23,6 +23,7 @@ from scrapy.http import Request, Response
 
 # 导入自定义库
 from novel_dl.entity.items import BookItem, ChapterItem
+from novel_dl.utils.db_manager import DBManager, PageState
 from novel_dl.utils.identify import hash_
 from novel_dl.utils.str_deal import add_tab, normalize_book_status
 
@@ -47,27 +48,37 @@ class GeneralSpider(Spider, ABC):
         # 书籍模式, 爬虫将直接爬取指定的书籍链接, 并获取书籍的详细信息和章节列表.
         BOOK = (2, "book")
 
-    def __init__(self, novel_url: str | None = None) -> None:
+    def __init__(
+        self, novel_url: str | None = None, novel_urls: Iterable[str] = (),
+    ) -> None:
         """初始化爬虫实例, 设置加载标志, 起始 URL 和运行模式.
 
         加载标志参数用于指定是否在获取列表时下载章节内容,
         运行模式只有两种: 列表模式和书籍模式.
+        novel_urls 用于在书籍模式下依次爬取多本书籍, 如批量检查书籍更新.
         """
         # 调用父类的初始化方法以确保 Scrapy 框架正确设置爬虫实例.
         super().__init__()
 
-        # 根据 novel_url 参数决定爬虫的起始 URL 和运行模式.
+        # 根据 novel_url 和 novel_urls 参数决定爬虫的起始 URL 和运行模式.
         # 如果指定了小说链接, 则以书籍模式运行, 否则以列表模式运行.
-        if novel_url is None:
+        self.book_urls = [novel_url, *novel_urls] if novel_url else list(novel_urls)
+        if not self.book_urls:
             self.start_url = f"https://{self.domain}/"
             self.mode = self.Mode.LIST
         else:
-            self.start_url = novel_url
+            self.start_url = self.book_urls[0]
             self.mode = self.Mode.BOOK
 
         # 记录在书籍模式下爬取的书籍的章节数.
         self.chapter_list_flag: defaultdict[str, bool] = defaultdict(bool)
         self.chapters_crawled: defaultdict[str, int] = defaultdict(int)
+        # 增量爬取时记录每本书籍因已保存而跳过的章节数, 以及已保存的章节索引和来源 URL.
+        self.chapters_skipped: defaultdict[str, int] = defaultdict(int)
+        self.stored_chapters: dict[str, dict[int, set[str]]] = {}
+        # 条件请求时记录每本书籍本次解析的页面状态, 以及未发生变化而跳过解析的页面的状态.
+        self.page_states: defaultdict[str, list[PageState]] = defaultdict(list)
+        self.pages_unchanged: defaultdict[str, list[PageState]] = defaultdict(list)
 
     async def start(self) -> AsyncGenerator[Request, None]:
         """爬虫的入口点, 根据爬虫的运行模式决定起始请求以及回调函数."""
@@ -78,9 +89,14 @@ class GeneralSpider(Spider, ABC):
                 self.logger.info("由于未指定小说链接, 爬虫将以列表模式运行!")
                 yield Request(self.start_url, self.parse_list)
             # 如果是书籍模式, 则直接请求指定的书籍链接, 回调函数为 parse_book.
+            # 多本书籍按照给出的顺序请求, 章节请求的优先级更高, 已开始的书籍会先完成.
             case self.Mode.BOOK:
-                self.logger.info("由于指定了小说链接, 爬虫将以书籍模式运行!")
-                yield Request(self.start_url, self.parse_book)
+                self.logger.info(
+                    f"由于指定了 {len(self.book_urls)} 个小说链接, 爬虫将以书籍模式运行!",
+                )
+                conditional = self.update_option("CONDITIONAL_REQUESTS_ENABLED")
+                for url in self.book_urls:
+                    yield Request(url, self.parse_book, meta={"conditional": conditional})
 
     def parse_list(
             self, response: Response,
@@ -126,6 +142,13 @@ class GeneralSpider(Spider, ABC):
             self, response: Response,
         ) -> Generator[Request | BookItem, None, None]:
         """解析书籍详情页, 获取书籍信息、封面和章节列表, 进一步获取章节信息."""
+        # 如果书籍页面未发生变化, 则不再获取书籍信息, 按照保存的页面状态继续获取章节列表.
+        if response.meta.get("page_unchanged"):
+            self.logger.info(f"书籍页面未发生变化: {response.url}")
+            response.meta["book_hash"] = response.meta["page_state"].book_hash
+            response.meta["index"] = 1
+            yield from self.transform(response)
+            return None
         # 获取书籍信息, 如果获取失败则返回 None.
         try: book_info = self.get_book_info(response)
         except Exception as e:  # noqa: BLE001
@@ -159,7 +182,50 @@ class GeneralSpider(Spider, ABC):
     def transform(
             self, response: Response,
         ) -> None | Generator[Request, None, None]:
-        """转换章节列表页面, 获取章节列表并生成章节请求."""
+        """转换章节列表页面, 获取章节列表并生成章节请求.
+
+        启用条件请求时, 未发生变化的页面不再解析, 按照保存的页面状态直接获取下一个章节列表页面.
+        """
+        # 取出用于传递章节索引的变量
+        index: int = response.meta["index"]
+        book_hash: str = response.meta["book_hash"]
+        state: PageState | None = response.meta.get("page_state")
+        # 检查链接列表中是否存在章节详情页链接
+        content_request: Request | None = None
+        # 如果页面未发生变化, 且页面中第一个章节的索引与保存时相同, 则跳过该页面.
+        if response.meta.get("page_unchanged") and state.index == index:
+            self.pages_unchanged[book_hash].append(state)
+            if state.next_url:
+                content_request = response.follow(
+                    state.next_url, self.transform, priority=10,
+                    meta={"book_hash": book_hash, "conditional": True},
+                )
+            index = state.next_index
+        # 之前的页面中章节数量发生变化时, 保存的页面状态不再适用, 需要重新获取完整的页面.
+        elif response.status == 304:
+            yield Request(
+                response.url, response.request.callback, priority=response.request.priority,
+                dont_filter=True, meta={
+                    "book_hash": book_hash, "index": index,
+                    "conditional": True, "page_refresh": True,
+                },
+            )
+            return None
+        else:
+            yield from self.parse_chapter_list(response)
+            return None
+
+        # 如果所有链接均为章节详情页, 则将 chapter_list_flag 设为 True.
+        if content_request is None: self.finish_chapter_list(book_hash)
+        # 如果章节列表中存在新的章节列表请求, 则将其返回.
+        else:
+            content_request.meta["index"] = index
+            yield content_request
+
+    def parse_chapter_list(
+            self, response: Response,
+        ) -> Generator[Request, None, None] | None:
+        """解析章节列表页面, 生成章节请求和下一个章节列表页面的请求."""
         # 获取章节列表
         result = self.get_chapter_list(response)
         # 如果章节列表获取失败, 则返回 None.
@@ -175,7 +241,10 @@ class GeneralSpider(Spider, ABC):
             if not self.chapter_url_pattern.match(i):
                 content_request = response.follow(
                     i, self.transform, priority=10,
-                    meta={"book_hash": response.meta["book_hash"]},
+                    meta={
+                        "book_hash": response.meta["book_hash"],
+                        "conditional": self.update_option("CONDITIONAL_REQUESTS_ENABLED"),
+                    },
                 )
                 continue
             # 如果链接是章节详情页, 则生成章节请求.
@@ -186,22 +255,68 @@ class GeneralSpider(Spider, ABC):
                     "index": index,
                 },
             )
+            # 如果章节已经完整地保存在数据库中, 则跳过该章节.
+            if self.chapter_stored(response.meta["book_hash"], index, request.url):
+                self.chapters_skipped[response.meta["book_hash"]] += 1
+                index += 1
+                continue
             self.chapters_crawled[response.meta["book_hash"]] += 1
             index += 1
             yield request
 
+        # 记录页面状态, 书籍完整获取后保存, 用于下一次更新时发送条件请求.
+        if "page_digest" in response.meta:
+            self.page_states[response.meta["book_hash"]].append(PageState(
+                response.url, response.meta["book_hash"],
+                response.headers.get("ETag", b"").decode("latin-1"),
+                response.headers.get("Last-Modified", b"").decode("latin-1"),
+                response.meta["page_digest"], len(response.body), response.meta["index"],
+                "" if content_request is None else content_request.url, index,
+            ))
+
         # 如果所有链接均为章节详情页, 则将 chapter_list_flag 设为 True.
-        if content_request is None:
-            self.chapter_list_flag[response.meta["book_hash"]] = True
-            self.logger.info(
-                f"书籍 {response.meta['book_hash'][:8]} 的章节列表获取完成, "
-                f"共计 {self.chapters_crawled[response.meta['book_hash']]} 章.",
-            )
+        if content_request is None: self.finish_chapter_list(response.meta["book_hash"])
         # 如果章节列表中存在新的章节列表请求, 则将其返回.
         else:
             content_request.meta["index"] = index
             yield content_request
 
+    def finish_chapter_list(self, book_hash: str) -> None:
+        """记录书籍的章节列表获取完成."""
+        self.chapter_list_flag[book_hash] = True
+        self.stored_chapters.pop(book_hash, None)
+        skipped = self.chapters_skipped[book_hash]
+        unchanged = len(self.pages_unchanged[book_hash])
+        self.logger.info(
+            f"书籍 {book_hash[:8]} 的章节列表获取完成, "
+            f"共计 {self.chapters_crawled[book_hash]} 章"
+            f"{f', 跳过已保存的 {skipped} 章' if skipped else ''}"
+            f"{f', 跳过未变化的 {unchanged} 个页面' if unchanged else ''}.",
+        )
+
+    def update_option(self, name: str) -> bool:
+        """判断用于更新书籍的设置(如 INCREMENTAL_ENABLED)是否启用.
+
+        配置了 Feed 导出(如 -o output.epub)时总是视为禁用, 保证导出的书籍包含所有章节.
+        """
+        settings = getattr(self, "settings", None)
+        if settings is None or settings.getdict("FEEDS"): return False
+        return settings.getbool(name)
+
+    def chapter_stored(self, book_hash: str, index: int, url: str) -> bool:
+        """判断章节是否已经完整地保存在数据库中, 由设置中的 INCREMENTAL_ENABLED 启用.
+
+        只有相同索引的已保存章节的来源中包含该链接, 且内容不少于 INCREMENTAL_MIN_LENGTH 个字符时,
+        才视为已保存; 缺失、过短或索引发生变化的章节都需要重新获取.
+        """
+        if not self.update_option("INCREMENTAL_ENABLED"): return False
+        # 每本书籍只在第一次检查时查询数据库, 章节列表获取完成后释放
+        if book_hash not in self.stored_chapters:
+            self.stored_chapters[book_hash] = DBManager().stored_chapters(
+                book_hash, self.settings.getint("INCREMENTAL_MIN_LENGTH", 800),
+            )
+        return url in self.stored_chapters[book_hash].get(index, ())
+
     def get_html(self, response: Response) -> Selector | None:
         """获取并返回响应的 HTML 内容."""
         # 获取整个 HTML 页面
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: batch_export.py
+# @Time: 16/10/2026 14:20
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""使用进程池并行导出多本书籍.
+
+每个工作进程以只读方式打开自己的数据库连接, 书籍的章节内容从数据库中流式读取并写入文件.
+"""
+
+
+# 导入标准库
+import multiprocessing
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple
+
+# 导入自定义库
+from novel_dl.utils.db_manager import DBManager
+from novel_dl.utils.epub import write_epub_stream
+
+
+# 工作进程中的只读数据库管理器
+_db_manager: DBManager | None = None
+
+
+class ExportResult(NamedTuple):
+    """单本书籍的导出结果."""
+
+    book_hash: str
+    title: str
+    path: Path
+    chapters: int
+    size: int
+    elapsed: float
+
+
+def _init_worker() -> None:
+    """工作进程的初始化函数, 以只读方式连接数据库."""
+    global _db_manager  # noqa: PLW0603
+    _db_manager = DBManager(read_only=True)
+
+
+def export_book(
+    book_hash: str, output_dir: Path, db_manager: DBManager | None = None,
+) -> ExportResult | None:
+    """导出一本书籍为 epub 文件, 如果书籍不存在则返回 None.
+
+    db_manager 为空时使用工作进程中的只读数据库管理器.
+    """
+    start = time.perf_counter()
+    db_manager = db_manager or _db_manager or DBManager(read_only=True)
+    # 查询书籍信息, 章节内容不会在此时读取
+    book = db_manager.search_book_by_hash(book_hash)
+    if book is None: return None
+    # 章节内容从数据库中流式读取并写入文件
+    path = output_dir / f"{book.author}-{book.title}.epub"
+    with closing(db_manager.iter_chapter_contents(book_hash)) as rows:
+        write_epub_stream(book, path, rows)
+    # 返回导出结果
+    return ExportResult(
+        book_hash, book.title, path, len(book.chapters),
+        path.stat().st_size, time.perf_counter() - start,
+    )
+
+
+def export_books(
+    hash_list: Iterable[str], output_dir: Path, workers: int,
+) -> Iterator[ExportResult | None]:
+    """使用 workers 个进程并行导出书籍, 按完成顺序生成每本书籍的导出结果."""
+    # 使用 spawn 方式创建进程, 避免子进程继承父进程中已打开的数据库连接
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker,
+    ) as executor:
+        futures = [
+            executor.submit(export_book, book_hash, output_dir)
+            for book_hash in hash_list
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: bloom.py
+# @Time: 17/10/2026 01:20
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""可扩展的布隆过滤器.
+
+由一组容量逐个翻倍、误判率逐个减半的布隆过滤器组成, 当前的过滤器装满后追加新的过滤器,
+总误判率不超过设定值. 所有过滤器占用的内存达到上限后不再追加, 之后的元素继续写入最后一个
+过滤器, 此时误判率会逐渐升高, 可以通过 estimated_error_rate 观察.
+"""
+
+
+# 导入标准库
+import hashlib
+import math
+
+
+class BloomFilter:
+    """容量和误判率固定的布隆过滤器."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """初始化布隆过滤器, 位数组的大小由容量和误判率决定."""
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def size_of(capacity: int, error_rate: float) -> int:
+        """计算指定容量和误判率的布隆过滤器占用的字节数."""
+        bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        return (bits + 7) // 8
+
+    def __positions(self, key: bytes) -> list[int]:
+        # 使用双重哈希从一个摘要生成所有的位置
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.array[i >> 3] & (1 << (i & 7)) for i in self.__positions(key))
+
+    def add(self, key: bytes) -> None:
+        """添加元素, 调用方需要保证元素不在过滤器中, 否则计数会偏大."""
+        for i in self.__positions(key): self.array[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    @property
+    def estimated_error_rate(self) -> float:
+        """根据已添加的元素数量估计当前的误判率."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+
+class ScalableBloomFilter:
+    """可扩展的布隆过滤器, 占用的内存不超过 max_memory 字节."""
+
+    # 每个新过滤器相对于上一个的容量倍数和误判率比例
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(
+        self, capacity: int = 1_000_000, error_rate: float = 0.001,
+        max_memory: int = 64 * 1024 ** 2,
+    ) -> None:
+        """初始化可扩展的布隆过滤器."""
+        # 各个过滤器的误判率之和为等比数列, 第一个过滤器的误判率使总和不超过 error_rate
+        self.error_rate = error_rate
+        # 第一个过滤器的大小不能超过内存上限
+        bits_per_key = -math.log(error_rate * (1 - self.TIGHTENING)) / math.log(2) ** 2
+        self.capacity = max(1, min(capacity, int(max_memory * 8 / bits_per_key)))
+        self.max_memory = max_memory
+        self.filters: list[BloomFilter] = []
+        # 是否已经因为内存上限而停止追加过滤器
+        self.saturated = False
+        self.__grow()
+
+    def __len__(self) -> int:
+        return sum(i.count for i in self.filters)
+
+    def __contains__(self, key: bytes) -> bool:
+        return any(key in i for i in reversed(self.filters))
+
+    def __grow(self) -> None:
+        # 追加一个新的过滤器, 第一个过滤器总是创建, 之后的过滤器受内存上限限制
+        index = len(self.filters)
+        capacity = self.capacity * self.GROWTH ** index
+        error_rate = self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** index
+        if self.filters and self.memory + BloomFilter.size_of(capacity, error_rate) > self.max_memory:
+            self.saturated = True
+            return
+        self.filters.append(BloomFilter(capacity, error_rate))
+
+    def add(self, key: bytes) -> None:
+        """添加元素, 调用方需要保证元素不在过滤器中."""
+        current = self.filters[-1]
+        if current.count >= current.capacity and not self.saturated:
+            self.__grow()
+        self.filters[-1].add(key)
+
+    @property
+    def memory(self) -> int:
+        """所有过滤器占用的字节数."""
+        return sum(len(i.array) for i in self.filters)
+
+    @property
+    def estimated_error_rate(self) -> float:
+        """根据每个过滤器已添加的元素数量估计当前的总误判率."""
+        result = 1.0
+        for i in self.filters: result *= 1 - i.estimated_error_rate
+        return 1 - result
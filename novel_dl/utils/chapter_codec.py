@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: chapter_codec.py
+# @Time: 16/10/2026 21:30
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""章节内容的压缩存储.
+
+章节内容使用 zstd 压缩后保存在 chapters 表的 content 列中. 同一本小说(或同一个网站)的章节
+用词和格式相近, 可以用已有的章节训练压缩字典. 字典以字典 ID 和训练范围为文件名保存在
+DICT_STORE 目录中, 压缩数据的帧头记录了所用字典的 ID, 因此解压时不需要额外的信息.
+旧版本以文本保存的章节内容和未压缩的章节内容仍然可以直接读取.
+"""
+
+
+# 导入标准库
+import threading
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# 导入第三方库
+import zstandard
+
+# 导入自定义库
+from novel_dl.settings import (
+    DB_CHAPTER_COMPRESSION,
+    DB_CHAPTER_DICT_SAMPLES,
+    DB_CHAPTER_DICT_SCOPE,
+    DB_CHAPTER_DICT_SIZE,
+    DB_CHAPTER_ZSTD_LEVEL,
+    DICT_STORE,
+)
+from novel_dl.utils.cover_store import write_file
+from novel_dl.utils.identify import data_hash
+
+
+# zstd 压缩帧的文件头, 不是合法的 UTF-8 字节序列, 不会与未压缩的内容混淆
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# 在 SQL 中读取章节内容的函数名, 每个数据库连接建立时注册
+SQL_DECODE_FUNCTION = "novel_dl_text"
+# 压缩器和解压器不能在多个线程中同时使用, 因此每个线程缓存自己的实例
+_local = threading.local()
+
+
+def dict_path(dict_id: int) -> Path:
+    """获取指定 ID 的压缩字典的存储路径."""
+    return DICT_STORE / "id" / f"{dict_id}.zdict"
+
+
+def scope_path(scope: str) -> Path:
+    """获取指定训练范围的压缩字典的存储路径."""
+    return DICT_STORE / "scope" / f"{data_hash(scope.encode('UTF-8'))}.zdict"
+
+
+def chapter_scope(book_hash: str, sources: list[str]) -> str:
+    """获取章节所属的字典训练范围, 由设置中的 DB_CHAPTER_DICT_SCOPE 决定."""
+    if DB_CHAPTER_DICT_SCOPE == "site" and sources:
+        return f"site:{urlsplit(sources[0]).netloc}"
+    return f"book:{book_hash}"
+
+
+@lru_cache(maxsize=256)
+def _dict_by_id(dict_id: int) -> zstandard.ZstdCompressionDict:
+    """读取指定 ID 的压缩字典, 如果字典不存在则抛出 FileNotFoundError."""
+    return zstandard.ZstdCompressionDict(dict_path(dict_id).read_bytes())
+
+
+@lru_cache(maxsize=256)
+def _dict_by_scope(scope: str) -> zstandard.ZstdCompressionDict | None:
+    """读取指定训练范围的压缩字典, 如果没有训练过字典则返回 None."""
+    path = scope_path(scope)
+    if not path.exists(): return None
+    zdict = zstandard.ZstdCompressionDict(path.read_bytes())
+    zdict.precompute_compress(level=DB_CHAPTER_ZSTD_LEVEL)
+    return zdict
+
+
+def _compressor(zdict: zstandard.ZstdCompressionDict | None) -> zstandard.ZstdCompressor:
+    """获取当前线程中使用指定字典的压缩器."""
+    cache: dict[int, zstandard.ZstdCompressor] = _local.__dict__.setdefault("compressors", {})
+    key = zdict.dict_id() if zdict else 0
+    if key not in cache:
+        cache[key] = zstandard.ZstdCompressor(
+            level=DB_CHAPTER_ZSTD_LEVEL, dict_data=zdict,
+        ) if zdict else zstandard.ZstdCompressor(level=DB_CHAPTER_ZSTD_LEVEL)
+    return cache[key]
+
+
+def _decompressor(dict_id: int) -> zstandard.ZstdDecompressor:
+    """获取当前线程中使用指定 ID 的字典的解压器, ID 为 0 表示不使用字典."""
+    cache: dict[int, zstandard.ZstdDecompressor] = _local.__dict__.setdefault("decompressors", {})
+    if dict_id not in cache:
+        cache[dict_id] = zstandard.ZstdDecompressor(dict_data=_dict_by_id(dict_id)) \
+            if dict_id else zstandard.ZstdDecompressor()
+    return cache[dict_id]
+
+
+def encode_content(content: str, scope: str | None = None) -> bytes:
+    """将章节内容编码为保存到数据库中的数据, 有训练范围的字典时使用字典压缩."""
+    data = content.encode("UTF-8")
+    if DB_CHAPTER_COMPRESSION != "zstd": return data
+    return _compressor(_dict_by_scope(scope) if scope else None).compress(data)
+
+
+def decode_content(value: bytes | str) -> str:
+    """将数据库中保存的数据解码为章节内容, 兼容压缩、未压缩以及旧版本的文本数据."""
+    if isinstance(value, str): return value
+    value = bytes(value)
+    if value[:4] != ZSTD_MAGIC: return value.decode("UTF-8")
+    # 从帧头中读取字典 ID, 为 0 时表示没有使用字典
+    dict_id = zstandard.get_frame_parameters(value).dict_id
+    return _decompressor(dict_id).decompress(value).decode("UTF-8")
+
+
+def sql_decode_content(value: bytes | str | None) -> str | None:
+    """在 SQL 中使用的解码函数, 用于全文索引读取章节内容."""
+    return None if value is None else decode_content(value)
+
+
+def train_dictionary(scope: str, samples: list[str]) -> int | None:
+    """用章节内容训练指定训练范围的压缩字典, 返回字典 ID.
+
+    如果样本数量少于 DB_CHAPTER_DICT_SAMPLES 或者样本不足以训练字典, 则返回 None.
+    """
+    if len(samples) < DB_CHAPTER_DICT_SAMPLES: return None
+    try:
+        zdict = zstandard.train_dictionary(
+            DB_CHAPTER_DICT_SIZE, [i.encode("UTF-8") for i in samples],
+        )
+    except zstandard.ZstdError:
+        return None
+    # 字典同时按照 ID 和训练范围保存, 分别用于解压和压缩
+    data = zdict.as_bytes()
+    write_file(dict_path(zdict.dict_id()), data)
+    write_file(scope_path(scope), data)
+    _dict_by_scope.cache_clear()
+    return zdict.dict_id()
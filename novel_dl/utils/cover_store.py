@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: cover_store.py
+# @Time: 16/10/2026 17:05
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""按内容寻址的封面图片存储.
+
+封面图片以原始数据的哈希值为文件名保存在 COVER_STORE 目录中, 数据库中只记录哈希值.
+内容相同的封面无论属于哪本书籍、来自哪个来源, 都只保存一份.
+封面转换为 JPG 格式的结果也以原图的哈希值为键缓存在 COVER_STORE/jpg 目录中.
+"""
+
+
+# 导入标准库
+import os
+import tempfile
+from pathlib import Path
+
+# 导入自定义库
+from novel_dl.settings import COVER_STORE
+from novel_dl.utils.identify import data_hash
+
+
+def cover_path(cover_hash: str) -> Path:
+    """获取封面图片的存储路径, 使用哈希值的前四位分为两级目录."""
+    return COVER_STORE / cover_hash[:2] / cover_hash[2:4] / cover_hash
+
+
+def jpg_path(cover_hash: str) -> Path:
+    """获取封面图片转换为 JPG 格式后的缓存路径."""
+    return COVER_STORE / "jpg" / cover_hash[:2] / cover_hash
+
+
+def save_cover(data: bytes, cover_hash: str | None = None) -> str:
+    """保存封面图片并返回其哈希值, 如果内容相同的图片已经存在则不会重复写入."""
+    # 计算图片的哈希值并获取存储路径
+    cover_hash = cover_hash or data_hash(data)
+    path = cover_path(cover_hash)
+    if not path.exists(): write_file(path, data)
+    # 返回图片的哈希值
+    return cover_hash
+
+
+def load_cover(cover_hash: str) -> bytes:
+    """读取封面图片的原始数据, 如果图片不存在则抛出 FileNotFoundError."""
+    return cover_path(cover_hash).read_bytes()
+
+
+def has_cover(cover_hash: str) -> bool:
+    """判断封面图片是否已经保存."""
+    return cover_path(cover_hash).exists()
+
+
+def save_jpg(cover_hash: str, data: bytes) -> None:
+    """缓存封面图片转换为 JPG 格式的结果."""
+    write_file(jpg_path(cover_hash), data)
+
+
+def load_jpg(cover_hash: str) -> bytes | None:
+    """读取缓存的 JPG 格式封面图片, 如果没有缓存则返回 None."""
+    path = jpg_path(cover_hash)
+    return path.read_bytes() if path.exists() else None
+
+
+def write_file(path: Path, data: bytes) -> None:
+    """先写入临时文件再重命名, 避免其他进程读取到不完整的文件."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        Path(temp_name).replace(path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
@@ -8,34 +8,217 @@
 
 # 导入标准库
 import threading
-from functools import reduce
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NamedTuple, TypeVar
 
 # 导入第三方库
-from sqlalchemy import Engine, create_engine, func
+from sqlalchemy import (
+    Engine,
+    create_engine,
+    delete,
+    distinct,
+    event,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.sql import ColumnElement
 
 # 导入自定义库
 from novel_dl.entity.base import Book, Chapter
 from novel_dl.entity.convert import (
+    book_to_index_rows,
     book_to_record,
     chapter_to_record,
+    cover_to_record,
     item_to_book,
     item_to_chapter,
-    record_to_book,
     record_to_chapter,
 )
 from novel_dl.entity.items import BookItem, ChapterItem
-from novel_dl.entity.models import Base, BookTable, ChapterTable, IndexTable
-from novel_dl.settings import DATA_DIR
-from novel_dl.utils.identify import hash_
+from novel_dl.entity.lazy import record_to_lazy_book
+from novel_dl.entity.models import (
+    Base,
+    BookSourceTable,
+    BookTable,
+    CatalogBase,
+    CatalogTable,
+    ChapterSourceTable,
+    ChapterTable,
+    CoverTable,
+    IndexTable,
+    PageStateTable,
+    ShardTable,
+)
+from novel_dl.settings import (
+    DATA_DIR,
+    DB_MAX_OPEN_SHARDS,
+    DB_SHARD_MAX_BOOKS,
+    DB_SHARD_MAX_SIZE,
+    DB_SHARD_MERGE_RATIO,
+    DB_SQLITE_PRAGMAS,
+    DB_SQLITE_PROFILE,
+)
+from novel_dl.utils.chapter_codec import (
+    SQL_DECODE_FUNCTION,
+    chapter_scope,
+    decode_content,
+    encode_content,
+    scope_path,
+    sql_decode_content,
+    train_dictionary,
+)
+from novel_dl.utils.cover_store import save_cover
+from novel_dl.utils.fulltext import (
+    SearchHit,
+    ensure_fulltext,
+    rebuild_fulltext,
+    search_fulltext,
+)
+from novel_dl.utils.identify import book_fingerprint, hash_
+from novel_dl.utils.image_probe import probe_image
+from novel_dl.utils.str_deal import bigrams
 
 
+# 分片查询函数的返回值类型
+T = TypeVar("T")
+# 训练一个压缩字典最多使用的章节数量
+DICT_MAX_SAMPLES = 1000
+# 分片数据库结构的版本, 修改分片的表结构或迁移逻辑时需要增加该值,
+# 版本低于该值的分片在下次打开时会执行迁移和建表
+SHARD_SCHEMA_VERSION = 2
 # 设置数据库文件夹
 DB_FOLDER = DATA_DIR / "db"
 # 确保数据库文件夹存在
 if not DB_FOLDER.exists():
     DB_FOLDER.mkdir(parents=True, exist_ok=True)
+# 设置路由目录数据库文件, 用于记录每本书籍所在的分片数据库
+CATALOG_PATH = DB_FOLDER / "catalog.sqlite"
+# SQLite 性能配置的预设, 每个数据库连接建立时都会执行对应的 PRAGMA
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    # 安全配置: 每次提交都同步到磁盘, 断电也不会丢失已提交的事务
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous":  "FULL",
+        "cache_size":   -16384,         # 16 MiB
+        "mmap_size":    0,
+        "temp_store":   "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # 批量写入配置: 不等待磁盘同步, 系统崩溃时可能丢失最近的事务
+    "bulk-ingest": {
+        "journal_mode": "WAL",
+        "synchronous":  "OFF",
+        "cache_size":   -262144,        # 256 MiB
+        "mmap_size":    1 << 30,        # 1 GiB
+        "temp_store":   "MEMORY",
+        "busy_timeout": 30000,
+    },
+}
+
+
+def create_sqlite_engine(
+    db_path: Path, profile: str | None = None, read_only: bool = False,
+) -> Engine:
+    """创建 SQLite 数据库引擎, 并在每个连接上应用性能配置.
+
+    profile 为 SQLITE_PROFILES 中的预设名称, 默认使用设置中的 DB_SQLITE_PROFILE,
+    设置中的 DB_SQLITE_PRAGMAS 会覆盖预设中的同名 PRAGMA.
+    read_only 为 True 时以只读方式打开已存在的数据库文件, 且不修改日志模式.
+    """
+    # 获取要执行的 PRAGMA
+    pragmas = {
+        **SQLITE_PROFILES[profile or DB_SQLITE_PROFILE], **DB_SQLITE_PRAGMAS,
+    }
+    if read_only: pragmas.pop("journal_mode", None)
+    # 创建数据库引擎
+    engine = create_engine(
+        f"sqlite:///file:{db_path}?mode=ro&uri=true" if read_only
+        else f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+    )
+
+    # 在每个新建立的连接上执行 PRAGMA, 并注册读取章节内容的函数
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _) -> None:  # noqa: ANN001
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key} = {value}")
+        cursor.close()
+        dbapi_connection.create_function(
+            SQL_DECODE_FUNCTION, 1, sql_decode_content, deterministic=True,
+        )
+
+    # 返回数据库引擎
+    return engine
+
+
+class CompressResult(NamedTuple):
+    """重新压缩章节内容的结果, 大小的单位为字节."""
+
+    chapters: int
+    rewritten: int
+    dictionaries: int
+    content_before: int
+    content_after: int
+    file_before: int
+    file_after: int
+    elapsed: float
+
+
+class ShardUsage(NamedTuple):
+    """分片数据库的书籍数量、估计大小(单位: 字节)和结构版本."""
+
+    books: int
+    size: int
+    schema_version: int = 0
+
+
+class PageState(NamedTuple):
+    """页面的缓存验证信息, 用于发送条件请求和判断页面是否发生变化."""
+
+    url: str
+    book_hash: str | None
+    etag: str
+    last_modified: str
+    digest: str
+    size: int
+    index: int
+    next_url: str
+    next_index: int
+
+
+class UpdateCandidate(NamedTuple):
+    """需要检查更新的书籍, 以及最近章节的更新时间, 时间的单位为秒.
+
+    interval 为最近章节的平均更新间隔, 没有足够的章节更新时间时为 None.
+    """
+
+    book_hash: str
+    title: str
+    author: str
+    state: int
+    urls: tuple[str, ...]
+    chapters: int
+    last_update: float
+    interval: float | None
+
+
+class RebalanceResult(NamedTuple):
+    """重新平衡分片的结果."""
+
+    moved: int
+    created: int
+    removed: int
+    elapsed: float
 
 
 def synchronized(func):
@@ -55,179 +238,878 @@ class DBManager:
     instance = None
 
     @synchronized
-    def __new__(cls) -> "DBManager":
+    def __new__(cls, read_only: bool = False) -> "DBManager":  # noqa: ARG004
         """实现单例模式."""
         if not cls.instance:
             cls.instance = super(DBManager, cls).__new__(cls)
         return cls.instance
 
-    def __init__(self) -> None:
-        """初始化数据库管理器."""
+    def __init__(self, read_only: bool = False) -> None:
+        """初始化数据库管理器, 单例只会初始化一次.
+
+        read_only 为 True 时以只读方式连接已存在的数据库, 用于导出等只读任务,
+        这些任务通常在独立的进程中运行.
+        分片的清单(书籍数量、大小和结构版本)保存在路由目录中, 初始化时不会连接任何分片,
+        分片在第一次使用时才连接, 同时打开的分片数量不超过 DB_MAX_OPEN_SHARDS.
+        """
+        if getattr(self, "_initialized", False): return
         # 计数器, 用于生成数据库文件名以及标记使用了多少个数据库文件
         self.__counter: int = 0
-        # 所有数据库连接的字典
-        self.__db_dict: dict[
+        # 是否以只读方式连接数据库
+        self.__read_only = read_only
+        # 已连接的分片数据库, 按照最近使用的顺序排列, 超过上限时关闭最久未使用的分片
+        self.__db_dict: OrderedDict[
             Path, tuple[Engine, scoped_session[Session]],
-        ] = {}
-        # 连接数据库并确保至少有一个未满的数据库
-        while True:
-            self.__connect(self.__counter)
-            if self.__is_full(self.__counter):
-                self.__counter += 1
-            else:
-                break
-        # 记录当前未满的数据库文件路径
-        self.__not_full: Path = self.__get_file_path(self.__counter)
+        ] = OrderedDict()
+        self.__lock = threading.RLock()
+        # 正在被 __using 使用的分片引擎的引用计数, 以及已经移出字典、等待使用结束后关闭的分片
+        self.__in_use: Counter[Engine] = Counter()
+        self.__retired: dict[Engine, scoped_session[Session]] = {}
+        # 每个分片的书籍数量和估计大小, 在写入时维护并保存到路由目录中
+        self.__usage: dict[int, ShardUsage] = {}
+        # 连接路由目录数据库
+        catalog_engine = create_sqlite_engine(CATALOG_PATH, read_only=read_only)
+        if not read_only:
+            CatalogBase.metadata.create_all(catalog_engine)
+            self.__migrate_catalog(catalog_engine)
+        self.__catalog = scoped_session(sessionmaker(bind=catalog_engine))
+        self._initialized = True
+        # 只读模式下只使用已存在的数据库, 不创建新的数据库
+        if read_only: return
+        # 读取路由目录中的分片清单, 磁盘上不在清单中的分片(如旧版本的数据)在此时登记
+        with self.__catalog() as session:
+            self.__usage = {
+                i.shard: ShardUsage(i.books, i.size, i.schema_version)
+                for i in session.query(ShardTable)
+            }
+        for index in self.__shard_indexes():
+            if index not in self.__usage: self.__shard_session(index)
+        # 找到未满的数据库
+        self.__advance()
+        # 如果路由目录为空但分片中已有书籍(如旧版本的数据), 则重建路由目录
+        with self.__catalog() as session:
+            catalog_empty = session.query(CatalogTable).first() is None
+        if catalog_empty and any(i.books for i in self.__usage.values()):
+            self.rebuild_catalog()
+
+    @staticmethod
+    def __migrate_catalog(engine: Engine) -> None:
+        # 旧版本的分片表没有记录结构版本, 补充该列, 对应的分片在下次打开时执行迁移
+        columns = {i["name"] for i in inspect(engine).get_columns(ShardTable.__tablename__)}
+        if "schema_version" in columns: return
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE shards ADD COLUMN schema_version INTEGER NOT NULL DEFAULT 0",
+            ))
 
     def __get_file_path(self, index: int) -> Path:
         # 根据索引获取数据库文件路径
         db_file_name = f"novel_dl_{str(index).rjust(5, '0')}.sqlite"
         return DB_FOLDER / db_file_name
 
+    @staticmethod
+    def __shard_indexes() -> list[int]:
+        # 收集磁盘上所有的分片数据库序号
+        return sorted(
+            int(i.stem.split("_")[-1])
+            for i in DB_FOLDER.glob("novel_dl_*.sqlite")
+        )
+
     def __connect(self, index: int) -> None:
         # 获取数据库文件路径
         db_path = self.__get_file_path(index)
-        # 创建数据库连接、数据库表和会话工厂
-        engine = create_engine(
-            f"sqlite:///{db_path}",
-            connect_args={"check_same_thread": False},
-        )
-        Base.metadata.create_all(engine)
+        # 创建数据库连接和会话工厂
+        engine = create_sqlite_engine(db_path, read_only=self.__read_only)
         session_factory = scoped_session(sessionmaker(bind=engine))
-        # 将连接和会话工厂存入字典
+        # 新的分片或结构版本过低的分片需要执行迁移和建表
+        usage = self.__usage.get(index)
+        if not self.__read_only and (
+            usage is None or usage.schema_version < SHARD_SCHEMA_VERSION
+        ):
+            self.__migrate_covers(engine)
+            self.__migrate_chapters(engine)
+            index_missing = not inspect(engine).has_table(IndexTable.__tablename__)
+            Base.metadata.create_all(engine)
+            if index_missing: self.__rebuild_index(engine)
+            ensure_fulltext(engine)
+            # 以实际的文件大小作为估计大小, 不在清单中的分片统计一次书籍数量
+            if usage is None:
+                with engine.connect() as connection:
+                    books = connection.execute(
+                        select(func.count(BookTable.book_hash)),
+                    ).scalar_one()
+            else:
+                books = usage.books
+            self.__save_usage(index, ShardUsage(
+                books, self.__file_size(engine, db_path), SHARD_SCHEMA_VERSION,
+            ))
+        # 将连接和会话工厂存入字典, 超过上限时关闭最久未使用的分片
         self.__db_dict[db_path] = (engine, session_factory)
+        while len(self.__db_dict) > DB_MAX_OPEN_SHARDS:
+            _, (old_engine, old_factory) = self.__db_dict.popitem(last=False)
+            self.__retire(old_engine, old_factory)
+
+    def __retire(self, engine: Engine, session_factory: scoped_session[Session]) -> None:
+        # 关闭已经移出字典的分片, 调用时需要持有锁; 仍在其他线程中使用时推迟到使用结束后关闭
+        if self.__in_use[engine]:
+            self.__retired[engine] = session_factory
+            return
+        session_factory.remove()
+        engine.dispose()
+
+    @contextmanager
+    def __using(self, index: int) -> Iterator[tuple[Engine, scoped_session[Session]]]:
+        # 获取分片并在使用期间持有引用, 使用期间分片被移出字典时不会被关闭
+        with self.__lock:
+            engine, session_factory = self.__shard(index)
+            self.__in_use[engine] += 1
+        try:
+            yield engine, session_factory
+        finally:
+            with self.__lock:
+                self.__in_use[engine] -= 1
+                if not self.__in_use[engine]:
+                    del self.__in_use[engine]
+                    retired = self.__retired.pop(engine, None)
+                    if retired is not None: self.__retire(engine, retired)
+
+    @staticmethod
+    def __migrate_covers(engine: Engine) -> None:
+        # 旧版本的封面表直接保存图片数据, 将图片移入封面存储后重建封面表
+        inspector = inspect(engine)
+        if not inspector.has_table(CoverTable.__tablename__): return
+        columns = {i["name"] for i in inspector.get_columns(CoverTable.__tablename__)}
+        if "image" not in columns:
+            # 旧版本的封面表没有记录图片格式, 补充该列, 已有记录的格式留空
+            if "format" not in columns:
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        "ALTER TABLE covers ADD COLUMN format VARCHAR(16) NOT NULL DEFAULT ''",
+                    ))
+            return
+        with engine.begin() as connection:
+            # 逐行读取旧的封面记录, 保存图片并从文件头读取图片尺寸和格式
+            rows: list[dict[str, str | int]] = []
+            for source, image, book_hash in connection.execute(
+                text("SELECT source, image, book_hash FROM covers"),
+            ):
+                width, height, image_format = probe_image(image)
+                rows.append({
+                    "cover_hash": save_cover(image), "source": source,
+                    "width": width, "height": height, "format": image_format,
+                    "book_hash": book_hash,
+                })
+            # 删除旧的封面表, 按照新的结构重建并写回记录
+            connection.execute(text("DROP TABLE covers"))
+            CoverTable.__table__.create(connection)
+            if rows: connection.execute(insert(CoverTable), rows)
+        # 回收旧的图片数据占用的空间
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT",
+        ) as connection:
+            connection.execute(text("VACUUM"))
+
+    @staticmethod
+    def __migrate_chapters(engine: Engine) -> None:
+        # 旧版本的章节表没有记录内容的字符数, 补充该列并解压已有的章节内容计算字符数
+        inspector = inspect(engine)
+        if not inspector.has_table(ChapterTable.__tablename__): return
+        columns = {i["name"] for i in inspector.get_columns(ChapterTable.__tablename__)}
+        if "content_length" in columns: return
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE chapters ADD COLUMN content_length INTEGER NOT NULL DEFAULT 0",
+            ))
+            # 函数名为模块中的常量, 不包含外部输入
+            connection.execute(text(
+                f"UPDATE chapters SET content_length = length({SQL_DECODE_FUNCTION}(content))",  # noqa: S608
+            ))
+
+    @staticmethod
+    def __rebuild_index(engine: Engine) -> None:
+        # 依据书籍表重建索引表, 并删除旧版本按单字记录的索引表
+        with engine.begin() as connection:
+            connection.execute(text('DROP TABLE IF EXISTS "index"'))
+            rows = [
+                row
+                for book_hash, title, author in connection.execute(
+                    select(BookTable.book_hash, BookTable.title, BookTable.author),
+                )
+                for row in book_to_index_rows(book_hash, title, author)
+            ]
+            if rows: connection.execute(insert(IndexTable), rows)
+
+    def __get_usage(self, index: int) -> ShardUsage:
+        # 获取分片的计数器, 分片在连接时初始化计数器
+        if index not in self.__usage: self.__shard_session(index)
+        return self.__usage[index]
+
+    def __save_usage(
+        self, index: int, usage: ShardUsage, session: Session | None = None,
+    ) -> None:
+        # 更新分片的计数器并保存到路由目录中, 传入会话时由调用方提交
+        self.__usage[index] = usage
+        if session is not None:
+            session.merge(ShardTable(
+                shard=index, books=usage.books, size=usage.size,
+                schema_version=usage.schema_version,
+            ))
+            return
+        with self.__catalog() as catalog_session:
+            self.__save_usage(index, usage, catalog_session)
+            catalog_session.commit()
+
+    def __add_usage(self, index: int, books: int = 0, size: int = 0) -> None:
+        # 在写入后增减分片的计数器
+        usage = self.__get_usage(index)
+        self.__save_usage(index, usage._replace(
+            books=usage.books + books, size=max(usage.size + size, 0),
+        ))
 
     def __is_full(self, index: int) -> bool:
-        # 获取数据库文件路径
+        # 判断书籍数量或文件大小是否达到上限
+        usage = self.__get_usage(index)
+        return usage.books >= DB_SHARD_MAX_BOOKS or usage.size >= DB_SHARD_MAX_SIZE
+
+    def __is_over(self, index: int) -> bool:
+        # 判断书籍数量或文件大小是否超过上限
+        usage = self.__get_usage(index)
+        return usage.books > DB_SHARD_MAX_BOOKS or usage.size > DB_SHARD_MAX_SIZE
+
+    def __has_room(self, index: int, size: int) -> bool:
+        # 判断分片是否还能放入一本指定大小的书籍
+        usage = self.__get_usage(index)
+        return usage.books + 1 <= DB_SHARD_MAX_BOOKS \
+            and usage.size + size <= DB_SHARD_MAX_SIZE
+
+    def __advance(self) -> None:
+        # 从第一个分片开始找到未满的分片, 作为新书籍写入的分片
+        self.__counter = 0
+        while self.__is_full(self.__counter): self.__counter += 1
+
+    def __shard(self, index: int) -> tuple[Engine, scoped_session[Session]]:
+        # 获取分片的数据库引擎和会话工厂, 如果该分片尚未连接, 则先连接
         db_path = self.__get_file_path(index)
-        # 如果数据库未连接, 则先连接
-        if db_path not in self.__db_dict:
-            self.__connect(index)
-        # 获取会话工厂并查询书籍数量
-        _, session_factory = self.__db_dict[db_path]
-        with session_factory() as session:
-            total = session.query(func.count(BookTable.book_hash)).scalar()
-        # 判断书籍数量是否达到上限(5000本)
-        return total >= 5000
+        with self.__lock:
+            if db_path not in self.__db_dict:
+                self.__connect(index)
+            # 标记为最近使用
+            self.__db_dict.move_to_end(db_path)
+            return self.__db_dict[db_path]
+
+    def __shard_session(self, index: int) -> scoped_session[Session]:
+        # 获取分片的会话工厂
+        return self.__shard(index)[1]
+
+    def __shard_engine(self, index: int) -> Engine:
+        # 获取分片的数据库引擎
+        return self.__shard(index)[0]
+
+    def __known_shards(self) -> list[int]:
+        # 获取所有分片的序号, 只读模式下没有读取分片清单, 因此从磁盘上收集
+        return sorted(self.__usage) if not self.__read_only else self.__shard_indexes()
+
+    def __lookup(self, book_hash: str) -> CatalogTable | None:
+        # 从路由目录中查询书籍的路由记录
+        with self.__catalog() as session:
+            return session.get(CatalogTable, book_hash)
+
+    def __locate(self, book_hash: str) -> scoped_session[Session] | None:
+        # 从路由目录中查询书籍所在的分片
+        record = self.__lookup(book_hash)
+        # 如果路由目录中没有该书籍, 则说明书籍不存在
+        if record is None: return None
+        # 返回该分片的会话工厂
+        return self.__shard_session(record.shard)
+
+    def __register(
+        self, book_hash: str, index: int, fingerprint: str | None = None,
+        size: int | None = None,
+    ) -> None:
+        # 在路由目录中记录书籍所在的分片和书籍元数据的指纹
+        # 传入 size 时表示分片中新增了一本书籍, 在同一个事务中更新分片的计数器
+        with self.__catalog() as session:
+            session.merge(
+                CatalogTable(
+                    book_hash=book_hash, shard=index, fingerprint=fingerprint,
+                ),
+            )
+            if size is not None:
+                usage = self.__get_usage(index)
+                self.__save_usage(index, usage._replace(
+                    books=usage.books + 1, size=usage.size + size,
+                ), session)
+            session.commit()
+
+    def rebuild_catalog(self) -> int:
+        """依据所有分片数据库中的书籍重建路由目录, 返回登记的书籍数量."""
+        # 收集磁盘上所有的分片数据库序号
+        indexes = self.__shard_indexes()
+        # 初始化计数器
+        total = 0
+        with self.__catalog() as catalog_session:
+            # 清空旧的路由记录
+            catalog_session.query(CatalogTable).delete()
+            # 遍历每个分片数据库, 登记其中的书籍
+            for index in indexes:
+                engine, session_factory = self.__shard(index)
+                with session_factory() as session:
+                    hash_list = session.query(BookTable.book_hash).all()
+                catalog_session.add_all(
+                    CatalogTable(book_hash=i[0], shard=index) for i in hash_list
+                )
+                total += len(hash_list)
+                # 重新统计分片的计数器
+                self.__save_usage(index, self.__get_usage(index)._replace(
+                    books=len(hash_list),
+                    size=self.__file_size(engine, self.__get_file_path(index)),
+                ), catalog_session)
+            # 提交更改
+            catalog_session.commit()
+        # 返回登记的书籍数量
+        return total
+
+    @staticmethod
+    def __file_size(engine: Engine, db_path: Path) -> int:
+        # 将预写日志中的内容写回数据库文件后, 获取数据库文件的大小
+        with engine.connect() as connection:
+            connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        return db_path.stat().st_size
+
+    def compress_chapters(
+        self, train: bool = True, batch_size: int = 500,
+    ) -> CompressResult:
+        """按照当前的压缩设置重新编码所有分片中的章节内容, 用于迁移旧版本的分片.
+
+        train 为 True 时, 先为还没有压缩字典的训练范围(书籍或网站)训练字典.
+        重新编码后会回收数据库文件的空间并重建全文索引.
+        """
+        start = time.perf_counter()
+        chapters = rewritten = dictionaries = 0
+        content_before = content_after = file_before = file_after = 0
+        # 每个章节的第一个来源, 用于确定按网站训练字典时的训练范围
+        source = select(ChapterSourceTable.url).where(
+            ChapterSourceTable.chapter_hash == ChapterTable.chapter_hash,
+        ).limit(1).scalar_subquery()
+        for index in self.__known_shards():
+            db_path = self.__get_file_path(index)
+            engine = self.__shard_engine(index)
+            file_before += self.__file_size(engine, db_path)
+            # 收集还没有压缩字典的训练范围的样本并训练字典
+            if train:
+                samples: dict[str, list[str]] = {}
+                statement = select(
+                    ChapterTable.book_hash, source, ChapterTable.content,
+                ).execution_options(yield_per=batch_size)
+                with engine.connect() as connection:
+                    for book_hash, url, content in connection.execute(statement):
+                        scope = chapter_scope(book_hash, [url] if url else [])
+                        if scope_path(scope).exists(): continue
+                        scope_samples = samples.setdefault(scope, [])
+                        if len(scope_samples) < DICT_MAX_SAMPLES:
+                            scope_samples.append(decode_content(content))
+                for scope, scope_samples in samples.items():
+                    if train_dictionary(scope, scope_samples) is not None:
+                        dictionaries += 1
+            # 按章节哈希值分批读取章节, 重新编码后写回
+            last = ""
+            while True:
+                with engine.begin() as connection:
+                    rows = connection.execute(
+                        select(
+                            ChapterTable.chapter_hash, ChapterTable.book_hash,
+                            source, ChapterTable.content,
+                        ).where(ChapterTable.chapter_hash > last)
+                        .order_by(ChapterTable.chapter_hash).limit(batch_size),
+                    ).all()
+                    if not rows: break
+                    updates: list[dict[str, str | bytes]] = []
+                    for chapter_hash, book_hash, url, content in rows:
+                        data = encode_content(
+                            decode_content(content),
+                            chapter_scope(book_hash, [url] if url else []),
+                        )
+                        chapters += 1
+                        content_before += len(content.encode("UTF-8")) \
+                            if isinstance(content, str) else len(content)
+                        content_after += len(data)
+                        if data != content:
+                            updates.append({"hash": chapter_hash, "data": data})
+                    if updates:
+                        connection.execute(
+                            text("UPDATE chapters SET content = :data WHERE chapter_hash = :hash"),
+                            updates,
+                        )
+                    rewritten += len(updates)
+                    last = rows[-1][0]
+            # 回收数据库文件的空间, VACUUM 可能改变 rowid, 因此需要重建全文索引
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT",
+            ) as connection:
+                connection.execute(text("VACUUM"))
+            rebuild_fulltext(engine)
+            size = self.__file_size(engine, db_path)
+            file_after += size
+            # 以回收空间后的文件大小更新分片的计数器
+            self.__save_usage(index, self.__get_usage(index)._replace(size=size))
+        return CompressResult(
+            chapters, rewritten, dictionaries, content_before, content_after,
+            file_before, file_after, time.perf_counter() - start,
+        )
+
+    def rebalance(self) -> RebalanceResult:
+        """离线重新平衡所有分片: 拆分超过容量上限的分片, 合并过小的分片.
+
+        书籍会连同章节、章节来源、封面、书籍来源和索引记录一起移动. 一本书籍本身超过文件大小
+        上限时不会被拆分. 该操作应在没有其他进程写入数据库时执行, 结束后会回收被改动的分片的
+        空间并重建其全文索引.
+        """
+        start = time.perf_counter()
+        moved = created = removed = 0
+        # 统计每个分片中每本书籍的大小
+        sizes = {index: self.__book_sizes(index) for index in self.__shard_indexes()}
+        touched: set[int] = set()
+        # 拆分超过容量上限的分片, 优先移出最大的书籍
+        for index in sorted(sizes):
+            books = sorted(sizes[index].items(), key=lambda i: i[1])
+            while len(books) > 1 and self.__is_over(index):
+                book_hash, size = books.pop()
+                target = self.__find_shard(size, exclude={index})
+                if target is None:
+                    target = max(sizes) + 1
+                    sizes[target] = {}
+                    created += 1
+                self.__move_book(book_hash, size, index, target)
+                sizes[target][book_hash] = sizes[index].pop(book_hash)
+                touched |= {index, target}
+                moved += 1
+        # 从最后一个分片开始, 将过小的分片中的书籍全部移到其他分片
+        for index in sorted(sizes, reverse=True):
+            usage = self.__get_usage(index)
+            if index in touched or \
+                usage.books >= DB_SHARD_MAX_BOOKS * DB_SHARD_MERGE_RATIO or \
+                usage.size >= DB_SHARD_MAX_SIZE * DB_SHARD_MERGE_RATIO:
+                continue
+            for book_hash, size in sorted(sizes[index].items(), key=lambda i: -i[1]):
+                target = self.__find_shard(size, exclude={index})
+                if target is None: break
+                self.__move_book(book_hash, size, index, target)
+                sizes[target][book_hash] = sizes[index].pop(book_hash)
+                touched.add(target)
+                moved += 1
+            # 所有书籍都已移出时删除该分片
+            if not sizes[index]:
+                self.__remove_shard(index)
+                del sizes[index]
+                touched.discard(index)
+                removed += 1
+        # 回收被改动的分片的空间, VACUUM 可能改变 rowid, 因此需要重建全文索引
+        for index in touched:
+            db_path = self.__get_file_path(index)
+            engine = self.__shard_engine(index)
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT",
+            ) as connection:
+                connection.execute(text("VACUUM"))
+            rebuild_fulltext(engine)
+            self.__save_usage(index, self.__get_usage(index)._replace(
+                size=self.__file_size(engine, db_path),
+            ))
+        # 重新选择新书籍写入的分片
+        self.__advance()
+        return RebalanceResult(moved, created, removed, time.perf_counter() - start)
+
+    def __book_sizes(self, index: int) -> dict[str, int]:
+        # 统计分片中每本书籍的章节内容大小, 没有章节的书籍大小为 0
+        with self.__shard_session(index)() as session:
+            sizes = dict.fromkeys(
+                (i[0] for i in session.query(BookTable.book_hash)), 0,
+            )
+            sizes.update(session.execute(
+                select(ChapterTable.book_hash, func.sum(func.length(ChapterTable.content)))
+                .group_by(ChapterTable.book_hash),
+            ).tuples().all())
+        return sizes
+
+    def __find_shard(self, size: int, exclude: set[int]) -> int | None:
+        # 找到第一个能放入一本指定大小的书籍的分片
+        return next(
+            (
+                i for i in self.__shard_indexes()
+                if i not in exclude and self.__has_room(i, size)
+            ),
+            None,
+        )
+
+    @staticmethod
+    def __book_tables(book_hash: str) -> list[tuple[type[Base], ColumnElement[bool]]]:
+        # 一本书籍在分片中的所有记录, 按照写入的顺序排列
+        chapter_hashes = select(ChapterTable.chapter_hash).where(
+            ChapterTable.book_hash == book_hash,
+        )
+        return [
+            (BookTable, BookTable.book_hash == book_hash),
+            (BookSourceTable, BookSourceTable.book_hash == book_hash),
+            (CoverTable, CoverTable.book_hash == book_hash),
+            (ChapterTable, ChapterTable.book_hash == book_hash),
+            (ChapterSourceTable, ChapterSourceTable.chapter_hash.in_(chapter_hashes)),
+            (IndexTable, IndexTable.book_hash == book_hash),
+        ]
+
+    def __move_book(self, book_hash: str, size: int, source: int, target: int) -> None:
+        # 将一本书籍的所有记录从源分片复制到目标分片, 更新路由目录后再从源分片中删除
+        source_engine = self.__shard_engine(source)
+        target_engine = self.__shard_engine(target)
+        tables = self.__book_tables(book_hash)
+        with source_engine.connect() as reader, target_engine.begin() as writer:
+            for model, condition in tables:
+                statement = select(model.__table__).where(condition) \
+                    .execution_options(yield_per=500)
+                for rows in reader.execute(statement).mappings().partitions():
+                    writer.execute(insert(model.__table__), [dict(i) for i in rows])
+        # 更新路由目录, 保留书籍元数据的指纹
+        record = self.__lookup(book_hash)
+        self.__register(
+            book_hash, target, record.fingerprint if record else None, size,
+        )
+        with source_engine.begin() as connection:
+            for model, condition in reversed(tables):
+                connection.execute(delete(model.__table__).where(condition))
+        self.__add_usage(source, books=-1, size=-size)
+
+    def __remove_shard(self, index: int) -> None:
+        # 关闭并删除一个已经没有书籍的分片
+        db_path = self.__get_file_path(index)
+        with self.__lock:
+            engine, session_factory = self.__shard(index)
+            del self.__db_dict[db_path]
+            self.__retire(engine, session_factory)
+        for path in (db_path, db_path.with_name(f"{db_path.name}-wal"),
+                db_path.with_name(f"{db_path.name}-shm")):
+            path.unlink(missing_ok=True)
+        self.__usage.pop(index, None)
+        with self.__catalog() as session:
+            session.query(ShardTable).filter(ShardTable.shard == index).delete()
+            session.commit()
 
     def add_book(self, book: Book | BookItem) -> None:
-        """添加书籍到数据库."""
+        """添加书籍到数据库.
+
+        如果书籍已存在, 则只合并书籍信息、来源和封面, 不改动已有的章节记录;
+        如果书籍信息与上次写入时相同, 则跳过写入. 书籍中携带的章节会逐个合并写入.
+        """
         # 如果传入的是 BookItem, 则转换为 Book 对象
         if isinstance(book, BookItem): book = item_to_book(book)
-        # 在每个数据库中执行
-        for _, session_factory in self.__db_dict.values():
+        # 计算书籍的哈希值和元数据指纹
+        book_hash = hash_(book)
+        fingerprint = book_fingerprint(book)
+        # 通过路由目录找到书籍所在的分片
+        catalog_record = self.__lookup(book_hash)
+        if catalog_record is not None:
             # 创建会话
-            with session_factory() as session:
+            with self.__shard_session(catalog_record.shard)() as session:
                 # 检查书籍是否已存在
-                old_record = session.get(BookTable, hash_(book))
-                # 如果书籍已存在, 则更新书籍信息并删除旧章节
+                old_record = session.get(BookTable, book_hash)
+                # 如果书籍已存在, 则在书籍信息发生变化时合并更新
                 if old_record is not None:
-                    # 合并新旧书籍信息
-                    new_book = book + record_to_book(old_record)
-                    # 转换为数据库记录
-                    new_book = book_to_record(new_book)
-                    # 删除旧章节
-                    session.query(ChapterTable).filter(
-                        ChapterTable.book_hash == hash_(book),
-                    ).delete()
-                    # 合并更新书籍记录
-                    session.merge(new_book)
-                    # 提交更改并返回
-                    session.commit()
+                    if catalog_record.fingerprint != fingerprint:
+                        self.__merge_book_record(session, old_record, book)
+                        session.commit()
+                        self.__register(
+                            book_hash, catalog_record.shard, fingerprint,
+                        )
+                    # 书籍携带的章节逐个与已有章节合并
+                    if book.chapters: self.add_chapters(book.chapters)
                     return
-        # 如果每个数据库都没有该书籍, 则添加到当前未满的数据库
-        with self.__db_dict[self.__not_full][1]() as session:
-            for i in set(book.title):
-                # 添加索引记录
-                session.add(
-                    IndexTable(
-                        hash_=hash_(f"{hash_(book)}-{i}"),
-                        word=i, book_hash=hash_(book),
-                    ),
-                )
-            # 添加书籍记录并提交更改
+        # 如果没有找到该书籍, 则添加到当前未满的数据库
+        with self.__shard_session(self.__counter)() as session:
+            # 添加书籍记录和书名、作者的索引记录并提交更改
             book_record = book_to_record(book)
             session.add(book_record)
+            session.execute(
+                insert(IndexTable),
+                book_to_index_rows(book_hash, book.title, book.author),
+            )
+            size = sum(len(i.content) for i in book_record.chapters)
             session.commit()
+        # 在路由目录中登记该书籍, 并更新分片的计数器
+        self.__register(book_hash, self.__counter, fingerprint, size)
         # 如果当前未满的数据库已满, 则更新计数器和未满数据库路径
-        if self.__is_full(self.__counter):
-            self.__counter += 1
-            self.__not_full = self.__get_file_path(self.__counter)
-            self.__connect(self.__counter)
+        if self.__is_full(self.__counter): self.__advance()
+
+    @staticmethod
+    def __merge_book_record(
+        session: Session, record: BookTable, book: Book,
+    ) -> None:
+        # 按照 Book 对象的合并规则, 将新的书籍信息合并到已有的记录中
+        # 如果两本书籍的状态不同, 取较高优先级的状态
+        record.state = max(record.state, Book.state_shift_1[book.state])
+        # 如果两本书籍的简介长度不同, 取较长的简介
+        if len(book.desc) >= len(record.desc): record.desc = book.desc
+        # 合并书籍的标签, 使用 set 去重
+        record.tags = list(set(book.tags + record.tags))
+        # 合并书籍的其他信息, 新的书籍信息优先
+        record.other_info = {**record.other_info, **book.other_info}
+        # 合并书籍的来源, 只查询来源的 URL
+        old_sources = {
+            i[0] for i in session.query(BookSourceTable.url).filter(
+                BookSourceTable.book_hash == record.book_hash,
+            )
+        }
+        for url in set(book.sources) - old_sources:
+            session.add(
+                BookSourceTable(
+                    url_hash=hash_(url), url=url, book_hash=record.book_hash,
+                ),
+            )
+        # 合并书籍的封面, 只查询封面的 hash 值, 不读取图片数据
+        old_covers = {
+            i[0] for i in session.query(CoverTable.cover_hash).filter(
+                CoverTable.book_hash == record.book_hash,
+            )
+        }
+        for cover in book.covers:
+            if hash_(cover) in old_covers: continue
+            cover_record = cover_to_record(cover)
+            cover_record.book_hash = record.book_hash
+            session.add(cover_record)
+            old_covers.add(hash_(cover))
 
     def add_chapter(self, chapter: Chapter | ChapterItem) -> bool:
         """添加章节到数据库."""
+        return self.add_chapters([chapter])
+
+    def add_chapters(self, chapters: Iterable[Chapter | ChapterItem]) -> bool:
+        """批量添加同一本书籍的章节到数据库, 所有章节在同一个事务中提交.
+
+        已存在的章节按照 Chapter 对象的合并规则进行合并.
+        如果章节所属的书籍不存在, 则不写入任何章节并返回 False.
+        """
         # 如果传入的是 ChapterItem, 则转换为 Chapter 对象
-        if isinstance(chapter, ChapterItem): chapter = item_to_chapter(chapter)
-        # 在每个数据库中执行
-        for _, session_factory in self.__db_dict.values():
-            # 创建会话
-            with session_factory() as session:
-                # 检查章节所属的书籍是否存在
-                book_record = session.get(BookTable, chapter.book_hash)
-                # 如果书籍不存在, 则跳过该数据库
-                if book_record is None: continue
-                # 检查章节是否已存在
-                old_record = session.get(ChapterTable, hash_(chapter))
-                # 如果章节已存在, 则合并章节内容
-                if old_record is not None:
-                    new_chapter = chapter + record_to_chapter(old_record)
-                    new_chapter = chapter_to_record(new_chapter)
-                    session.merge(new_chapter)
-                # 如果章节不存在, 则添加新章节
+        chapter_list = [
+            item_to_chapter(i) if isinstance(i, ChapterItem) else i
+            for i in chapters
+        ]
+        # 如果没有章节, 则无需写入
+        if not chapter_list: return True
+        # 确认所有章节属于同一本书籍
+        book_hash = chapter_list[0].book_hash
+        if any(i.book_hash != book_hash for i in chapter_list):
+            raise ValueError("批量添加章节时, 要求所有章节的 book_hash 相同.")
+        # 合并批次内重复的章节, 较晚到达的章节优先
+        merged: dict[str, Chapter] = {}
+        for chapter in chapter_list:
+            chapter_hash = hash_(chapter)
+            merged[chapter_hash] = chapter + merged[chapter_hash] \
+                if chapter_hash in merged else chapter
+        # 通过路由目录找到章节所属书籍所在的分片
+        catalog_record = self.__lookup(book_hash)
+        # 如果没有找到章节所属的书籍, 则返回失败
+        if catalog_record is None: return False
+        # 创建会话
+        with self.__shard_session(catalog_record.shard)() as session:
+            # 检查章节所属的书籍是否存在
+            book_record = session.get(BookTable, book_hash)
+            # 如果书籍不存在, 则返回失败
+            if book_record is None: return False
+            # 一次性查询已存在的章节, 并与新章节合并
+            old_records = session.query(ChapterTable).filter(
+                ChapterTable.chapter_hash.in_(list(merged)),
+            ).all()
+            for record in old_records:
+                merged[record.chapter_hash] = \
+                    merged[record.chapter_hash] + record_to_chapter(record)
+            old_sizes = {i.chapter_hash: len(i.content) for i in old_records}
+            # 已存在的章节合并更新, 不存在的章节直接添加, 并统计写入的数据量
+            size = 0
+            for chapter_hash, chapter in merged.items():
+                record = chapter_to_record(chapter)
+                size += len(record.content) - old_sizes.get(chapter_hash, 0)
+                if chapter_hash in old_sizes:
+                    session.merge(record)
                 else:
-                    chapter_record = chapter_to_record(chapter)
-                    session.add(chapter_record)
-                # 提交更改并返回成功
-                session.commit()
-                return True
-        # 如果每个数据库都没有该章节所属的书籍, 则返回失败
-        return False
+                    session.add(record)
+            # 提交更改
+            session.commit()
+        # 更新分片的计数器并返回成功
+        self.__add_usage(catalog_record.shard, size=size)
+        return True
 
     def search_book_by_hash(self, book_hash: str) -> Book | None:
-        """通过书籍哈希值搜索书籍."""
-        # 在每个数据库中执行
-        for _, session_factory in self.__db_dict.values():
-            # 创建会话
-            with session_factory() as session:
-                # 查询书籍记录
-                record = session.get(BookTable, book_hash)
-                # 如果找到书籍记录, 则转换为 Book 对象并返回
-                if record is not None: return record_to_book(record)
-        # 如果每个数据库都没有该书籍, 则返回 None
+        """通过书籍哈希值搜索书籍, 返回的书籍对象在访问时才读取章节内容和封面."""
+        # 通过路由目录找到书籍所在的分片
+        session_factory = self.__locate(book_hash)
+        # 如果没有找到该书籍, 则返回 None
+        if session_factory is None: return None
+        # 创建会话
+        with session_factory() as session:
+            # 查询书籍记录
+            record = session.get(BookTable, book_hash)
+            # 如果找到书籍记录, 则转换为 Book 对象并返回
+            if record is not None:
+                return record_to_lazy_book(record, session_factory)
+        # 如果路由目录的记录已失效, 则返回 None
         return None
 
+    def iter_chapter_contents(
+        self, book_hash: str, batch_size: int = 200,
+    ) -> Iterator[tuple[int, str]]:
+        """按章节索引升序逐个读取书籍的章节内容, 生成 (章节索引, 章节内容).
+
+        结果通过数据库游标分批获取, 每批 batch_size 个章节, 不会一次性读取整本书籍.
+        """
+        # 通过路由目录找到书籍所在的分片
+        session_factory = self.__locate(book_hash)
+        # 如果没有找到该书籍, 则没有章节
+        if session_factory is None: return
+        # 创建会话并流式读取章节内容
+        statement = select(ChapterTable.index, ChapterTable.content).where(
+            ChapterTable.book_hash == book_hash,
+        ).order_by(ChapterTable.index).execution_options(yield_per=batch_size)
+        with session_factory() as session:
+            for index, content in session.execute(statement):
+                yield index, decode_content(content)
+
+    def stored_chapters(self, book_hash: str, min_length: int = 0) -> dict[int, set[str]]:
+        """获取书籍已保存的完整章节, 返回章节索引到来源 URL 集合的映射, 用于增量爬取.
+
+        内容少于 min_length 个字符的章节视为不完整, 不包括在结果中.
+        """
+        # 通过路由目录找到书籍所在的分片
+        session_factory = self.__locate(book_hash)
+        # 如果没有找到该书籍, 则没有已保存的章节
+        if session_factory is None: return {}
+        # 通过记录的字符数筛选出内容完整的章节, 不读取章节内容
+        result: dict[int, set[str]] = {}
+        with session_factory() as session:
+            for index, url in session.execute(
+                select(ChapterTable.index, ChapterSourceTable.url).join(ChapterSourceTable)
+                .where(
+                    ChapterTable.book_hash == book_hash,
+                    ChapterTable.content_length >= min_length,
+                ),
+            ):
+                result.setdefault(index, set()).add(url)
+        return result
+
+    def __map_shards(self, func: Callable[[Engine, scoped_session[Session]], T]) -> list[T]:
+        # 在所有分片数据库上并发执行查询函数, 按分片顺序返回结果
+        # 线程数不超过同时打开的分片上限, 执行期间的分片通过 __using 避免被其他线程关闭
+        def run(index: int) -> T:
+            with self.__using(index) as shard: return func(*shard)
+
+        shards = self.__known_shards()
+        if len(shards) <= 1: return [run(i) for i in shards]
+        workers = max(min(len(shards), 16, DB_MAX_OPEN_SHARDS), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run, shards))
+
     def search_book_by_name(self, name: str) -> list[Book]:
-        """通过书名搜索书籍."""
-        # 获取书名的分词结果
-        words = set(name)
-        # 初始化结果列表
-        result: list[Book] = []
-        # 在每个数据库中执行
-        for _, session_factory in self.__db_dict.values():
-            # 创建会话
+        """通过书名或作者搜索书籍, 返回的书籍对象在访问时才读取章节内容和封面.
+
+        书名或作者需要包含查询中所有的二元组(相邻的两个字符), 单字查询匹配包含该字的书籍.
+        每个分片数据库只执行一条查询语句, 各个分片并发查询.
+        """
+        # 获取查询的二元组, 单字查询使用前缀范围匹配
+        words = bigrams(name)
+        char = "".join(name.split()).lower()
+        if not words and not char: return []
+        condition = (
+            IndexTable.word.in_(words) if words
+            else IndexTable.word.between(char, char + "\U0010ffff")
+        )
+        # 在同一个字段中命中所有二元组的书籍
+        hash_query = select(IndexTable.book_hash).where(condition).group_by(
+            IndexTable.book_hash, IndexTable.field,
+        ).having(func.count(distinct(IndexTable.word)) >= len(words))
+        statement = select(BookTable).where(BookTable.book_hash.in_(hash_query))
+
+        def search(_: Engine, session_factory: scoped_session[Session]) -> list[Book]:
+            # 一次性查询所有命中的书籍记录, 并转换为 Book 对象
             with session_factory() as session:
-                # 初始化缓冲区
-                book_hash_set_list: list[set[str]] = []
-                # 遍历每个分词结果
-                for word in words:
-                    # 查询包含该分词的书籍哈希值列表
-                    hash_list = session.query(IndexTable.book_hash).filter(
-                        IndexTable.word == word,
-                    ).all()
-                    # 将哈希值集合添加到缓冲区
-                    book_hash_set_list.append({i[0] for i in hash_list})
-                # 求所有分词的哈希值集合的交集
-                book_hash_set: set[str] = reduce(
-                    lambda x, y: x & y, book_hash_set_list,
-                )
-                # 查询并转换为书籍记录, 添加到结果列表
-                for i in book_hash_set:
-                    # 查询书籍记录
-                    book = session.query(BookTable).filter(
-                        BookTable.book_hash == i,
-                    ).scalar()
-                    # 将书籍记录转换为 Book 对象并添加到结果列表
-                    result.append(record_to_book(book))
-        # 返回结果列表
-        return result
+                return [
+                    record_to_lazy_book(i, session_factory)
+                    for i in session.scalars(statement)
+                ]
+
+        # 合并各个分片的结果
+        return [i for result in self.__map_shards(search) for i in result]
+
+    def update_candidates(
+        self, states: Iterable[int], recent_chapters: int = 20,
+    ) -> list[UpdateCandidate]:
+        """查询指定状态的书籍的来源和最近章节的更新时间, 用于批量检查书籍更新.
+
+        更新间隔根据最后 recent_chapters 个有更新时间的章节计算, 各个分片并发查询.
+        """
+        books = select(
+            BookTable.book_hash, BookTable.title, BookTable.author, BookTable.state,
+        ).where(BookTable.state.in_(list(states)))
+        selected = select(books.subquery().c.book_hash)
+        sources = select(BookSourceTable.book_hash, BookSourceTable.url).where(
+            BookSourceTable.book_hash.in_(selected),
+        ).order_by(BookSourceTable.url)
+        counts = select(ChapterTable.book_hash, func.count()).where(
+            ChapterTable.book_hash.in_(selected),
+        ).group_by(ChapterTable.book_hash)
+        # 每本书籍按章节索引倒序排列的章节更新时间, 只取最后 recent_chapters 个
+        recent = select(
+            ChapterTable.book_hash, ChapterTable.update_time,
+            func.row_number().over(
+                partition_by=ChapterTable.book_hash, order_by=ChapterTable.index.desc(),
+            ).label("rank"),
+        ).where(
+            ChapterTable.book_hash.in_(selected), ChapterTable.update_time > 0,
+        ).subquery()
+        timing = select(
+            recent.c.book_hash, func.max(recent.c.update_time),
+            func.min(recent.c.update_time), func.count(),
+        ).where(recent.c.rank <= recent_chapters).group_by(recent.c.book_hash)
+
+        def search(engine: Engine, _: scoped_session[Session]) -> list[UpdateCandidate]:
+            with engine.connect() as connection:
+                urls: dict[str, list[str]] = {}
+                for book_hash, url in connection.execute(sources):
+                    urls.setdefault(book_hash, []).append(url)
+                chapters = dict(connection.execute(counts).all())
+                times = {i[0]: i[1:] for i in connection.execute(timing)}
+                result = []
+                for book_hash, title, author, state in connection.execute(books):
+                    last, first, count = times.get(book_hash, (0.0, 0.0, 0))
+                    result.append(UpdateCandidate(
+                        book_hash, title, author, state,
+                        tuple(urls.get(book_hash, ())), chapters.get(book_hash, 0), last,
+                        (last - first) / (count - 1) if count > 1 and last > first else None,
+                    ))
+                return result
+
+        # 合并各个分片的结果
+        return [i for result in self.__map_shards(search) for i in result]
+
+    def get_page_state(self, url: str) -> PageState | None:
+        """查询页面的缓存验证信息, 没有记录时返回 None."""
+        with self.__catalog() as session:
+            record = session.get(PageStateTable, hash_(url))
+            if record is None: return None
+            return PageState(*(getattr(record, i) for i in PageState._fields))
+
+    def save_page_states(self, states: Iterable[PageState]) -> None:
+        """保存页面的缓存验证信息, 已有的记录会被覆盖."""
+        with self.__catalog() as session:
+            for state in states:
+                session.merge(PageStateTable(url_hash=hash_(state.url), **state._asdict()))
+            session.commit()
+
+    def search_fulltext(self, query: str, limit: int = 20) -> list[SearchHit]:
+        """在所有分片数据库中全文搜索书籍信息和章节内容, 返回按相关度排序的结果.
+
+        查询词之间以空白分隔, 所有查询词都需要命中; 结果中 chapter_index 为 0 表示命中书籍信息.
+        """
+        def search(engine: Engine, _: scoped_session[Session]) -> list[SearchHit]:
+            with engine.connect() as connection:
+                return search_fulltext(connection, query, limit)
+
+        # 合并各个分片的结果并按相关度排序
+        hits = [i for result in self.__map_shards(search) for i in result]
+        hits.sort(key=lambda i: i.score)
+        return hits[:limit]
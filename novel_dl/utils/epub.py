@@ -7,6 +7,10 @@
 
 
 # 导入标准库
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+# 导入第三方库
 import yaml
 from ebooklib import epub  # type: ignore[reportMissingTypeStubs]
 
@@ -55,8 +59,9 @@ def _get_intro_html(book: Book) -> str:
         "".join([f'<li><a href="{i}">{i}</a></li>' for i in book.sources]),
     )
 
-def _get_chapter_html(chapter: Chapter) -> str:
-    """生成电子书的章节页面."""
+def _get_chapter_html(chapter: Chapter, content: str | None = None) -> str:
+    """生成电子书的章节页面, content 不为 None 时代替章节对象的内容."""
+    if content is None: content = chapter.content
     return CHAPTER_HTML.replace(
         "{{ index }}", str(chapter.index),
     ).replace(
@@ -68,7 +73,7 @@ def _get_chapter_html(chapter: Chapter) -> str:
         "".join(
             [
                 f"<p>&emsp;&emsp;{i}</p>"
-                for i in chapter.content.replace("\t", "").split("\n")
+                for i in content.replace("\t", "").split("\n")
             ],
         ),
     ).replace(
@@ -84,8 +89,89 @@ def _get_chapter_html(chapter: Chapter) -> str:
         ),
     )
 
+class ChapterStream:
+    """章节内容流, 按章节索引升序从数据库游标中逐个取出章节内容."""
+
+    def __init__(self, rows: Iterator[tuple[int, str]]) -> None:
+        """初始化章节内容流, rows 为按索引升序排列的 (章节索引, 章节内容)."""
+        self.rows = rows
+        # 已经取出但尚未使用的一行
+        self.pending: tuple[int, str] | None = None
+
+    def content_of(self, index: int) -> str | None:
+        """取出指定索引的章节内容, 如果游标中没有该章节则返回 None.
+
+        调用时的索引必须递增, 已经跳过的章节不会再被取出.
+        """
+        # 先检查上次多取出的一行
+        row = self.pending or next(self.rows, None)
+        self.pending = None
+        # 跳过索引较小的章节
+        while row is not None and row[0] < index:
+            row = next(self.rows, None)
+        # 如果找到了该章节则返回内容, 否则保留取出的一行
+        if row is not None and row[0] == index: return row[1]
+        self.pending = row
+        return None
+
+
+class StreamedChapterHtml(epub.EpubHtml):
+    """流式写入的章节页面, 在写入文件前才从章节内容流中生成页面, 写入后立即释放."""
+
+    def __init__(
+        self, chapter: Chapter, stream: ChapterStream, **kwargs: str,
+    ) -> None:
+        """初始化流式写入的章节页面."""
+        super().__init__(**kwargs)
+        self.chapter = chapter
+        self.stream = stream
+
+    def get_content(self, default: bytes | None = None) -> bytes:
+        """生成章节页面的内容."""
+        # 从章节内容流中取出内容, 如果没有则使用章节对象的内容
+        self.content = _get_chapter_html(
+            self.chapter, self.stream.content_of(self.chapter.index),
+        )
+        try: return super().get_content(default)
+        finally: self.content = ""
+
+
 def get_epub(book: Book) -> epub.EpubBook:
     """将 Book 对象转换为 epub 格式的电子书."""
+    return _build_epub(book, _create_chapter_html)
+
+
+def write_epub_stream(
+    book: Book, path: Path, rows: Iterator[tuple[int, str]],
+) -> None:
+    """将 Book 对象流式写入 epub 文件.
+
+    章节内容从 rows (按索引升序排列的 (章节索引, 章节内容), 通常为数据库游标)
+    中逐个取出, 在写入压缩包前才生成页面, 内存占用与章节数量基本无关.
+    书籍对象只需要提供章节的元数据. 生成的文件结构与 get_epub 相同.
+    """
+    stream = ChapterStream(rows)
+    ebook = _build_epub(
+        book,
+        lambda chapter, **kwargs: StreamedChapterHtml(chapter, stream, **kwargs),
+    )
+    # 页面模板中没有分页标记, 关闭 page-list 的生成以免再次读取所有章节
+    epub.write_epub(
+        str(path), ebook, {"epub3_pages": False, "raise_exceptions": True},
+    )
+
+
+def _create_chapter_html(chapter: Chapter, **kwargs: str) -> epub.EpubHtml:
+    """创建章节页面, 并立即生成页面内容."""
+    chapter_item = epub.EpubHtml(**kwargs)
+    chapter_item.content = _get_chapter_html(chapter)
+    return chapter_item
+
+
+def _build_epub(
+    book: Book, create_chapter_html: Callable[..., epub.EpubHtml],
+) -> epub.EpubBook:
+    """将 Book 对象转换为 epub 格式的电子书, 章节页面由 create_chapter_html 创建."""
     # 创建电子书对象
     ebook = epub.EpubBook()
     # 设置电子书的基本元数据
@@ -152,7 +238,8 @@ def get_epub(book: Book) -> epub.EpubBook:
         )
         title = f"第{chapter.index}章 {chapter.title}"
         chapter_hash = hash_(chapter)
-        chapter_item = epub.EpubHtml(
+        chapter_item = create_chapter_html(
+            chapter,
             uid=chapter_hash, lang="zh-CN",
             title=title,
             file_name=file_name,
@@ -161,7 +248,6 @@ def get_epub(book: Book) -> epub.EpubBook:
             rel="stylesheet", type="text/css",
             href="../styles/chapter.css",
         )
-        chapter_item.content = _get_chapter_html(chapter)
         ebook.add_item(chapter_item)
         # 将章节添加到目录中
         toc_buffer.append(chapter_item)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: fulltext.py
+# @Time: 16/10/2026 19:10
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""基于 SQLite FTS5 的全文索引, 覆盖书籍的书名、作者、简介以及章节的标题和内容.
+
+每个分片数据库中有两张外部内容(external content)的 FTS5 表, 索引直接引用 books 表和
+chapters 表中的文本, 不会重复保存章节内容. 章节内容是压缩保存的, 因此章节的索引通过
+chapters_text 视图读取解码后的内容(解码函数见 novel_dl.utils.chapter_codec).
+表上的触发器在每次写入书籍或章节时同步更新索引.
+中文没有空格分词, 因此使用 trigram 分词器, 查询词至少需要三个字符才能使用索引,
+更短的查询词退化为 LIKE 查询. 与较长的查询词一起使用时, 短查询词只在索引命中的行中
+匹配(章节内容解码后匹配); 只有短查询词时, 章节内容只在每个分片最近写入的
+SHORT_QUERY_SCAN_LIMIT 个章节中查找, 否则每次查询都需要解压所有章节.
+"""
+
+
+# 导入标准库
+from typing import NamedTuple
+
+# 导入第三方库
+from sqlalchemy import Connection, Engine, text
+
+# 导入自定义库
+from novel_dl.utils.chapter_codec import SQL_DECODE_FUNCTION
+
+
+# 全文索引表的名称
+BOOKS_FTS = "books_fts"
+CHAPTERS_FTS = "chapters_fts"
+# 读取解码后的章节内容的视图
+CHAPTERS_TEXT = "chapters_text"
+# trigram 分词器能够使用索引的最短查询词长度
+MIN_TERM_LENGTH = 3
+# 只有短查询词时, 每个分片中解码并查找内容的章节数量(按写入顺序取最近的章节)
+SHORT_QUERY_SCAN_LIMIT = 5000
+# 摘要的标记和长度
+SNIPPET_OPEN, SNIPPET_CLOSE, SNIPPET_ELLIPSIS = "[", "]", "…"
+SNIPPET_TOKENS = 16
+
+
+class _FtsTable(NamedTuple):
+    """全文索引表的定义."""
+
+    # 全文索引表的名称
+    name: str
+    # 被索引的表, 触发器建立在该表上
+    table: str
+    # 索引读取内容的表或视图, 以及其中与被索引的表的 rowid 对应的列
+    source: str
+    source_rowid: str
+    # 被索引的列, 以及读取这些列时使用的 SQL 函数
+    columns: tuple[str, ...]
+    decoders: dict[str, str]
+
+
+_FTS_TABLES = (
+    _FtsTable(BOOKS_FTS, "books", "books", "rowid", ("title", "author", "desc"), {}),
+    _FtsTable(
+        CHAPTERS_FTS, "chapters", CHAPTERS_TEXT, "chapter_rowid",
+        ("title", "content"), {"content": SQL_DECODE_FUNCTION},
+    ),
+)
+
+
+class SearchHit(NamedTuple):
+    """全文搜索的一条结果, chapter_index 为 0 表示命中书籍信息而不是章节."""
+
+    book_hash: str
+    chapter_index: int
+    snippet: str
+    score: float
+
+
+def _ddl(fts: _FtsTable) -> list[str]:
+    """生成全文索引表、内容视图和同步触发器的建表语句.
+
+    语句中拼接的表名和列名都来自模块中的常量 _FTS_TABLES, 不包含外部输入.
+    """
+    names = ", ".join(f'"{i}"' for i in fts.columns)
+
+    def values(row: str) -> str:
+        # 读取触发器中新旧记录的各列, 需要解码的列通过 SQL 函数读取
+        return ", ".join(
+            f'{fts.decoders[i]}({row}."{i}")' if i in fts.decoders else f'{row}."{i}"'
+            for i in fts.columns
+        )
+
+    insert = f"INSERT INTO {fts.name}(rowid, {names}) VALUES (new.rowid, {values('new')});"  # noqa: S608
+    delete = (f"INSERT INTO {fts.name}({fts.name}, rowid, {names}) "  # noqa: S608
+        f"VALUES ('delete', old.rowid, {values('old')});")
+    changed = " OR ".join(
+        f'{fts.decoders[i]}(old."{i}") IS NOT {fts.decoders[i]}(new."{i}")'
+        if i in fts.decoders else f'old."{i}" IS NOT new."{i}"'
+        for i in fts.columns
+    )
+    statements: list[str] = []
+    if fts.source != fts.table:
+        columns = ", ".join(
+            f'{fts.decoders[i]}("{i}") AS "{i}"' if i in fts.decoders else f'"{i}"'
+            for i in fts.columns
+        )
+        statements.append(
+            f"CREATE VIEW IF NOT EXISTS {fts.source} AS SELECT "  # noqa: S608
+            f"rowid AS {fts.source_rowid}, {columns} FROM {fts.table}",
+        )
+    return [
+        *statements,
+        (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts.name} USING fts5("
+            f"{names}, content='{fts.source}', content_rowid='{fts.source_rowid}', "
+            "tokenize='trigram')"
+        ),
+        (
+            f"CREATE TRIGGER IF NOT EXISTS {fts.name}_ai AFTER INSERT ON {fts.table} "
+            f"BEGIN {insert} END"
+        ),
+        (
+            f"CREATE TRIGGER IF NOT EXISTS {fts.name}_ad AFTER DELETE ON {fts.table} "
+            f"BEGIN {delete} END"
+        ),
+        # 内容没有变化的更新(如重新压缩章节内容)不需要更新索引
+        (
+            f"CREATE TRIGGER IF NOT EXISTS {fts.name}_au AFTER UPDATE ON {fts.table} "
+            f"WHEN {changed} BEGIN {delete} {insert} END"
+        ),
+    ]
+
+
+def ensure_fulltext(engine: Engine) -> None:
+    """确保分片数据库中存在全文索引, 新建的索引会从已有的书籍和章节中重建.
+
+    旧版本直接引用 chapters 表的章节索引会被删除后重建.
+    """
+    with engine.begin() as connection:
+        for fts in _FTS_TABLES:
+            sql = connection.execute(
+                text("SELECT sql FROM sqlite_master WHERE name = :name"),
+                {"name": fts.name},
+            ).scalar()
+            if sql is not None and f"content='{fts.source}'" in sql: continue
+            # 删除定义已经过时的索引
+            if sql is not None:
+                for suffix in ("ai", "ad", "au"):
+                    connection.execute(text(f"DROP TRIGGER IF EXISTS {fts.name}_{suffix}"))
+                connection.execute(text(f"DROP TABLE {fts.name}"))
+            for statement in _ddl(fts):
+                connection.execute(text(statement))
+            connection.execute(
+                # 表名为模块中的常量
+                text(f"INSERT INTO {fts.name}({fts.name}) VALUES ('rebuild')"),  # noqa: S608
+            )
+
+
+def rebuild_fulltext(engine: Engine) -> None:
+    """依据书籍表和章节表重建全文索引.
+
+    外部内容的索引依赖 rowid, 对数据库执行 VACUUM 后需要重建.
+    """
+    with engine.begin() as connection:
+        for fts in _FTS_TABLES:
+            connection.execute(
+                # 表名为模块中的常量
+                text(f"INSERT INTO {fts.name}({fts.name}) VALUES ('rebuild')"),  # noqa: S608
+            )
+
+
+def _split_query(query: str) -> tuple[str, list[str]]:
+    """将查询拆分为 FTS5 的 MATCH 表达式和需要退化为 LIKE 查询的短查询词.
+
+    以空白分隔的查询词之间为 AND 关系, 每个查询词作为短语匹配.
+    """
+    terms = query.split()
+    phrases = [
+        '"' + i.replace('"', '""') + '"'
+        for i in terms if len(i) >= MIN_TERM_LENGTH
+    ]
+    short_terms = [i for i in terms if len(i) < MIN_TERM_LENGTH]
+    return " AND ".join(phrases), short_terms
+
+
+def is_short_query(query: str) -> bool:
+    """判断查询是否只包含短查询词, 这样的查询只在部分章节的内容中查找."""
+    match, short_terms = _split_query(query)
+    return not match and bool(short_terms)
+
+
+def _escape_like(term: str) -> str:
+    """转义 LIKE 查询中的通配符."""
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _make_snippet(text_: str, term: str) -> str:
+    """为没有使用 MATCH 的查询生成与 FTS5 snippet 相同样式的摘要."""
+    position = text_.find(term)
+    if position < 0: return text_[:SNIPPET_TOKENS * 2]
+    start = max(position - SNIPPET_TOKENS, 0)
+    end = position + len(term) + SNIPPET_TOKENS
+    return (
+        (SNIPPET_ELLIPSIS if start > 0 else "")
+        + text_[start:position] + SNIPPET_OPEN + term + SNIPPET_CLOSE
+        + text_[position + len(term):end]
+        + (SNIPPET_ELLIPSIS if end < len(text_) else "")
+    )
+
+
+def search_fulltext(
+    connection: Connection, query: str, limit: int = 20,
+) -> list[SearchHit]:
+    """在一个分片数据库中执行全文搜索, 返回按相关度排序的结果.
+
+    score 为 FTS5 的 bm25 值, 越小越相关; 只包含短查询词的查询无法计算相关度, score 为 0.
+    短查询词与较长的查询词一起使用时, 在索引命中的行的所有列(包括解码后的章节内容)中匹配;
+    只包含短查询词时, 书籍信息和章节标题中全部查找, 章节内容只在最近写入的
+    SHORT_QUERY_SCAN_LIMIT 个章节中查找.
+    以下 SQL 语句中拼接的表名、列名和摘要标记都是模块中的常量, 查询词通过参数传入.
+    """
+    match, short_terms = _split_query(query)
+    if not match and not short_terms: return []
+    hits: list[SearchHit] = []
+    for fts, table, source, source_rowid, columns, decoders in _FTS_TABLES:
+        key = "0" if fts == BOOKS_FTS else 't."index"'
+        # 通过内容视图读取解码后的各列, 没有视图时直接读取被索引的表
+        join = (
+            f"JOIN {source} AS s ON s.{source_rowid} = t.rowid"
+            if source != table else ""
+        )
+        alias = "s" if source != table else "t"
+        conditions: list[str] = []
+        params: dict[str, str | int] = {"limit": limit, "scan": SHORT_QUERY_SCAN_LIMIT}
+        if match:
+            conditions.append(f"{fts} MATCH :match")
+            params["match"] = match
+        for number, term in enumerate(short_terms):
+            params[f"term{number}"] = _escape_like(term)
+            like = [f"{alias}.\"{i}\" LIKE :term{number} ESCAPE '\\'" for i in columns]
+            if match or not decoders:
+                conditions.append("(" + " OR ".join(like) + ")")
+                continue
+            # 只有短查询词时, 需要解码的列只在最近写入的章节中查找
+            recent = f"t.rowid > (SELECT max(rowid) FROM {table}) - :scan"  # noqa: S608
+            conditions.append("(" + " OR ".join(
+                f"({recent} AND {j})" if i in decoders else j
+                for i, j in zip(columns, like, strict=True)
+            ) + ")")
+        where = " AND ".join(conditions)
+        if match:
+            rows = connection.execute(text(
+                f"SELECT t.book_hash, {key}, snippet({fts}, -1, "  # noqa: S608
+                f"'{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '{SNIPPET_ELLIPSIS}', "
+                f"{SNIPPET_TOKENS}), bm25({fts}) "
+                f"FROM {fts} JOIN {table} AS t ON t.rowid = {fts}.rowid {join} "
+                f"WHERE {where} ORDER BY bm25({fts}) LIMIT :limit",
+            ), params)
+            hits.extend(SearchHit(*i) for i in rows)
+            continue
+        # 没有可以使用索引的查询词时, 在命中的列中自行生成摘要
+        names = ", ".join(f'{alias}."{i}"' for i in columns)
+        rows = connection.execute(text(
+            f"SELECT t.book_hash, {key}, {names} FROM {table} AS t {join} "  # noqa: S608
+            f"WHERE {where} LIMIT :limit",
+        ), params)
+        for book_hash, index, *values in rows:
+            value = next((i for i in values if short_terms[0] in i), values[0])
+            hits.append(SearchHit(
+                book_hash, index, _make_snippet(value, short_terms[0]), 0.0,
+            ))
+    # 合并书籍和章节的结果
+    hits.sort(key=lambda i: i.score)
+    return hits[:limit]
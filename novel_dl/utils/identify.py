@@ -7,38 +7,78 @@
 
 
 # 导入标准库
-import base64
 import hashlib
-from typing import Any
+import json
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
 
-def hash_(obj: Any) -> str:  # noqa: PLR0911
+if TYPE_CHECKING:
+    from novel_dl.entity.base import Book
+
+
+# 实体对象上缓存 hash 值的属性名, 实体对象的标识字段被修改时需要删除该属性
+HASH_CACHE = "_hash_cache"
+# 对象类型到 hash 值计算函数的映射, 在第一次调用 hash_ 时初始化
+_DISPATCH: dict[type, Callable[[Any], str]] = {}
+
+
+def hash_(obj: Any) -> str:
     """获取对象的唯一哈希值.
 
     请注意, 该函数传入的对象应该是 小说 或 相关信息的抽象表现,
-    如 BookItem, Book 等对象.
+    如 BookItem, Book 等对象. Book、Chapter 和 Cover 对象的哈希值会缓存在对象上.
     """
+    # 通过对象的类型直接找到计算函数
+    func = _DISPATCH.get(type(obj))
+    if func is None: func = _resolve(type(obj))
+    return func(obj)
+
+
+def _resolve(obj_type: type) -> Callable[[Any], str]:
+    """查找对象类型对应的计算函数, 子类使用父类的计算函数, 并记录查找结果."""
+    if not _DISPATCH: _init_dispatch()
+    for klass in obj_type.__mro__:
+        if klass in _DISPATCH:
+            _DISPATCH[obj_type] = _DISPATCH[klass]
+            return _DISPATCH[klass]
+    _DISPATCH[obj_type] = _default_hash
+    return _default_hash
+
+
+def _init_dispatch() -> None:
+    """初始化类型到计算函数的映射."""
     # 导入自定义库
     from novel_dl.entity.base import Book, Chapter, Cover    # noqa: PLC0415, I001
     from novel_dl.entity.items import BookItem, ChapterItem  # noqa: PLC0415
-    if isinstance(obj, BookItem):
-        return book_hash(
+    _DISPATCH.update({
+        BookItem:    lambda obj: book_hash(
             obj.get("title", "Default Book"),
             obj.get("author", "Default Author"),
-        )
-    if isinstance(obj, ChapterItem):
-        return chapter_hash(
+        ),
+        ChapterItem: lambda obj: chapter_hash(
             obj.get("index", -1),
             obj.get("title", "Default Chapter"),
-        )
-    if isinstance(obj, Book):
-        return book_hash(obj.title, obj.author)
-    if isinstance(obj, Chapter):
-        return chapter_hash(obj.index, obj.title)
-    if isinstance(obj, Cover):
-        return _hash(base64.b64encode(obj.data).decode("UTF-8"))
-    if isinstance(obj, str):
-        return _hash(obj)
+        ),
+        Book:        _memoized(lambda obj: book_hash(obj.title, obj.author)),
+        Chapter:     _memoized(lambda obj: chapter_hash(obj.index, obj.title)),
+        Cover:       _memoized(lambda obj: data_hash(obj.data)),
+        str:         _hash,
+    })
+
+
+def _memoized(func: Callable[[Any], str]) -> Callable[[Any], str]:
+    """将计算结果缓存在对象的 HASH_CACHE 属性上."""
+    def wrapper(obj: Any) -> str:
+        value = obj.__dict__.get(HASH_CACHE)
+        if value is None:
+            value = obj.__dict__[HASH_CACHE] = func(obj)
+        return value
+    return wrapper
+
+
+def _default_hash(_: Any) -> str:
+    """无法识别的对象的哈希值."""
     return "0" * 64
 
 
@@ -52,6 +92,26 @@ def book_hash(name: str, author: str) -> str:
     return _hash(f"{name} - {author}")
 
 
+def data_hash(data: bytes) -> str:
+    """获取二进制数据(如封面图片)的唯一哈希值, 由原始数据直接计算."""
+    return hashlib.sha3_256(data).hexdigest()
+
+
+def book_fingerprint(book: "Book") -> str:
+    """获取书籍元数据的指纹, 用于判断重复抓取到的书籍信息是否发生变化.
+
+    指纹由书籍的基本信息、来源和封面生成, 不包含章节.
+    """
+    return _hash(json.dumps(
+        [
+            book.title, book.author, book.state, book.desc,
+            sorted(book.tags), sorted(book.sources), book.other_info,
+            sorted(hash_(i) for i in book.covers),
+        ],
+        ensure_ascii=False, sort_keys=True,
+    ))
+
+
 def _hash(text: str) -> str:
     """获取字符串的 SHA3-256 哈希值. 字符串以 UTF-8 编码."""
     return hashlib.sha3_256(text.encode("UTF-8")).hexdigest()
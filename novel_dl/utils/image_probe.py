@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: image_probe.py
+# @Time: 16/10/2026 18:02
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""只读取文件头, 获取图片的宽度、高度和格式, 不解码像素数据."""
+
+
+# 导入标准库
+import struct
+from io import BytesIO
+
+# 导入第三方库
+from PIL import Image
+
+
+# PNG 和 GIF 文件头
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+# JPEG 中记录图片尺寸的 SOF 标记(不包括 DHT、JPG 和 DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG 中没有长度字段的标记
+JPEG_STANDALONE_MARKERS = frozenset({0x01, 0xD8, *range(0xD0, 0xD8)})
+
+
+def probe_image(data: bytes) -> tuple[int, int, str]:
+    """获取图片的宽度、高度和格式(与 PIL 的格式名称相同).
+
+    PNG、GIF、JPEG 和 WebP 直接解析文件头, 其他格式交给 PIL 读取文件头.
+    如果无法识别图片, 则返回 (0, 0, "").
+    """
+    try:
+        result = _probe_header(data)
+    except (struct.error, IndexError):
+        result = None
+    if result is not None: return result
+    # 交给 PIL 识别, Image.open 只读取文件头
+    try:
+        with Image.open(BytesIO(data)) as image:
+            return image.width, image.height, image.format or ""
+    except OSError:
+        return 0, 0, ""
+
+
+def _probe_header(data: bytes) -> tuple[int, int, str] | None:  # noqa: PLR0911
+    """直接解析常见格式的文件头, 无法识别时返回 None."""
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height, "PNG"
+    if data[:6] in GIF_SIGNATURES:
+        width, height = struct.unpack("<HH", data[6:10])
+        return width, height, "GIF"
+    if data[:2] == b"\xff\xd8":
+        return _probe_jpeg(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF, "WEBP"
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, "WEBP"
+        if chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return width, height, "WEBP"
+    return None
+
+
+def _probe_jpeg(data: bytes) -> tuple[int, int, str] | None:
+    """依次跳过 JPEG 的各个段, 直到找到记录图片尺寸的 SOF 段."""
+    position = 2
+    while position + 9 <= len(data):
+        # 跳过段之间的填充字节
+        if data[position] != 0xFF:
+            position += 1
+            continue
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+        elif marker in JPEG_STANDALONE_MARKERS:
+            position += 2
+        elif marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[position + 5:position + 9])
+            return width, height, "JPEG"
+        else:
+            length, = struct.unpack(">H", data[position + 2:position + 4])
+            position += 2 + length
+    return None
@@ -58,7 +58,7 @@ def tnd(path: Path) -> Book:
         "<br/>", "\n",
     ).replace("\n\n", "\n").replace("\n\n", "\n")
     # 构造 Book 对象
-    book_obj = Book(title, author, state, desc, [], [], {})  # type: ignore[reportUnknownVariableType]
+    book_obj = Book(title, author, state, desc)  # type: ignore[reportUnknownVariableType]
     # 向 Book 对象中添加封面
     book_obj.covers.append(Cover("", cover.get_content()))
     # 获取章节的 id 列表
@@ -85,7 +85,6 @@ def tnd(path: Path) -> Book:
             Chapter(
                 hash_(book_obj), index + 1, name, 0.0,
                 "\t" + "\n\t".join(i.text for i in content.find_all("p")),
-                [], {},
             ),
         )
     # 返回构造完成的 Book 对象
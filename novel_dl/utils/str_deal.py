@@ -46,3 +46,16 @@ def add_tab(text: str) -> str:
             buffer.append(line)
     # 将缓冲区的行重新连接成一个字符串并返回.
     return "\n".join(buffer)
+
+
+def bigrams(text: str) -> list[str]:
+    """获取文本中所有不重复的二元组(相邻的两个字符), 忽略空白字符和大小写."""
+    text = "".join(text.split()).lower()
+    return sorted({text[i:i + 2] for i in range(len(text) - 1)})
+
+
+def index_words(text: str) -> list[str]:
+    """获取文本在索引表中的所有词条, 即所有二元组以及最后一个字符."""
+    text = "".join(text.split()).lower()
+    if not text: return []
+    return sorted({*bigrams(text), text[-1]})
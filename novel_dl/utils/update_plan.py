@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# @FileName: update_plan.py
+# @Time: 17/10/2026 04:05
+# @Author: Amundsen Severus Rubeus Bjaaland
+"""批量检查书籍更新的计划.
+
+假设书籍的章节按照最近的平均更新间隔随机发布(泊松过程), 则距离最近一次更新 age 秒后,
+书籍已经更新的概率为 1 - exp(-age / interval), 期间预计发布的章节数为 age / interval.
+检查的顺序按照预计错过的章节数从多到少排列, 既考虑书籍有多久没有检查, 也考虑书籍更新的频率.
+"""
+
+
+# 导入标准库
+import math
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+# 导入自定义库
+from novel_dl.utils.db_manager import UpdateCandidate
+
+
+class PlannedUpdate(NamedTuple):
+    """计划检查更新的书籍, 时间的单位为秒."""
+
+    spider: str
+    url: str
+    book_hash: str
+    title: str
+    author: str
+    age: float
+    interval: float
+    probability: float
+    score: float
+
+
+def plan_updates(
+    candidates: Iterable[UpdateCandidate], spiders: dict[str, str], *,
+    domains: Iterable[str] = (), min_age: float = 0.0, limit: int = 0,
+    default_interval: float = 3 * 86400, now: float | None = None,
+) -> list[PlannedUpdate]:
+    """从候选书籍中选出需要检查更新的书籍, 按照优先级从高到低排列.
+
+    spiders 为网站域名到爬虫名称的映射, 每本书籍使用第一个有对应爬虫的来源;
+    domains 不为空时只保留来源属于这些域名的书籍; 距离最近一次章节更新不足 min_age 秒的书籍不检查.
+    没有足够的章节更新时间的书籍使用 default_interval 作为更新间隔,
+    没有章节更新时间的书籍总是检查, 并视为距离最近一次更新刚好过了一个间隔.
+    """
+    now = time.time() if now is None else now
+    domains = set(domains)
+    result = []
+    for candidate in candidates:
+        # 找到有对应爬虫的来源
+        url = next((
+            i for i in candidate.urls
+            if urlparse(i).netloc in spiders
+            and (not domains or urlparse(i).netloc in domains)
+        ), None)
+        if url is None: continue
+        # 计算距离最近一次更新的时间和更新间隔
+        interval = candidate.interval or default_interval
+        age = now - candidate.last_update if candidate.last_update > 0 else interval
+        if candidate.last_update > 0 and age < min_age: continue
+        result.append(PlannedUpdate(
+            spiders[urlparse(url).netloc], url, candidate.book_hash,
+            candidate.title, candidate.author, age, interval,
+            1 - math.exp(-age / interval), age / interval,
+        ))
+    result.sort(key=lambda i: i.score, reverse=True)
+    return result[:limit] if limit > 0 else result